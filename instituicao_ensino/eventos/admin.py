@@ -8,7 +8,7 @@ permitindo customização das telas de administração, filtros, buscas e exibi
 
 from django.contrib import admin
 from .models import TipoEvento, Evento
-from .models import InscricaoEvento
+from .models import InscricaoEvento, ListaEsperaEvento
 
 
 
@@ -70,3 +70,25 @@ class InscricaoEventoAdmin(admin.ModelAdmin):
     # Campos que podem ser buscados no admin
     search_fields = ('inscrito__nome_usuario', 'inscrito__nome')
     # Não colocamos autocomplete_fields aqui para evitar erro E040
+
+
+
+# -------------------------------
+# Admin para ListaEsperaEvento
+# -------------------------------
+@admin.register(ListaEsperaEvento)
+class ListaEsperaEventoAdmin(admin.ModelAdmin):
+    """
+    Configuração da interface de administração para o modelo ListaEsperaEvento.
+
+    - list_display: exibe o evento, o usuário e a ordem na fila.
+    - list_filter: permite filtrar as filas por evento.
+    - search_fields: permite busca por nome de usuário e nome do inscrito.
+    """
+    # Campos exibidos na lista de espera
+    list_display = ('evento', 'inscrito', 'posicao', 'criado_em')
+    # Filtros laterais na tela do admin
+    list_filter = ('evento',)
+    # Campos que podem ser buscados no admin
+    search_fields = ('inscrito__nome_usuario', 'inscrito__nome')
+
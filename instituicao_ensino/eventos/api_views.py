@@ -4,7 +4,8 @@ from rest_framework.views import APIView
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.throttling import SimpleRateThrottle
-from .models import Evento, InscricaoEvento
+from .models import Evento, EventoLotado
+from .services import inscrever
 from .serializers import EventoSerializer, InscricaoCreateSerializer
 from django.shortcuts import get_object_or_404
 from django.db import IntegrityError
@@ -84,17 +85,16 @@ class InscricaoAPIView(APIView):
         if getattr(request.user, 'is_superuser', False):
             return Response({'detail': 'Superusuário não pode se inscrever.'}, status=status.HTTP_403_FORBIDDEN)
 
-        # prevent duplicate inscriptions
-        if InscricaoEvento.objects.filter(evento=evento, inscrito=perfil).exists():
+        # reserve the seat atomically; duplicates are caught by the unique constraint
+        lotado = Response({'detail': 'Evento atingiu o número máximo de participantes.'}, status=status.HTTP_400_BAD_REQUEST)
+        if evento.lotado():
+            return lotado
+        try:
+            inscricao, criada = inscrever(evento, perfil)
+        except EventoLotado:
+            return lotado
+        if not criada:
             return Response({'detail': 'Usuário já inscrito neste evento.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        # check capacity unless sem_limites
-        if (evento.quantidade_participantes and not evento.sem_limites):
-            current = InscricaoEvento.objects.filter(evento=evento).count()
-            if evento.quantidade_participantes is not None and current >= evento.quantidade_participantes:
-                return Response({'detail': 'Evento atingiu o número máximo de participantes.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        inscricao = InscricaoEvento.objects.create(evento=evento, inscrito=perfil)
         return Response(serializer.to_representation(inscricao), status=status.HTTP_201_CREATED)
 
 
@@ -0,0 +1,33 @@
+"""
+Comando Django para corrigir o contador de inscritos dos eventos
+(`Evento.inscritos_count`) a partir das inscrições gravadas no banco.
+"""
+
+from django.core.management.base import BaseCommand
+from eventos.services import reconciliar_inscritos
+
+
+class Command(BaseCommand):
+    """
+    Verifica e corrige divergências entre `Evento.inscritos_count` e as inscrições.
+    Pode ser executado manualmente ou via agendamento (cron/task scheduler).
+    """
+    help = 'Corrige o contador de inscritos dos eventos a partir das inscrições.'
+
+    def add_arguments(self, parser):
+        """
+        Adiciona os eventos a verificar e o modo somente leitura.
+        """
+        parser.add_argument('--evento', type=int, action='append', dest='eventos',
+                            help='ID do evento a verificar (pode repetir; padrão: todos)')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas relata as divergências')
+
+    def handle(self, *args, **options):
+        """
+        Relata cada evento divergente e, fora do --dry-run, grava a contagem correta.
+        """
+        divergentes = reconciliar_inscritos(options.get('eventos'), corrigir=not options['dry_run'])
+        for evento_id, contador, reais in divergentes:
+            self.stdout.write(self.style.WARNING(f"Evento {evento_id}: contador {contador}, inscrições {reais}"))
+        acao = 'encontrados' if options['dry_run'] else 'corrigidos'
+        self.stdout.write(self.style.SUCCESS(f"Eventos divergentes {acao}: {len(divergentes)}"))
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eventos', '0002_initial'),
+        ('usuarios', '0003_certificado_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evento',
+            name='atualizado_em',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['data_inicio', 'data_fim'], name='evento_periodo_idx'),
+        ),
+    ]
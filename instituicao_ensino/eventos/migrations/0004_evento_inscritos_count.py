@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:44
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def preencher_inscritos_count(apps, schema_editor):
+    Evento = apps.get_model('eventos', 'Evento')
+    InscricaoEvento = apps.get_model('eventos', 'InscricaoEvento')
+    contagem = (
+        InscricaoEvento.objects.filter(evento=OuterRef('pk'))
+        .order_by().values('evento').annotate(n=Count('pk')).values('n')
+    )
+    Evento.objects.update(inscritos_count=Coalesce(Subquery(contagem), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eventos', '0003_evento_atualizado_em_periodo_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evento',
+            name='inscritos_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(preencher_inscritos_count, migrations.RunPython.noop),
+    ]
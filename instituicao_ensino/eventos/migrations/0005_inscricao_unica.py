@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:48
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remover_inscricoes_duplicadas(apps, schema_editor):
+    """
+    Mantém a inscrição mais antiga de cada (evento, inscrito) repetido, validada
+    se alguma das repetidas estava, e recalcula o contador dos eventos afetados.
+    """
+    InscricaoEvento = apps.get_model('eventos', 'InscricaoEvento')
+    Evento = apps.get_model('eventos', 'Evento')
+    repetidas = (
+        InscricaoEvento.objects.values('evento_id', 'inscrito_id')
+        .annotate(total=Count('id'), primeira=Min('id')).filter(total__gt=1)
+    )
+    eventos = set()
+    for grupo in repetidas:
+        mesmas = InscricaoEvento.objects.filter(evento_id=grupo['evento_id'], inscrito_id=grupo['inscrito_id'])
+        if mesmas.filter(is_validated=True).exists():
+            mesmas.filter(id=grupo['primeira']).update(is_validated=True)
+        mesmas.exclude(id=grupo['primeira']).delete()
+        eventos.add(grupo['evento_id'])
+    if eventos:
+        contagem = (
+            InscricaoEvento.objects.filter(evento=OuterRef('pk'))
+            .order_by().values('evento').annotate(n=Count('pk')).values('n')
+        )
+        Evento.objects.filter(pk__in=eventos).update(inscritos_count=Coalesce(Subquery(contagem), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eventos', '0004_evento_inscritos_count'),
+        ('usuarios', '0003_certificado_fingerprint'),
+    ]
+
+    operations = [
+        migrations.RunPython(remover_inscricoes_duplicadas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='inscricaoevento',
+            constraint=models.UniqueConstraint(fields=('evento', 'inscrito'), name='inscricao_unica_evento_inscrito'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eventos', '0005_inscricao_unica'),
+        ('usuarios', '0003_certificado_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evento',
+            name='espera_ultima_posicao',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='ListaEsperaEvento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posicao', models.PositiveBigIntegerField()),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('evento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='eventos.evento')),
+                ('inscrito', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='usuarios.usuario')),
+            ],
+            options={
+                'ordering': ['evento', 'posicao'],
+                'constraints': [models.UniqueConstraint(fields=('evento', 'inscrito'), name='espera_unica_evento_inscrito'), models.UniqueConstraint(fields=('evento', 'posicao'), name='espera_posicao_unica')],
+            },
+        ),
+    ]
@@ -6,7 +6,8 @@ Inclui validações, manipulação de arquivos de imagem, geração de pastas e
 """
 
 import os
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q
 from django.conf import settings
 from django.db import models as dj_models
 from django.core.exceptions import ValidationError
@@ -63,6 +64,12 @@ class Evento(models.Model):
         horas (DecimalField): Carga horária do evento.
         gallery_slug (CharField): Slug para galeria de imagens.
         finalizado (BooleanField): Indica se o evento foi finalizado.
+        atualizado_em (DateTimeField): Data/hora da última alteração (ETag do calendário).
+        inscritos_count (PositiveIntegerField): Número de inscrições, mantido junto
+            com cada inscrição criada ou excluída (ver `InscricaoEvento.save` e
+            `signals.atualizar_contador_inscricao_excluida`).
+        espera_ultima_posicao (PositiveBigIntegerField): Última posição entregue na
+            lista de espera (ver `ListaEsperaEvento`).
     """
 
     MODALIDADES = [
@@ -112,6 +119,18 @@ class Evento(models.Model):
     # Campos auxiliares
     gallery_slug = models.CharField(max_length=255, blank=True, null=True)
     finalizado = models.BooleanField(default=False)
+    atualizado_em = models.DateTimeField(auto_now=True)
+    inscritos_count = models.PositiveIntegerField(default=0, editable=False)
+    espera_ultima_posicao = models.PositiveBigIntegerField(default=0, editable=False)
+
+    # Campos mantidos apenas por UPDATEs com F() (ver `save`)
+    CONTADORES = ('inscritos_count', 'espera_ultima_posicao')
+
+    class Meta:
+        indexes = [
+            # Consultas do calendário por período (data_inicio <= fim e data_fim >= inicio)
+            models.Index(fields=['data_inicio', 'data_fim'], name='evento_periodo_idx'),
+        ]
 
     def __str__(self):
         """
@@ -120,6 +139,16 @@ class Evento(models.Model):
         tipo_label = getattr(self.tipo, 'tipo', str(self.tipo)) if self.tipo else ''
         return f"{self.titulo} - {tipo_label}"
 
+    def lotado(self):
+        """
+        Indica se o limite de participantes foi atingido, pelo contador
+        `inscritos_count` (sem contar as inscrições no banco).
+        """
+        return bool(
+            not self.sem_limites and self.quantidade_participantes
+            and self.inscritos_count >= self.quantidade_participantes
+        )
+
     def get_gallery_name(self):
         """
         Gera o nome da pasta da galeria de imagens do evento.
@@ -145,6 +174,8 @@ class Evento(models.Model):
         - Criar pastas do evento e galeria
         - Remover thumb antiga se necessário
         - Redimensionar a imagem da thumb após salvar
+        - Não regravar os CONTADORES de uma instância já existente, que podem
+          estar desatualizados em relação ao banco
         """
         # Gera o slug da galeria automaticamente, se não existir
         if not self.gallery_slug:
@@ -166,6 +197,12 @@ class Evento(models.Model):
                 if os.path.exists(old_path):
                     os.remove(old_path)
 
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.CONTADORES
+            ]
+
         # SALVA PRIMEIRO para ter o arquivo físico
         super().save(*args, **kwargs)
 
@@ -183,6 +220,19 @@ class Evento(models.Model):
 # MODELO: InscricaoEvento
 # ============================================================
 
+class EventoLotado(Exception):
+    """
+    Não há vaga no evento: a reserva de `InscricaoEvento.save` não encontrou
+    `inscritos_count` abaixo de `quantidade_participantes`.
+    """
+
+
+class JaInscrito(Exception):
+    """
+    O usuário já tem inscrição no evento (não pode entrar na lista de espera).
+    """
+
+
 class InscricaoEvento(models.Model):
     """
     Modelo que representa a inscrição de um usuário em um evento.
@@ -198,14 +248,87 @@ class InscricaoEvento(models.Model):
     is_validated = models.BooleanField(default=False)
     data_inscricao = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['evento', 'inscrito'], name='inscricao_unica_evento_inscrito'),
+        ]
+
     def __str__(self):
         """
         Retorna uma representação legível da inscrição, incluindo usuário e evento.
         """
         return f"{self.inscrito.nome_usuario} inscrito em {self.evento.titulo}"
 
+    def clean(self):
+        """
+        Recusa novas inscrições em eventos lotados (formulários e admin).
+        """
+        if self._state.adding and self.evento_id and self.evento.lotado():
+            raise ValidationError('Número máximo de participantes atingido.')
+
+    def save(self, *args, **kwargs):
+        """
+        Ao criar a inscrição, reserva a vaga com um único UPDATE condicional em
+        `Evento.inscritos_count` (só incrementa se ainda houver vaga) e insere a
+        inscrição na mesma transação. O UPDATE trava apenas a linha do evento,
+        então inscrições em eventos diferentes não esperam umas pelas outras.
+        Se o INSERT falhar (inscrição duplicada), a reserva é desfeita junto.
+
+        Levanta EventoLotado se o limite de participantes foi atingido.
+        """
+        criando = self._state.adding
+        with transaction.atomic():
+            if criando:
+                vaga = (
+                    Q(sem_limites=True) | Q(quantidade_participantes__isnull=True)
+                    | Q(quantidade_participantes=0) | Q(inscritos_count__lt=F('quantidade_participantes'))
+                )
+                reservou = Evento.objects.filter(vaga, pk=self.evento_id).update(inscritos_count=F('inscritos_count') + 1)
+                if not reservou:
+                    raise EventoLotado(f'Evento {self.evento_id} sem vagas.')
+            super().save(*args, **kwargs)
+
     def is_complete(self):
         """
         Indica se a inscrição está validada e o evento finalizado.
         """
-        return self.is_validated and self.evento.finalizado
\ No newline at end of file
+        return self.is_validated and self.evento.finalizado
+
+
+# ============================================================
+# MODELO: ListaEsperaEvento
+# ============================================================
+
+class ListaEsperaEvento(models.Model):
+    """
+    Entrada na lista de espera de um evento lotado.
+
+    A fila é ordenada por `posicao`, tirada de `Evento.espera_ultima_posicao`
+    com um UPDATE F() + 1: entrar na fila custa o mesmo com 10 ou 10.000
+    pessoas esperando. Saídas deixam lacunas (a ordem relativa se mantém); a
+    posição exibida ao usuário é a quantidade de entradas à sua frente.
+
+    Campos:
+        evento (ForeignKey): Evento aguardado.
+        inscrito (ForeignKey): Usuário na fila.
+        posicao (PositiveBigIntegerField): Ordem de chegada no evento.
+        criado_em (DateTimeField): Data/hora da entrada na fila.
+    """
+    evento = models.ForeignKey(Evento, on_delete=models.CASCADE)
+    inscrito = dj_models.ForeignKey('usuarios.Usuario', on_delete=dj_models.CASCADE)
+    posicao = models.PositiveBigIntegerField()
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['evento', 'inscrito'], name='espera_unica_evento_inscrito'),
+            # Também serve de índice para achar a cabeça da fila
+            models.UniqueConstraint(fields=['evento', 'posicao'], name='espera_posicao_unica'),
+        ]
+        ordering = ['evento', 'posicao']
+
+    def __str__(self):
+        """
+        Retorna uma representação legível da entrada na fila.
+        """
+        return f"{self.inscrito.nome_usuario} aguardando {self.evento.titulo}"
@@ -6,7 +6,8 @@ Inclui validações customizadas e métodos de representação para uso nas APIs
 """
 
 from rest_framework import serializers
-from .models import Evento, InscricaoEvento
+from .models import Evento, EventoLotado
+from .services import inscrever
 
 
 
@@ -62,7 +63,10 @@ class InscricaoCreateSerializer(serializers.Serializer):
             perfil = None
 
         evento = Evento.objects.get(pk=validated_data['evento_id'])
-        inscricao = InscricaoEvento.objects.create(evento=evento, inscrito=perfil)
+        try:
+            inscricao, _criada = inscrever(evento, perfil)
+        except EventoLotado:
+            raise serializers.ValidationError('Evento atingiu o número máximo de participantes.')
         return inscricao
 
     def to_representation(self, instance):
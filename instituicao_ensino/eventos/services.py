@@ -0,0 +1,198 @@
+"""
+Serviços de inscrição em eventos.
+
+`inscrever` cria a inscrição sem sobrevenda nem duplicatas sob concorrência: a
+vaga é reservada por um UPDATE condicional no contador do evento (ver
+`InscricaoEvento.save`) e a unicidade (evento, inscrito) é garantida pela
+constraint `inscricao_unica_evento_inscrito`.
+
+Em eventos lotados, `entrar_lista_espera` coloca o usuário na fila do evento e
+`cancelar_inscricao` promove a cabeça da fila na mesma transação em que a vaga
+é liberada, enfileirando o email de aviso junto.
+
+O número de inscritos de cada evento fica em `Evento.inscritos_count`, mantido
+junto com cada inscrição criada ou excluída. `reconciliar_inscritos` corrige
+divergências deixadas por caminhos que não passam pelo ORM (`bulk_create`,
+SQL direto, restauração de backup).
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from .models import Evento, EventoLotado, InscricaoEvento, JaInscrito, ListaEsperaEvento
+
+
+def inscrever(evento, usuario):
+    """
+    Inscreve o usuário no evento, se houver vaga.
+
+    Requisições simultâneas do mesmo usuário resultam em uma só inscrição: a
+    perdedora recebe a inscrição já existente, com a vaga reservada desfeita.
+
+    Retorna:
+        tuple: (inscricao, criada).
+
+    Levanta:
+        EventoLotado: o limite de participantes foi atingido.
+    """
+    existente = InscricaoEvento.objects.filter(evento=evento, inscrito=usuario).first()
+    if existente is not None:
+        return existente, False
+    try:
+        with transaction.atomic():
+            inscricao = InscricaoEvento.objects.create(evento=evento, inscrito=usuario)
+    except IntegrityError:
+        # Outra requisição inscreveu o usuário entre a consulta e o INSERT
+        return InscricaoEvento.objects.get(evento=evento, inscrito=usuario), False
+    return inscricao, True
+
+
+def entrar_lista_espera(evento, usuario):
+    """
+    Coloca o usuário no fim da lista de espera do evento.
+
+    A posição vem de um UPDATE F() + 1 em `Evento.espera_ultima_posicao`, que
+    também trava a linha do evento até o commit: entradas simultâneas recebem
+    posições distintas, sem varrer a fila. A verificação de inscrição existente
+    e uma nova tentativa de inscrição são feitas depois dessa trava, que também
+    serializa a reserva de vagas: uma vaga liberada por um cancelamento que não
+    encontrou ninguém na fila vai para este usuário, em vez de ele entrar na
+    fila com vaga sobrando.
+
+    Retorna:
+        tuple: (entrada, criada). `entrada` é a InscricaoEvento criada quando
+        havia vaga, ou a ListaEsperaEvento do usuário.
+
+    Levanta:
+        JaInscrito: o usuário já está inscrito no evento.
+    """
+    existente = ListaEsperaEvento.objects.filter(evento=evento, inscrito=usuario).first()
+    if existente is not None:
+        return existente, False
+    try:
+        with transaction.atomic():
+            Evento.objects.filter(pk=evento.pk).update(espera_ultima_posicao=F('espera_ultima_posicao') + 1)
+            if InscricaoEvento.objects.filter(evento=evento, inscrito=usuario).exists():
+                raise JaInscrito(f'Usuário {usuario.pk} já inscrito no evento {evento.pk}.')
+            try:
+                with transaction.atomic():
+                    return InscricaoEvento.objects.create(evento=evento, inscrito=usuario), True
+            except EventoLotado:
+                pass
+            posicao = Evento.objects.values_list('espera_ultima_posicao', flat=True).get(pk=evento.pk)
+            entrada = ListaEsperaEvento.objects.create(evento=evento, inscrito=usuario, posicao=posicao)
+    except IntegrityError:
+        # Outra requisição colocou o usuário na fila entre a consulta e o INSERT
+        return ListaEsperaEvento.objects.get(evento=evento, inscrito=usuario), False
+    return entrada, True
+
+
+def posicao_lista_espera(evento, usuario):
+    """
+    Posição do usuário na lista de espera (1 = próximo a ser promovido), ou
+    None se ele não está na fila.
+    """
+    entrada = ListaEsperaEvento.objects.filter(evento=evento, inscrito=usuario).values_list('posicao', flat=True).first()
+    if entrada is None:
+        return None
+    return ListaEsperaEvento.objects.filter(evento=evento, posicao__lte=entrada).count()
+
+
+def sair_lista_espera(evento, usuario):
+    """
+    Remove o usuário da lista de espera. Retorna True se ele estava na fila.
+    """
+    removidas, _ = ListaEsperaEvento.objects.filter(evento=evento, inscrito=usuario).delete()
+    return bool(removidas)
+
+
+def promover_lista_espera(evento):
+    """
+    Inscreve a cabeça da lista de espera enquanto houver vaga e enfileira o
+    email de aviso de cada promovido. Deve ser chamada dentro da transação que
+    liberou a vaga: a baixa no contador já travou a linha do evento, então
+    promoções do mesmo evento não se sobrepõem, e inscrição, saída da fila e
+    email são confirmados (ou desfeitos) juntos.
+
+    Retorna:
+        list: as inscrições criadas.
+    """
+    from notifications.services import queue_waitlist_promotion_email
+
+    if evento.finalizado:
+        return []
+    promovidas = []
+    while True:
+        cabeca = (
+            ListaEsperaEvento.objects.filter(evento=evento)
+            .select_related('inscrito').order_by('posicao').first()
+        )
+        if cabeca is None:
+            break
+        try:
+            with transaction.atomic():
+                inscricao = InscricaoEvento.objects.create(evento=evento, inscrito=cabeca.inscrito)
+        except EventoLotado:
+            break
+        except IntegrityError:
+            # Já inscrito por outro caminho: só sai da fila
+            inscricao = None
+        cabeca.delete()
+        if inscricao is not None:
+            queue_waitlist_promotion_email(cabeca.inscrito, evento)
+            promovidas.append(inscricao)
+    return promovidas
+
+
+def cancelar_inscricao(evento, usuario):
+    """
+    Cancela a inscrição do usuário e, na mesma transação, promove a lista de
+    espera para a vaga liberada.
+
+    Retorna:
+        tuple: (inscricao cancelada ou None, inscrições promovidas).
+    """
+    with transaction.atomic():
+        inscricao = InscricaoEvento.objects.filter(evento=evento, inscrito=usuario).first()
+        if inscricao is None:
+            return None, []
+        inscricao.delete()
+        return inscricao, promover_lista_espera(evento)
+
+
+def _contagem_real():
+    """
+    Subconsulta com o número de inscrições do evento da linha externa.
+    """
+    contagem = (
+        InscricaoEvento.objects.filter(evento=OuterRef('pk'))
+        .order_by().values('evento').annotate(n=Count('pk')).values('n')
+    )
+    return Coalesce(Subquery(contagem), 0)
+
+
+def reconciliar_inscritos(evento_ids=None, corrigir=True):
+    """
+    Compara `Evento.inscritos_count` com as inscrições no banco e corrige as
+    divergências.
+
+    A correção grava a contagem calculada no próprio UPDATE (não o valor lido
+    antes), de modo que inscrições feitas durante a reconciliação não se perdem.
+
+    Parâmetros:
+        evento_ids (iterable): limita a verificação a estes eventos (padrão: todos).
+        corrigir (bool): False apenas relata as divergências.
+
+    Retorna:
+        list: tuplas (evento_id, contador, inscrições reais) dos eventos divergentes.
+    """
+    eventos = Evento.objects.all()
+    if evento_ids is not None:
+        eventos = eventos.filter(pk__in=list(evento_ids))
+    divergentes = list(
+        eventos.annotate(reais=_contagem_real()).exclude(inscritos_count=F('reais'))
+        .order_by('pk').values_list('pk', 'inscritos_count', 'reais')
+    )
+    if corrigir and divergentes:
+        Evento.objects.filter(pk__in=[pk for pk, _, _ in divergentes]).update(inscritos_count=_contagem_real())
+    return divergentes
@@ -5,6 +5,7 @@ Signals para auditoria de operações em eventos e inscrições.
 Registra logs de auditoria sempre que eventos ou inscrições são criados, atualizados ou excluídos.
 """
 
+from django.db.models import F
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from .models import Evento, InscricaoEvento
@@ -62,6 +63,17 @@ def audit_inscricao_saved(sender, instance, created, **kwargs):
 
 
 
+@receiver(post_delete, sender=InscricaoEvento)
+def atualizar_contador_inscricao_excluida(sender, instance, **kwargs):
+    """
+    Decrementa `Evento.inscritos_count` ao excluir uma inscrição, inclusive em
+    exclusões em cascata e por QuerySet. O post_delete roda dentro da transação
+    da exclusão, então contador e inscrição mudam juntos.
+    """
+    Evento.objects.filter(pk=instance.evento_id, inscritos_count__gt=0).update(inscritos_count=F('inscritos_count') - 1)
+
+
+
 @receiver(post_delete, sender=InscricaoEvento)
 def audit_inscricao_deleted(sender, instance, **kwargs):
     """
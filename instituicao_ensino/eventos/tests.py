@@ -93,26 +93,74 @@ class EventFlowTests(TestCase):
             InscricaoEvento.objects.filter(evento=self.evento, inscrito=self.aluno).exists()
         )
 
-    @patch('usuarios.generator.generate_certificates_for_event')
-    def test_finalizar_calls_generate(self, mock_call):
+    @patch('usuarios.jobs.dispatch_job')
+    def test_finalizar_agenda_job_de_certificados(self, mock_dispatch):
         """
         Testa o endpoint de finalizar evento:
         - cria inscrição validada
         - login do organizador
         - envia POST para finalizar
-        - verifica se comando de gerar certificados foi chamado
+        - verifica se o job de certificados foi criado e despachado após o commit
         """
+        from usuarios.models import CertificateBatchJob
+
         # cria inscrição já validada
         InscricaoEvento.objects.create(evento=self.evento, inscrito=self.aluno, is_validated=True)
 
         # login do organizador
         self.client.login(username='org1', password='pass')
         url = reverse('finalizar_evento', args=[self.evento.id])
-        resp = self.client.post(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(url)
         self.assertEqual(resp.status_code, 302)
 
-        # verifica se a função generate_certificates_for_event foi chamada
-        mock_call.assert_called_with(self.evento.id)
+        # evento finalizado e job registrado com o total de inscrições validadas
+        self.evento.refresh_from_db()
+        self.assertTrue(self.evento.finalizado)
+        job = CertificateBatchJob.objects.get(evento=self.evento)
+        self.assertEqual(job.total, 1)
+        mock_dispatch.assert_called_with(job.id)
+
+        # progresso disponível para a tela de gerenciamento
+        resp = self.client.get(reverse('progresso_certificados', args=[self.evento.id]))
+        self.assertEqual(resp.json()['total'], 1)
+
+    def test_exportar_certificados_zip(self):
+        """
+        Testa a exportação dos certificados em ZIP:
+        - aluno não tem acesso
+        - organizador recebe um ZIP (em streaming) com os PDFs armazenados sem compressão
+        """
+        import shutil
+        import tempfile
+        import zipfile
+        from django.test import override_settings
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.evento.finalizado = True
+        self.evento.save()
+
+        with override_settings(MEDIA_ROOT=media_root):
+            Certificado.objects.create(
+                usuario=self.aluno, evento=self.evento, nome='Teste',
+                pdf=SimpleUploadedFile('a.pdf', b'%PDF-1.4 aluno', content_type='application/pdf'),
+            )
+            url = reverse('exportar_certificados_zip', args=[self.evento.id])
+
+            self.client.login(username='aluno1', password='pass')
+            self.assertEqual(self.client.get(url).status_code, 302)
+
+            self.client.login(username='org1', password='pass')
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            self.assertTrue(resp.streaming)
+            conteudo = b''.join(resp.streaming_content)
+
+        with zipfile.ZipFile(io.BytesIO(conteudo)) as zf:
+            self.assertEqual(zf.namelist(), ['aluno_aluno1.pdf'])
+            self.assertEqual(zf.getinfo('aluno_aluno1.pdf').compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(zf.read('aluno_aluno1.pdf'), b'%PDF-1.4 aluno')
 
     def test_pegar_certificado_redirects_to_pdf(self):
         """
@@ -141,3 +189,229 @@ class EventFlowTests(TestCase):
 
         # deve redirecionar para media file (status 302)
         self.assertEqual(resp.status_code, 302)
+
+    def _criar_eventos(self, n, inicio=datetime.date(2025, 10, 5)):
+        return Evento.objects.bulk_create([
+            Evento(
+                titulo=f'Evento {i}', tipo=self.tipo_ev, modalidade='online',
+                data_inicio=inicio, data_fim=inicio, horario=datetime.time(9, 0),
+                quantidade_participantes=1, organizador='org1', criador=self.org,
+            )
+            for i in range(n)
+        ])
+
+    def test_lista_eventos_com_consultas_constantes(self):
+        """
+        A lista de eventos e o calendário fazem o mesmo número de consultas
+        com 1 ou com muitos eventos.
+        """
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self.client.login(username='aluno1', password='pass')
+        InscricaoEvento.objects.create(evento=self.evento, inscrito=self.aluno)
+        periodo = {'start': '2025-09-01', 'end': '2025-11-30'}
+
+        with CaptureQueriesContext(connection) as poucos:
+            self.client.get(reverse('lista_eventos'))
+            self.client.get(reverse('calendario_json'), periodo)
+
+        for evento in self._criar_eventos(15):
+            InscricaoEvento.objects.create(evento=evento, inscrito=self.org)
+        with CaptureQueriesContext(connection) as muitos:
+            self.client.get(reverse('lista_eventos'))
+            resp = self.client.get(reverse('calendario_json'), periodo)
+        self.assertEqual(len(muitos), len(poucos))
+        calendario = resp.json()['eventos']
+        self.assertEqual(len(calendario), 16)
+        # lotados: 1 vaga e 1 inscrito
+        self.assertFalse(any(e['disponivel'] for e in calendario if e['titulo'].startswith('Evento ')))
+
+    def test_calendario_json_por_periodo_com_etag(self):
+        self._criar_eventos(1, inicio=datetime.date(2026, 3, 10))
+        url = reverse('calendario_json')
+        resp = self.client.get(url, {'start': '2025-10-01', 'end': '2025-12-31T00:00:00-03:00'})
+        self.assertEqual([e['id'] for e in resp.json()['eventos']], [self.evento.id])
+        self.assertTrue(resp['ETag'].startswith('W/"'))
+        self.assertIn('public', resp['Cache-Control'])
+        self.assertNotIn('Cookie', resp.get('Vary', ''))
+
+        # mesma ETag: 304 sem corpo
+        repetida = self.client.get(url, {'start': '2025-10-01', 'end': '2025-12-31'}, HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(repetida.status_code, 304)
+
+        # uma inscrição muda a disponibilidade e a ETag
+        InscricaoEvento.objects.create(evento=self.evento, inscrito=self.aluno)
+        nova = self.client.get(url, {'start': '2025-10-01', 'end': '2025-12-31'}, HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(nova.status_code, 200)
+        self.assertNotEqual(nova['ETag'], resp['ETag'])
+
+        self.assertEqual(self.client.get(url, {'start': '2025-12-31', 'end': '2025-10-01'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start': 'ontem', 'end': '2025-10-01'}).status_code, 400)
+
+    def test_calendario_inscricoes_do_usuario(self):
+        periodo = {'start': '2025-10-01', 'end': '2025-10-31'}
+        self.assertEqual(self.client.get(reverse('calendario_inscricoes'), periodo).json(), {'inscritos': []})
+        self.client.login(username='aluno1', password='pass')
+        InscricaoEvento.objects.create(evento=self.evento, inscrito=self.aluno)
+        resp = self.client.get(reverse('calendario_inscricoes'), periodo)
+        self.assertEqual(resp.json(), {'inscritos': [self.evento.id]})
+        self.assertIn('private', resp['Cache-Control'])
+
+    def test_inscritos_count_acompanha_inscricoes(self):
+        outro_user = User.objects.create_user(username='aluno2', password='pass')
+        outro = Usuario.objects.create(nome='Aluno 2', tipo=self.tipo_aluno, nome_usuario='aluno2', user=outro_user)
+        InscricaoEvento.objects.create(evento=self.evento, inscrito=self.aluno)
+        inscricao = InscricaoEvento.objects.create(evento=self.evento, inscrito=outro)
+        # salvar de novo uma inscrição existente não conta duas vezes
+        inscricao.is_validated = True
+        inscricao.save()
+        self.evento.refresh_from_db()
+        self.assertEqual(self.evento.inscritos_count, 2)
+
+        inscricao.delete()
+        self.evento.refresh_from_db()
+        self.assertEqual(self.evento.inscritos_count, 1)
+
+        # exclusão em massa pelo QuerySet também desconta
+        InscricaoEvento.objects.filter(evento=self.evento).delete()
+        self.evento.refresh_from_db()
+        self.assertEqual(self.evento.inscritos_count, 0)
+
+    def test_inscricao_recusada_com_evento_lotado(self):
+        self.evento.quantidade_participantes = 1
+        self.evento.save()
+        InscricaoEvento.objects.create(evento=self.evento, inscrito=self.org)
+        self.client.login(username='aluno1', password='pass')
+        self.client.post(reverse('inscrever_evento', args=[self.evento.id]))
+        self.assertFalse(InscricaoEvento.objects.filter(evento=self.evento, inscrito=self.aluno).exists())
+
+    def test_reconciliar_inscritos_corrige_divergencias(self):
+        from io import StringIO
+        from django.core.management import call_command
+        # bulk_create não passa por save(): o contador fica desatualizado
+        InscricaoEvento.objects.bulk_create([
+            InscricaoEvento(evento=self.evento, inscrito=self.aluno),
+            InscricaoEvento(evento=self.evento, inscrito=self.org),
+        ])
+        saida = StringIO()
+        call_command('reconciliar_inscritos', '--dry-run', stdout=saida)
+        self.evento.refresh_from_db()
+        self.assertEqual(self.evento.inscritos_count, 0)
+        self.assertIn(f'Evento {self.evento.id}: contador 0, inscrições 2', saida.getvalue())
+
+        call_command('reconciliar_inscritos', stdout=StringIO())
+        self.evento.refresh_from_db()
+        self.assertEqual(self.evento.inscritos_count, 2)
+
+    def test_inscrever_reserva_vaga_sem_sobrevenda(self):
+        from eventos.models import EventoLotado
+        from eventos.services import inscrever
+        self.evento.quantidade_participantes = 1
+        self.evento.save()
+        inscricao, criada = inscrever(self.evento, self.aluno)
+        self.assertTrue(criada)
+        with self.assertRaises(EventoLotado):
+            inscrever(self.evento, self.org)
+        # repetir a inscrição devolve a existente sem ocupar outra vaga
+        self.assertEqual(inscrever(self.evento, self.aluno), (inscricao, False))
+        self.evento.refresh_from_db()
+        self.assertEqual(self.evento.inscritos_count, 1)
+
+    def test_inscricao_duplicada_desfaz_reserva(self):
+        from django.db import IntegrityError, transaction
+        InscricaoEvento.objects.create(evento=self.evento, inscrito=self.aluno)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            InscricaoEvento.objects.create(evento=self.evento, inscrito=self.aluno)
+        self.evento.refresh_from_db()
+        self.assertEqual(self.evento.inscritos_count, 1)
+
+    def _lotar_evento(self):
+        """
+        Evento com 1 vaga ocupada pelo aluno e dois usuários para a fila.
+        """
+        self.evento.quantidade_participantes = 1
+        self.evento.save()
+        InscricaoEvento.objects.create(evento=self.evento, inscrito=self.aluno)
+        esperando = []
+        for i in (2, 3):
+            user = User.objects.create_user(username=f'aluno{i}', password='pass')
+            esperando.append(Usuario.objects.create(
+                nome=f'Aluno {i}', tipo=self.tipo_aluno, nome_usuario=f'aluno{i}', user=user, email=f'aluno{i}@example.com',
+            ))
+        return esperando
+
+    def test_evento_lotado_coloca_na_lista_de_espera(self):
+        from eventos.models import ListaEsperaEvento
+        from eventos.services import posicao_lista_espera
+        primeiro, segundo = self._lotar_evento()
+        for usuario in (primeiro, segundo, primeiro):
+            self.client.login(username=usuario.nome_usuario, password='pass')
+            resp = self.client.post(reverse('inscrever_evento', args=[self.evento.id]))
+            self.assertRedirects(resp, reverse('detalhe_evento', args=[self.evento.id]), fetch_redirect_response=False)
+        self.assertEqual(ListaEsperaEvento.objects.filter(evento=self.evento).count(), 2)
+        self.assertEqual(posicao_lista_espera(self.evento, primeiro), 1)
+        self.assertEqual(posicao_lista_espera(self.evento, segundo), 2)
+        self.assertContains(self.client.get(reverse('detalhe_evento', args=[self.evento.id])), 'lista de espera (posição 1)')
+
+        self.client.login(username='aluno2', password='pass')
+        self.client.post(reverse('sair_lista_espera', args=[self.evento.id]))
+        self.assertIsNone(posicao_lista_espera(self.evento, primeiro))
+        self.assertEqual(posicao_lista_espera(self.evento, segundo), 1)
+
+    @patch('notifications.services._entregar_ao_worker')
+    def test_cancelamento_promove_cabeca_da_fila(self, entregar):
+        from eventos.models import ListaEsperaEvento
+        from eventos.services import entrar_lista_espera
+        from notifications.models import EmailJob
+        primeiro, segundo = self._lotar_evento()
+        entrar_lista_espera(self.evento, primeiro)
+        entrar_lista_espera(self.evento, segundo)
+
+        self.client.login(username='aluno1', password='pass')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('cancelar_inscricao', args=[self.evento.id]))
+
+        self.assertTrue(InscricaoEvento.objects.filter(evento=self.evento, inscrito=primeiro).exists())
+        self.assertEqual(list(ListaEsperaEvento.objects.filter(evento=self.evento).values_list('inscrito', flat=True)), [segundo.id])
+        self.evento.refresh_from_db()
+        self.assertEqual(self.evento.inscritos_count, 1)
+        job = EmailJob.objects.get(to_email='aluno2@example.com', subject__startswith='Sua vaga foi confirmada')
+        self.assertEqual(job.priority, EmailJob.PRIORITY_HIGH)
+        entregar.assert_any_call([job.pk], EmailJob.PRIORITY_HIGH)
+        self.assertFalse(EmailJob.objects.filter(to_email='aluno3@example.com', subject__startswith='Sua vaga').exists())
+
+    def test_salvar_evento_nao_sobrescreve_contadores(self):
+        evento = Evento.objects.get(pk=self.evento.pk)
+        InscricaoEvento.objects.create(evento=self.evento, inscrito=self.aluno)
+        evento.titulo = 'Teste Evento Editado'
+        evento.save()
+        evento.refresh_from_db()
+        self.assertEqual((evento.titulo, evento.inscritos_count), ('Teste Evento Editado', 1))
+
+    def test_inscrito_em_evento_lotado_nao_entra_na_lista_de_espera(self):
+        from eventos.models import JaInscrito, ListaEsperaEvento
+        from eventos.services import entrar_lista_espera
+        self._lotar_evento()
+        self.client.login(username='aluno1', password='pass')
+        resp = self.client.post(reverse('inscrever_evento', args=[self.evento.id]), follow=True)
+        self.assertContains(resp, 'Você já está inscrito')
+        self.assertFalse(ListaEsperaEvento.objects.filter(evento=self.evento).exists())
+        with self.assertRaises(JaInscrito):
+            entrar_lista_espera(self.evento, self.aluno)
+        self.evento.refresh_from_db()
+        self.assertEqual((self.evento.inscritos_count, self.evento.espera_ultima_posicao), (1, 0))
+
+    def test_vaga_liberada_antes_da_fila_vira_inscricao(self):
+        from eventos.models import ListaEsperaEvento
+        from eventos.services import cancelar_inscricao, entrar_lista_espera
+        primeiro, _segundo = self._lotar_evento()
+        # o cancelamento não encontra ninguém na fila e a vaga fica livre
+        self.assertEqual(cancelar_inscricao(self.evento, self.aluno)[1], [])
+
+        entrada, criada = entrar_lista_espera(self.evento, primeiro)
+
+        self.assertTrue(criada)
+        self.assertIsInstance(entrada, InscricaoEvento)
+        self.assertFalse(ListaEsperaEvento.objects.filter(evento=self.evento).exists())
+        self.evento.refresh_from_db()
+        self.assertEqual(self.evento.inscritos_count, 1)
@@ -93,26 +93,74 @@ class EventFlowTests(TestCase):
             InscricaoEvento.objects.filter(evento=self.evento, inscrito=self.aluno).exists()
         )
 
-    @patch('usuarios.generator.generate_certificates_for_event')
-    def test_finalizar_calls_generate(self, mock_call):
+    @patch('usuarios.jobs.dispatch_job')
+    def test_finalizar_agenda_job_de_certificados(self, mock_dispatch):
         """
         Testa o endpoint de finalizar evento:
         - cria inscrição validada
         - login do organizador
         - envia POST para finalizar
-        - verifica se comando de gerar certificados foi chamado
+        - verifica se o job de certificados foi criado e despachado após o commit
         """
+        from usuarios.models import CertificateBatchJob
+
         # cria inscrição já validada
         InscricaoEvento.objects.create(evento=self.evento, inscrito=self.aluno, is_validated=True)
 
         # login do organizador
         self.client.login(username='org1', password='pass')
         url = reverse('finalizar_evento', args=[self.evento.id])
-        resp = self.client.post(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(url)
         self.assertEqual(resp.status_code, 302)
 
-        # verifica se a função generate_certificates_for_event foi chamada
-        mock_call.assert_called_with(self.evento.id)
+        # evento finalizado e job registrado com o total de inscrições validadas
+        self.evento.refresh_from_db()
+        self.assertTrue(self.evento.finalizado)
+        job = CertificateBatchJob.objects.get(evento=self.evento)
+        self.assertEqual(job.total, 1)
+        mock_dispatch.assert_called_with(job.id)
+
+        # progresso disponível para a tela de gerenciamento
+        resp = self.client.get(reverse('progresso_certificados', args=[self.evento.id]))
+        self.assertEqual(resp.json()['total'], 1)
+
+    def test_exportar_certificados_zip(self):
+        """
+        Testa a exportação dos certificados em ZIP:
+        - aluno não tem acesso
+        - organizador recebe um ZIP (em streaming) com os PDFs armazenados sem compressão
+        """
+        import shutil
+        import tempfile
+        import zipfile
+        from django.test import override_settings
+
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.evento.finalizado = True
+        self.evento.save()
+
+        with override_settings(MEDIA_ROOT=media_root):
+            Certificado.objects.create(
+                usuario=self.aluno, evento=self.evento, nome='Teste',
+                pdf=SimpleUploadedFile('a.pdf', b'%PDF-1.4 aluno', content_type='application/pdf'),
+            )
+            url = reverse('exportar_certificados_zip', args=[self.evento.id])
+
+            self.client.login(username='aluno1', password='pass')
+            self.assertEqual(self.client.get(url).status_code, 302)
+
+            self.client.login(username='org1', password='pass')
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            self.assertTrue(resp.streaming)
+            conteudo = b''.join(resp.streaming_content)
+
+        with zipfile.ZipFile(io.BytesIO(conteudo)) as zf:
+            self.assertEqual(zf.namelist(), ['aluno_aluno1.pdf'])
+            self.assertEqual(zf.getinfo('aluno_aluno1.pdf').compress_type, zipfile.ZIP_STORED)
+            self.assertEqual(zf.read('aluno_aluno1.pdf'), b'%PDF-1.4 aluno')
 
     def test_pegar_certificado_redirects_to_pdf(self):
         """
@@ -5,6 +5,12 @@ urlpatterns = [
     # Página inicial do app: lista resumida de eventos (root do app)
     path('', views.lista_eventos, name='lista_eventos_root'),
 
+    # Eventos do calendário em um período (?start=&end=), JSON com ETag e cache público
+    path('calendario.json', views.calendario_json, name='calendario_json'),
+
+    # Eventos do período em que o usuário está inscrito (JSON privado)
+    path('calendario/inscricoes.json', views.calendario_inscricoes, name='calendario_inscricoes'),
+
     # Criação de evento (somente para organizadores)
     path('criar/', views.criar_evento, name='criar_evento'),
 
@@ -24,15 +30,24 @@ urlpatterns = [
     # Cancelamento de inscrição em evento
     path('cancelar/<int:evento_id>/', views.cancelar_inscricao, name='cancelar_inscricao'),
 
+    # Saída da lista de espera de evento lotado
+    path('espera/sair/<int:evento_id>/', views.sair_espera, name='sair_lista_espera'),
+
     # Galeria geral de eventos (thumbnails)
     path('galeria/', views.galeria, name='galeria'),
 
     # Gerenciamento do evento (somente para organizador)
     path('gerenciar/<int:evento_id>/', views.gerenciar_evento, name='gerenciar_evento'),
 
+    # Exportação dos certificados do evento em ZIP (somente para organizador)
+    path('gerenciar/<int:evento_id>/certificados.zip', views.exportar_certificados_zip, name='exportar_certificados_zip'),
+
     # Finalização de evento (marca como finalizado e publica certificados)
     path('finalizar/<int:evento_id>/', views.finalizar_evento, name='finalizar_evento'),
 
+    # Progresso da geração de certificados (JSON consultado pela tela de gerenciamento)
+    path('finalizar/<int:evento_id>/progresso/', views.progresso_certificados, name='progresso_certificados'),
+
     # Pegar certificado (download) de um evento
     path('pegar/<int:evento_id>/', views.pegar_certificado, name='pegar_certificado'),
 
@@ -11,6 +11,8 @@ Responsabilidades principais:
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import JsonResponse, HttpResponseForbidden
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_GET
 from django.contrib import messages
 from django.urls import reverse
 from django.contrib.auth.decorators import login_required
@@ -19,11 +21,16 @@ import json
 from django.conf import settings
 import os
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+from datetime import date, timedelta
 import logging
 from eventos.models import Evento
 from django.utils.text import slugify
 from usuarios.models import Usuario
-from .models import Evento, InscricaoEvento
+from .models import Evento, EventoLotado, InscricaoEvento, JaInscrito
+from .services import inscrever, cancelar_inscricao as cancelar, entrar_lista_espera, posicao_lista_espera, promover_lista_espera, sair_lista_espera
 from .forms import EventoForm
 from usuarios.views import get_current_usuario
 from instituicao_ensino.views import nav_items
@@ -116,15 +123,121 @@ def criar_evento(request):
 # -------------------------------------------------------------------
 # Lista de eventos para inscrição - OTIMIZADA COM PAGINAÇÃO
 # -------------------------------------------------------------------
+# Colunas lidas para o calendário (sem descrição, thumb, link etc.)
+_CAMPOS_CALENDARIO = (
+    'id', 'titulo', 'data_inicio', 'data_fim', 'horario', 'local',
+    'quantidade_participantes', 'sem_limites', 'finalizado', 'criador', 'inscritos_count',
+)
+# Maior período aceito por calendario_json
+_MAX_DIAS_CALENDARIO = 400
+
+
+def _mes_pedido(request):
+    """
+    Mês visível pedido em ?ano=&mes= (mes de 1 a 12), ou o mês atual.
+    """
+    hoje = timezone.localdate()
+    try:
+        ano = int(request.GET.get('ano', hoje.year))
+        mes = int(request.GET.get('mes', hoje.month))
+        date(ano, mes, 1)
+    except (TypeError, ValueError):
+        return hoje.year, hoje.month
+    return ano, mes
+
+
+def _janela_calendario(ano, mes):
+    """
+    Datas cobertas pelo calendário para o mês visível: do primeiro dia do mês
+    anterior ao último dia do mês seguinte (a grade mensal mostra a ponta dos
+    meses vizinhos).
+    """
+    inicio = (date(ano, mes, 1) - timedelta(days=1)).replace(day=1)
+    seguinte = date(ano + mes // 12, mes % 12 + 1, 1)
+    fim = date(seguinte.year + seguinte.month // 12, seguinte.month % 12 + 1, 1) - timedelta(days=1)
+    return inicio, fim
+
+
+def _periodo_pedido(request):
+    """
+    Período pedido em ?start=&end= (datas ISO, inclusive; a parte de hora, se
+    enviada, é ignorada). Sem parâmetros, usa a janela do mês atual.
+    Levanta ValueError para datas inválidas, invertidas ou períodos longos demais.
+    """
+    start, end = request.GET.get('start'), request.GET.get('end')
+    if not start and not end:
+        hoje = timezone.localdate()
+        return _janela_calendario(hoje.year, hoje.month)
+    if not start or not end:
+        raise ValueError('Informe start e end.')
+    inicio, fim = date.fromisoformat(start[:10]), date.fromisoformat(end[:10])
+    if fim < inicio:
+        raise ValueError('end anterior a start.')
+    if (fim - inicio).days > _MAX_DIAS_CALENDARIO:
+        raise ValueError(f'Período acima de {_MAX_DIAS_CALENDARIO} dias.')
+    return inicio, fim
+
+
+def _eventos_no_periodo(inicio, fim):
+    return Evento.objects.filter(data_inicio__lte=fim, data_fim__gte=inicio)
+
+
+def _etag_calendario(inicio, fim):
+    """
+    ETag fraca do período: última alteração, quantidade de eventos e de
+    inscrições (estas mudam a disponibilidade) dos eventos do período.
+    """
+    resumo = _eventos_no_periodo(inicio, fim).aggregate(
+        ultima=Max('atualizado_em'), total=Count('id'), inscritos=Sum('inscritos_count'),
+    )
+    ultima = resumo['ultima'].timestamp() if resumo['ultima'] else 0
+    return f'W/"{inicio:%Y%m%d}-{fim:%Y%m%d}-{ultima:.6f}-{resumo["total"]}-{resumo["inscritos"] or 0}"'
+
+
+def _eventos_calendario(inicio, fim):
+    """
+    Registros compactos dos eventos que ocorrem entre `inicio` e `fim`, lidos em
+    uma única consulta (só as colunas usadas; inscritos vêm de `inscritos_count`).
+    Não dependem do usuário: a marcação de inscrito vem de `calendario_inscricoes`.
+    """
+    eventos = (
+        _eventos_no_periodo(inicio, fim)
+        .only(*_CAMPOS_CALENDARIO)
+        .order_by('data_inicio', 'id')
+    )
+    eventos_calendario = []
+    for evento in eventos:
+        disponivel = (evento.sem_limites or (
+            evento.quantidade_participantes and
+            evento.quantidade_participantes > evento.inscritos_count
+        )) and not evento.finalizado
+        eventos_calendario.append({
+            'id': evento.id,
+            'titulo': evento.titulo[:20],
+            'data_inicio': evento.data_inicio.strftime('%Y-%m-%d'),
+            'data_fim': evento.data_fim.strftime('%Y-%m-%d') if evento.data_fim else None,
+            'disponivel': bool(disponivel),
+            'horario': evento.horario.strftime('%H:%M') if evento.horario else "",
+            'local': evento.local or 'Online',
+            'criador_id': evento.criador_id,
+        })
+    return eventos_calendario
+
+
 def lista_eventos(request):
     """
     Lista todos os eventos disponíveis para inscrição, com paginação e calendário.
     Mostra também os eventos em que o usuário já está inscrito.
+
+    O calendário começa no mês pedido em ?ano=&mes= e busca os eventos em
+    `calendario_json` (compartilhável em cache) e as inscrições do usuário em
+    `calendario_inscricoes`. O número de consultas da página não cresce com a
+    quantidade de eventos.
     """
     usuario = get_current_usuario(request)
     
-    # 1. BUSCA TODOS OS EVENTOS (passados, presentes e futuros)
-    todos_eventos = Evento.objects.all().order_by('finalizado', 'data_inicio')
+    # 1. BUSCA TODOS OS EVENTOS (passados, presentes e futuros); inscritos vêm de inscritos_count
+    todos_eventos = Evento.objects.order_by('finalizado', 'data_inicio')
 
     # 2. PAGINAÇÃO - 10 eventos por página
     paginator = Paginator(todos_eventos, 10)
@@ -143,42 +256,64 @@ def lista_eventos(request):
         usuario_inscricoes = list(InscricaoEvento.objects.filter(inscrito=usuario)
                                     .values_list('evento_id', flat=True))
 
-    # 4. Prepara dados do calendário APENAS DOS EVENTOS DA PÁGINA ATUAL
-    eventos_calendario = []
-    for evento in todos_eventos:  # Agora só itera sobre eventos da página atual
-        # Verifica disponibilidade
-        inscritos = evento.inscricaoevento_set.count()
-        disponivel = (evento.sem_limites or (
-            evento.quantidade_participantes and 
-            evento.quantidade_participantes > inscritos
-        )) and evento.finalizado == False
-        inscrito = usuario and evento.id in usuario_inscricoes
-        
-        # Prepara horário formatado
-        horario_formatado = evento.horario.strftime('%H:%M') if evento.horario else ""
-        
-        evento_data = {
-            'id': evento.id,
-            'titulo': evento.titulo[:20],
-            'data_inicio': evento.data_inicio.strftime('%Y-%m-%d'),
-            'data_fim': evento.data_fim.strftime('%Y-%m-%d') if evento.data_fim else None,
-            'disponivel': disponivel,
-            'inscrito': inscrito,
-            'horario': horario_formatado,
-            'local': evento.local or 'Online',
-            'criador_id': evento.criador.id if evento.criador else None,
-        }
-        eventos_calendario.append(evento_data)
-
-    # 5. ENVIA PARA O TEMPLATE
+    # 4. ENVIA PARA O TEMPLATE (o calendário busca seus dados por JSON)
+    ano, mes = _mes_pedido(request)
     return render(request, 'eventos/inscrever_evento.html', {
         'eventos': eventos,                 # Para os CARDS (já paginado)
         'usuario': usuario,
         'usuario_inscricoes': usuario_inscricoes,
-        'eventos_calendario': eventos_calendario, # Para o CALENDÁRIO
-        'eventos_calendario_json': json.dumps(eventos_calendario, ensure_ascii=False),
+        'calendario_mes': date(ano, mes, 1),
     })
 
+
+@require_GET
+def calendario_json(request):
+    """
+    Retorna em JSON os eventos do período ?start=&end= para o calendário.
+
+    A resposta é igual para todos os usuários: leva uma ETag fraca
+    (`_etag_calendario`), responde 304 a `If-None-Match` correspondente e pode
+    ficar em caches públicos por `settings.EVENTOS_CALENDARIO_MAX_AGE` segundos.
+    """
+    try:
+        inicio, fim = _periodo_pedido(request)
+    except ValueError as e:
+        return JsonResponse({'detail': str(e)}, status=400)
+
+    etag = _etag_calendario(inicio, fim)
+    resposta = get_conditional_response(request, etag=etag)
+    if resposta is None:
+        resposta = JsonResponse({
+            'start': inicio.isoformat(),
+            'end': fim.isoformat(),
+            'eventos': _eventos_calendario(inicio, fim),
+        })
+        resposta['ETag'] = etag
+    patch_cache_control(resposta, public=True, max_age=getattr(settings, 'EVENTOS_CALENDARIO_MAX_AGE', 60))
+    return resposta
+
+
+@require_GET
+def calendario_inscricoes(request):
+    """
+    Retorna em JSON os IDs dos eventos do período ?start=&end= em que o usuário
+    está inscrito (lista vazia para visitantes). Resposta privada, sem cache.
+    """
+    try:
+        inicio, fim = _periodo_pedido(request)
+    except ValueError as e:
+        return JsonResponse({'detail': str(e)}, status=400)
+
+    usuario = get_current_usuario(request)
+    inscritos = []
+    if usuario:
+        inscritos = list(InscricaoEvento.objects.filter(
+            inscrito=usuario, evento__data_inicio__lte=fim, evento__data_fim__gte=inicio,
+        ).values_list('evento_id', flat=True))
+    resposta = JsonResponse({'inscritos': inscritos})
+    patch_cache_control(resposta, private=True, no_cache=True)
+    return resposta
+
 # -------------------------------------------------------------------
 # Meus eventos (organizador ou participante)
 # -------------------------------------------------------------------
@@ -224,7 +359,10 @@ def meus_eventos(request):
                         ev = form.save(commit=False)
                         ev.criador = evento_selecionado.criador
                         ev.gallery_slug = ev.get_gallery_name()
-                        ev.save()
+                        with transaction.atomic():
+                            ev.save()
+                            # Vagas abertas pela edição vão para a lista de espera
+                            promover_lista_espera(ev)
                         try:
                             log_audit(request=request, usuario=usuario, action='update_event', object_type='Evento', object_id=ev.id, description=f'Evento atualizado: {ev.titulo}')
                         except Exception:
@@ -308,17 +446,141 @@ def gerenciar_evento(request, evento_id):
         'evento': evento,
         'inscritos': inscritos,
         'nav_items': nav_items,
-        'usuario': usuario
+        'usuario': usuario,
+        'certificate_job': evento.certificate_jobs.order_by('-created_at').first(),
     })
 
+# -------------------------------------------------------------------
+# Exportar certificados do evento (ZIP em streaming)
+# -------------------------------------------------------------------
+# Tamanho dos blocos lidos de cada PDF e enviados ao cliente
+ZIP_CHUNK_SIZE = 64 * 1024
+
+
+class _ZipStreamBuffer:
+    """
+    Destino não pesquisável (sem seek) para o `zipfile`: acumula os bytes
+    escritos até serem consumidos pelo gerador da resposta.
+    O `zipfile` detecta a ausência de seek e grava descritores de dados após
+    cada arquivo, de modo que nada precisa ser reescrito.
+    """
+
+    def __init__(self):
+        self._partes = []
+        self._posicao = 0
+
+    def write(self, data):
+        self._partes.append(bytes(data))
+        self._posicao += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._posicao
+
+    def flush(self):
+        pass
+
+    def consumir(self):
+        dados = b''.join(self._partes)
+        self._partes = []
+        return dados
+
+
+def _stream_zip(arquivos):
+    """
+    Gera o conteúdo de um ZIP em blocos, a partir de (nome no zip, caminho).
+    Os arquivos são armazenados sem recompressão (ZIP_STORED) e lidos em
+    blocos de ZIP_CHUNK_SIZE: a memória usada não depende do tamanho do evento.
+    """
+    import zipfile
+    from datetime import datetime
+
+    buffer = _ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for nome, caminho in arquivos:
+            try:
+                info = os.stat(caminho)
+                origem = open(caminho, 'rb')
+            except OSError:
+                continue  # arquivo removido entre a consulta e a leitura
+            zinfo = zipfile.ZipInfo(nome, date_time=datetime.fromtimestamp(info.st_mtime).timetuple()[:6])
+            zinfo.compress_type = zipfile.ZIP_STORED
+            zinfo.external_attr = 0o644 << 16
+            zinfo.file_size = info.st_size
+            with origem, zf.open(zinfo, mode='w', force_zip64=info.st_size >= zipfile.ZIP64_LIMIT) as destino:
+                while True:
+                    bloco = origem.read(ZIP_CHUNK_SIZE)
+                    if not bloco:
+                        break
+                    destino.write(bloco)
+                    yield buffer.consumir()
+            yield buffer.consumir()
+    # Diretório central, gravado ao fechar o ZipFile
+    yield buffer.consumir()
+
+
+def _arquivos_certificados(evento):
+    """
+    Percorre os PDFs de certificados do evento como (nome no zip, caminho),
+    carregando os registros do banco em blocos.
+    """
+    from usuarios.models import Certificado
+
+    certificados = (
+        Certificado.objects.filter(evento=evento)
+        .exclude(pdf='').exclude(pdf__isnull=True)
+        .select_related('usuario')
+        .only('pdf', 'usuario__nome', 'usuario__nome_usuario')
+        .order_by('usuario__nome')
+    )
+    for cert in certificados.iterator(chunk_size=500):
+        try:
+            caminho = cert.pdf.path
+        except Exception:
+            continue
+        nome = f"{slugify(cert.usuario.nome) or 'participante'}_{cert.usuario.nome_usuario}.pdf"
+        yield nome, caminho
+
+
+@login_required
+def exportar_certificados_zip(request, evento_id):
+    """
+    Baixa um ZIP com os certificados (PDF) de todos os participantes do evento.
+    Apenas o organizador pode acessar. O arquivo é montado em streaming.
+    """
+    from django.http import StreamingHttpResponse
+
+    usuario = get_current_usuario(request)
+    evento = get_object_or_404(Evento, pk=evento_id)
+
+    if not _is_event_owner(request, usuario, evento):
+        logging.warning(f'Permissão negada exportar_certificados_zip: evento={evento.id} usuario={getattr(usuario, "id", None)}')
+        messages.error(request, 'Acesso negado: apenas o organizador pode exportar os certificados.')
+        return redirect('meus_eventos')
+
+    if not evento.finalizado:
+        messages.error(request, 'Evento ainda não finalizado. Certificados indisponíveis.')
+        return redirect('gerenciar_evento', evento_id=evento.id)
+
+    try:
+        log_audit(request=request, usuario=usuario, action='export_certificates', object_type='Evento', object_id=evento.id, description=f'Exportação dos certificados do evento {evento.id}')
+    except Exception:
+        pass
+
+    response = StreamingHttpResponse(_stream_zip(_arquivos_certificados(evento)), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="certificados_{slugify(evento.titulo) or evento.id}.zip"'
+    return response
+
+
 # -------------------------------------------------------------------
 # Finalizar evento
 # -------------------------------------------------------------------
 @login_required
 def finalizar_evento(request, evento_id):
     """
-    Finaliza o evento, gera certificados para os participantes e notifica por e-mail.
-    Utiliza fallback HTML se bibliotecas de geração de PDF/PNG não estiverem disponíveis.
+    Finaliza o evento e agenda a geração dos certificados em background.
+    Cria um CertificateBatchJob, que gera os certificados em lotes e notifica os
+    participantes por e-mail; a view retorna imediatamente.
     Apenas o organizador pode finalizar.
     """
     usuario = get_current_usuario(request)
@@ -327,56 +589,57 @@ def finalizar_evento(request, evento_id):
         messages.error(request, 'Acesso negado: apenas o organizador pode finalizar este evento.')
         return redirect('meus_eventos')
 
-    evento.finalizado = True
-    evento.save()
+    from django.db import transaction
+    from usuarios.jobs import criar_job, dispatch_job
+
+    with transaction.atomic():
+        evento.finalizado = True
+        evento.save()
+        job = criar_job(evento)
+        # Inicia o processamento só depois que o job estiver gravado no banco
+        transaction.on_commit(lambda: dispatch_job(job.id))
 
+    messages.success(request, f'Evento finalizado. Gerando {job.total} certificado(s) em segundo plano.')
     try:
-        from usuarios.generator import generate_certificates_for_event
-        generated = generate_certificates_for_event(evento.id)
-        messages.success(request, f'Evento finalizado e certificados gerados: {generated}.')
+        log_audit(request=request, usuario=usuario, action='generate_certificates', object_type='Evento', object_id=evento.id, description=f'Geração de certificados agendada (job {job.id}, {job.total} inscrições)')
+    except Exception:
+        pass
 
-        # Notificar participantes por email (fila de notificações)
-        inscricoes_all = evento.inscricaoevento_set.select_related('inscrito')
-        try:
-            from notifications.services import queue_certificate_ready_email
-            from usuarios.models import Certificado
-            for ins in inscricoes_all:
-                try:
-                    cert = Certificado.objects.filter(usuario=ins.inscrito, evento=evento).first()
-                    if cert:
-                        queue_certificate_ready_email(ins.inscrito, cert, evento, send_now=True)
-                except Exception:
-                    continue
-        except Exception:
-            # fallback silencioso se serviço de notificações indisponível
-            pass
-        try:
-            log_audit(request=request, usuario=usuario, action='generate_certificates', object_type='Evento', object_id=evento.id, description=f'Certificados gerados: {generated}')
-        except Exception:
-            pass
-    except ImportError:
-        from usuarios.models import Certificado
-        from usuarios.utils import render_and_save_html_certificate, create_user_dirs
-        for ins in evento.inscricaoevento_set.select_related('inscrito'):
-            display_name = f"{evento.titulo} - {evento.data_inicio.strftime('%Y-%m-%d') if evento.data_inicio else ''}"
-            try:
-                create_user_dirs(ins.inscrito)
-            except Exception:
-                pass
-            cert, created = Certificado.objects.get_or_create(usuario=ins.inscrito, evento=evento, nome=display_name)
-            try:
-                render_and_save_html_certificate(cert, evento, ins.inscrito)
-            except Exception:
-                pass
-        logging.error(f'Erro ao gerar certificados na finalização do evento {evento.id}: bibliotecas ausentes')
-        messages.error(request, 'Evento finalizado, mas falta biblioteca para geração; placeholders/HTML criados quando possível.')
-        try:
-            log_audit(request=request, usuario=usuario, action='generate_certificates_fallback', object_type='Evento', object_id=evento.id, description='Certificados gerados via fallback na finalização')
-        except Exception:
-            pass
+    return redirect('gerenciar_evento', evento_id=evento.id)
 
 
-    return redirect('gerenciar_evento', evento_id=evento.id)
+# -------------------------------------------------------------------
+# Progresso da geração de certificados (consultado pela tela de gerenciamento)
+# -------------------------------------------------------------------
+@login_required
+def progresso_certificados(request, evento_id):
+    """
+    Retorna em JSON o progresso do job de certificados mais recente do evento.
+    Se o job estiver interrompido (servidor reiniciado), o processamento é retomado.
+    """
+    usuario = get_current_usuario(request)
+    evento = get_object_or_404(Evento, pk=evento_id)
+    if not _is_event_owner(request, usuario, evento):
+        return JsonResponse({'detail': 'Acesso negado.'}, status=403)
+
+    from usuarios.jobs import is_stale, dispatch_job
+    job = evento.certificate_jobs.order_by('-created_at').first()
+    if not job:
+        return JsonResponse({'status': None})
+
+    if job.is_active and is_stale(job):
+        dispatch_job(job.id)
+
+    return JsonResponse({
+        'id': job.id,
+        'status': job.status,
+        'total': job.total,
+        'done': job.done,
+        'failed': job.failed,
+        'percent': job.percent,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    })
 
 
 # -------------------------------------------------------------------
@@ -395,8 +658,8 @@ def pegar_certificado(request, evento_id):
     2. Verifica se está inscrito no evento.
     3. Verifica se o evento foi finalizado.
     4. Verifica se inscrição foi aprovada.
-    5. Se certificado existe e arquivo físico existe -> retorna.
-    6. Se não existe -> gera certificado, salva, e retorna.
+    5. Se certificado existe, arquivo físico existe e as entradas não mudaram -> retorna.
+    6. Se não existe (ou mudou) -> gera certificado, salva, e retorna.
     """
 
     usuario = get_current_usuario(request)
@@ -423,79 +686,39 @@ def pegar_certificado(request, evento_id):
         return redirect('detalhe_evento', evento_id=evento.id)
 
     # -------------------------------------------------------------------
-    # Diretórios e nomes corretos
-    # -------------------------------------------------------------------
-    pasta_usuario = f"{usuario.nome_usuario}_{getattr(usuario, 'instituicao', 'sem_instituicao')}"
-    cert_dir = os.path.join(settings.MEDIA_ROOT, 'usuarios', pasta_usuario, 'certificados')
-    os.makedirs(cert_dir, exist_ok=True)
-
-    nome_base = f"{slugify(evento.titulo)}_{evento.data_fim.strftime('%Y_%m_%d') if evento.data_fim else 'sem_data'}"
-    pdf_path = os.path.join(cert_dir, f"{nome_base}.pdf")
-    png_path = os.path.join(cert_dir, f"{nome_base}.png")
-
-    # -------------------------------------------------------------------
-    # Certificado existente no DB
+    # Certificado do participante: reaproveitado se as entradas não mudaram
+    # (impressão digital igual e PDF em disco), senão gerado/regerado agora
     # -------------------------------------------------------------------
     from usuarios.models import Certificado
-    cert = Certificado.objects.filter(usuario=usuario, evento=evento).first()
+    existente = Certificado.objects.filter(usuario=usuario, evento=evento).values_list('fingerprint', flat=True).first()
 
-    # Se arquivo já existe no disco, abre direto
-    if cert and cert.pdf and os.path.exists(cert.pdf.path):
-        try:
-            log_audit(request=request, usuario=usuario, action='download_certificate', object_type='Certificado', object_id=cert.id, description=f'Certificado baixado (existente) para evento {evento.id}')
-        except Exception:
-            pass
-        return FileResponse(open(cert.pdf.path, 'rb'), content_type='application/pdf')
-
-    # -------------------------------------------------------------------
-    # Gerar certificado se não existir
-    # -------------------------------------------------------------------
     try:
-        from usuarios.generator import generate_certificates_for_event
-        generate_certificates_for_event(evento.id)
-        cert = Certificado.objects.filter(usuario=usuario, evento=evento).first()
-        if cert and cert.pdf and os.path.exists(cert.pdf.path):
-            try:
-                log_audit(request=request, usuario=usuario, action='generate_certificate', object_type='Certificado', object_id=cert.id, description=f'Certificado gerado via generator para evento {evento.id}')
-            except Exception:
-                pass
-            # Enfileira e-mail de certificado pronto para este usuário
+        # Gera apenas o certificado deste participante (não percorre o evento inteiro)
+        from usuarios.generator import generate_certificate_for_inscription
+        inscr.evento, inscr.inscrito = evento, usuario
+        cert = generate_certificate_for_inscription(inscr)
+    except Exception:
+        logging.exception(f'Falha ao gerar certificado: evento={evento.id} usuario={usuario.id}')
+        cert = None
+
+    if cert and cert.pdf and os.path.exists(cert.pdf.path):
+        if existente is not None and existente == cert.fingerprint:
             try:
-                from notifications.services import queue_certificate_ready_email
-                queue_certificate_ready_email(usuario, cert, evento, send_now=True)
+                log_audit(request=request, usuario=usuario, action='download_certificate', object_type='Certificado', object_id=cert.id, description=f'Certificado baixado (existente) para evento {evento.id}')
             except Exception:
                 pass
-            return FileResponse(open(cert.pdf.path, 'rb'), content_type='application/pdf')
-
-    except Exception:
-        # fallback HTML se generator profissional não estiver disponível
-        from usuarios.utils import render_and_save_html_certificate, create_user_dirs
-        create_user_dirs(usuario)
-
-        cert, created = Certificado.objects.get_or_create(
-            usuario=usuario,
-            evento=evento,
-            defaults={
-                'nome': f"{evento.titulo} - {evento.data_fim.strftime('%Y-%m-%d') if evento.data_fim else ''}"
-            }
-        )
-        render_and_save_html_certificate(cert, evento, usuario)
-
-        # Atualiza pdf/relpath
-        if os.path.exists(pdf_path):
-            cert.pdf.name = os.path.relpath(pdf_path, settings.MEDIA_ROOT)
-            cert.save(update_fields=['pdf'])
+        else:
             try:
-                log_audit(request=request, usuario=usuario, action='generate_certificate', object_type='Certificado', object_id=cert.id, description=f'Certificado gerado por fallback para evento {evento.id}')
+                log_audit(request=request, usuario=usuario, action='generate_certificate', object_type='Certificado', object_id=cert.id, description=f'Certificado gerado via generator para evento {evento.id}')
             except Exception:
                 pass
             # Enfileira e-mail de certificado pronto para este usuário
             try:
                 from notifications.services import queue_certificate_ready_email
-                queue_certificate_ready_email(usuario, cert, evento, send_now=True)
+                queue_certificate_ready_email(usuario, cert, evento)
             except Exception:
                 pass
-            return FileResponse(open(pdf_path, 'rb'), content_type='application/pdf')
+        return FileResponse(open(cert.pdf.path, 'rb'), content_type='application/pdf')
 
     # -------------------------------------------------------------------
     # Caso nada funcione
@@ -514,10 +737,12 @@ def detalhe_evento_publico(request, evento_id):
     evento = get_object_or_404(Evento, pk=evento_id)
     usuario = get_current_usuario(request)
     inscrito = evento.inscricaoevento_set.filter(inscrito=usuario).exists() if usuario else False
+    posicao_espera = posicao_lista_espera(evento, usuario) if usuario and not inscrito else None
     return render(request, 'eventos/detalhe_evento_publico.html', {
         'evento': evento,
         'usuario': usuario,
         'inscrito': inscrito,
+        'posicao_espera': posicao_espera,
         'nav_items': nav_items
     })
 
@@ -681,7 +906,8 @@ def galeria_evento(request, evento_id):
 def inscrever_evento(request, evento_id):
     """
     Permite que alunos e professores se inscrevam em eventos, respeitando o limite de vagas.
-    Cria a inscrição e registra auditoria.
+    Cria a inscrição (reserva atômica da vaga em `services.inscrever`) e registra auditoria.
+    Em eventos lotados, coloca o usuário na lista de espera.
     """
     usuario = get_current_usuario(request)
     evento = get_object_or_404(Evento, pk=evento_id)
@@ -691,13 +917,20 @@ def inscrever_evento(request, evento_id):
         messages.error(request, 'Apenas alunos e professores podem se inscrever em eventos.')
         return redirect('detalhe_evento', evento_id=evento.id)
 
-    # Verifica limite de vagas
-    if evento.quantidade_participantes and InscricaoEvento.objects.filter(evento=evento).count() >= evento.quantidade_participantes:
-        messages.error(request, 'Número máximo de participantes atingido.')
-        return redirect('detalhe_evento', evento_id=evento.id)
+    # Já inscrito: não ocupa vaga nem entra na lista de espera
+    if InscricaoEvento.objects.filter(evento=evento, inscrito=usuario).exists():
+        messages.info(request, f'Você já está inscrito no evento "{evento.titulo}".')
+        return redirect('lista_eventos')
+
+    # Verifica limite de vagas (leitura rápida; a reserva em si é atômica)
+    if evento.lotado():
+        return _entrar_lista_espera(request, usuario, evento)
 
     # Cria ou recupera a inscrição existente
-    inscr, created = InscricaoEvento.objects.get_or_create(inscrito=usuario, evento=evento)
+    try:
+        inscr, created = inscrever(evento, usuario)
+    except EventoLotado:
+        return _entrar_lista_espera(request, usuario, evento)
     if created:
         messages.success(request, f'Inscrição no evento "{evento.titulo}" realizada com sucesso.')
         try:
@@ -709,19 +942,53 @@ def inscrever_evento(request, evento_id):
 
     return redirect('lista_eventos')
 
+def _entrar_lista_espera(request, usuario, evento):
+    """
+    Evento lotado: coloca o usuário na lista de espera e informa a posição.
+    """
+    if evento.finalizado:
+        messages.error(request, 'Número máximo de participantes atingido.')
+        return redirect('detalhe_evento', evento_id=evento.id)
+    try:
+        entrada, criada = entrar_lista_espera(evento, usuario)
+    except JaInscrito:
+        messages.info(request, f'Você já está inscrito no evento "{evento.titulo}".')
+        return redirect('lista_eventos')
+    if isinstance(entrada, InscricaoEvento):
+        # Uma vaga foi liberada antes da entrada na fila
+        messages.success(request, f'Inscrição no evento "{evento.titulo}" realizada com sucesso.')
+        try:
+            log_audit(request=request, usuario=usuario, action='create_inscription', object_type='InscricaoEvento', object_id=entrada.id, description=f'Inscrição criada no evento {evento.id}')
+        except Exception:
+            pass
+        return redirect('lista_eventos')
+    posicao = posicao_lista_espera(evento, usuario)
+    if criada:
+        messages.info(request, f'Evento lotado. Você entrou na lista de espera na posição {posicao}; avisaremos por email se sua vaga for confirmada.')
+        try:
+            log_audit(request=request, usuario=usuario, action='create_waitlist', object_type='ListaEsperaEvento', object_id=entrada.id, description=f'Entrada na lista de espera do evento {evento.id}')
+        except Exception:
+            pass
+    else:
+        messages.info(request, f'Você já está na lista de espera deste evento (posição {posicao}).')
+    return redirect('detalhe_evento', evento_id=evento.id)
+
+
 @login_required
 def cancelar_inscricao(request, evento_id):
     """
     Permite ao usuário cancelar sua inscrição em um evento e registra auditoria.
+    A vaga liberada vai para a cabeça da lista de espera na mesma transação.
     """
     usuario = get_current_usuario(request)
     evento = get_object_or_404(Evento, pk=evento_id)
-    inscr = InscricaoEvento.objects.filter(inscrito=usuario, evento=evento).first()
+    inscr, promovidas = cancelar(evento, usuario)
     if inscr:
-        inscr.delete()
         messages.success(request, f'Inscrição no evento "{evento.titulo}" cancelada.')
         try:
             log_audit(request=request, usuario=usuario, action='delete_inscription', object_type='InscricaoEvento', object_id=getattr(inscr, 'id', None), description=f'Inscrição cancelada no evento {evento.id}')
+            for promovida in promovidas:
+                log_audit(request=request, usuario=promovida.inscrito, action='promote_waitlist', object_type='InscricaoEvento', object_id=promovida.id, description=f'Promovido da lista de espera do evento {evento.id}')
         except Exception:
             pass
     else:
@@ -729,6 +996,18 @@ def cancelar_inscricao(request, evento_id):
     return redirect('lista_eventos')
 
 
+@login_required
+def sair_espera(request, evento_id):
+    """
+    Remove o usuário da lista de espera do evento.
+    """
+    usuario = get_current_usuario(request)
+    evento = get_object_or_404(Evento, pk=evento_id)
+    if request.method == 'POST' and sair_lista_espera(evento, usuario):
+        messages.success(request, f'Você saiu da lista de espera do evento "{evento.titulo}".')
+    return redirect('detalhe_evento', evento_id=evento.id)
+
+
 # -------------------------------------------------------------------
 # Debug JSON (somente staff)
 # -------------------------------------------------------------------
@@ -747,7 +1026,7 @@ def debug_eventos(request, evento_id=None):
             'id': e.id,
             'titulo': e.titulo,
             'criador': getattr(e.criador, 'nome_usuario', 'N/A'),
-            'inscritos': e.inscricaoevento_set.count(),
+            'inscritos': e.inscritos_count,
             'finalizado': e.finalizado
         })
     try:
@@ -15,6 +15,8 @@ class AuditMiddleware:
     Regras:
     - Se a resposta for JsonResponse e o path contiver 'eventos' ou '/api/', registra a consulta.
     - Apenas adiciona um registro com método GET e parâmetros.
+    - Respostas públicas (Cache-Control: public, ex.: calendario.json) não são
+      auditadas: não dependem do usuário e ler a sessão as tornaria `Vary: Cookie`.
     - Nunca interrompe a requisição por falha de auditoria.
     """
     def __init__(self, get_response):
@@ -30,7 +32,7 @@ class AuditMiddleware:
         response = self.get_response(request)
 
         try:
-            if isinstance(response, JsonResponse):
+            if isinstance(response, JsonResponse) and 'public' not in response.get('Cache-Control', ''):
                 path = request.path.lower()
                 if 'eventos' in path or '/api/' in path:
                     user = None
@@ -235,6 +235,84 @@ EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', 'true').lower() in ('1', 'true', 'yes')
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'SGEA <no-reply@sgea.local>')
+# Timeout (s) das operações SMTP, para que uma sessão travada não prenda o worker
+EMAIL_TIMEOUT = int(os.environ.get('EMAIL_TIMEOUT', '30'))
+# Jobs de email reclamados e enviados por sessão SMTP no worker
+EMAIL_BATCH_SIZE = int(os.environ.get('EMAIL_BATCH_SIZE', '50'))
+# Segundos de ociosidade após os quais a conexão SMTP do worker é fechada e reaberta
+EMAIL_CONNECTION_IDLE_SECONDS = int(os.environ.get('EMAIL_CONNECTION_IDLE_SECONDS', '30'))
+# Intervalo (s) da varredura de segurança do worker no banco; fora dela o worker
+# só consulta o banco quando recebe jobs ou quando um envio agendado vence
+EMAIL_WORKER_SAFETY_SECONDS = int(os.environ.get('EMAIL_WORKER_SAFETY_SECONDS', '60'))
+# Jobs em 'sending' sem atualização há mais que isto (s) voltam para 'pending'
+# na varredura de segurança (processo do worker que morreu no meio do envio).
+# Deve ser maior que o tempo que um job leva na fila do processo e no envio.
+EMAIL_SENDING_TIMEOUT_SECONDS = int(os.environ.get('EMAIL_SENDING_TIMEOUT_SECONDS', '900'))
+# Jobs de email pendentes há mais que isto (s) são reclamados como prioridade
+# máxima, para que avisos em massa não fiquem presos atrás dos interativos
+EMAIL_PRIORITY_AGING_SECONDS = int(os.environ.get('EMAIL_PRIORITY_AGING_SECONDS', '300'))
+# Inicia o worker de email dentro do próprio processo Django. Sem a variável
+# (None), liga apenas no runserver, para que o ambiente local entregue emails
+# sem outro comando. Em produção use false e rode
+# `python manage.py run_notification_worker`.
+_email_worker_autostart = os.environ.get('EMAIL_WORKER_AUTOSTART', '').lower()
+EMAIL_WORKER_AUTOSTART = _email_worker_autostart in ('1', 'true', 'yes') if _email_worker_autostart else None
+# Processos e threads por processo do comando run_notification_worker
+EMAIL_WORKER_PROCESSES = int(os.environ.get('EMAIL_WORKER_PROCESSES', '1'))
+EMAIL_WORKER_THREADS = int(os.environ.get('EMAIL_WORKER_THREADS', '2'))
+# Porta HTTP de saúde/métricas do worker (0 = desligado; com vários processos,
+# o processo i usa porta + i)
+EMAIL_WORKER_HEALTH_PORT = int(os.environ.get('EMAIL_WORKER_HEALTH_PORT', '0'))
+# Tempo máximo (s) que a tela de recuperação de senha aguarda a confirmação de
+# envio do worker antes de responder (o email segue na fila depois disso)
+EMAIL_RECOVERY_WAIT_SECONDS = float(os.environ.get('EMAIL_RECOVERY_WAIT_SECONDS', '5'))
+# Cache em memória dos anexos de email (bytes no total e tamanho máximo por arquivo);
+# anexos maiores são codificados em blocos a cada envio
+EMAIL_ATTACHMENT_CACHE_BYTES = int(os.environ.get('EMAIL_ATTACHMENT_CACHE_BYTES', str(8 * 1024 * 1024)))
+EMAIL_ATTACHMENT_CACHE_MAX_FILE = int(os.environ.get('EMAIL_ATTACHMENT_CACHE_MAX_FILE', str(512 * 1024)))
+# Limite de envio por domínio do destinatário (mensagens/s, somando os processos
+# do worker) e rajada permitida. Taxas específicas: "ufpr.br=2,gmail.com=20"
+EMAIL_RATE_LIMIT_PER_SECOND = float(os.environ.get('EMAIL_RATE_LIMIT_PER_SECOND', '5'))
+EMAIL_RATE_LIMIT_BURST = int(os.environ.get('EMAIL_RATE_LIMIT_BURST', '10'))
+EMAIL_RATE_LIMITS = {
+    dominio.strip().lower(): float(taxa)
+    for dominio, _, taxa in (item.partition('=') for item in os.environ.get('EMAIL_RATE_LIMITS', '').split(','))
+    if dominio.strip() and taxa.strip()
+}
+# Espera máxima (s) de uma thread pelo limite de um domínio; acima disso o job volta para a fila
+EMAIL_RATE_MAX_WAIT_SECONDS = float(os.environ.get('EMAIL_RATE_MAX_WAIT_SECONDS', '2'))
+# Pausa de um domínio após recusa temporária (4xx): dobra a cada recusa seguida, até o máximo
+EMAIL_BACKOFF_BASE_SECONDS = int(os.environ.get('EMAIL_BACKOFF_BASE_SECONDS', '30'))
+EMAIL_BACKOFF_MAX_SECONDS = int(os.environ.get('EMAIL_BACKOFF_MAX_SECONDS', '3600'))
+# Por quanto tempo (s) desde a criação um job pode ser adiado por recusas
+# temporárias sem gastar tentativas
+EMAIL_DEFER_MAX_SECONDS = int(os.environ.get('EMAIL_DEFER_MAX_SECONDS', '86400'))
 
 # URL pública do site usada em emails e QR codes (definida no .env para produção)
 SITE_URL = os.environ.get('SITE_URL', '')
+
+# -------------------------------------------------------------------
+# Calendário de eventos
+# -------------------------------------------------------------------
+# Segundos que a resposta de /eventos/calendario.json pode ficar em caches
+# públicos antes de ser revalidada pela ETag
+EVENTOS_CALENDARIO_MAX_AGE = int(os.environ.get('EVENTOS_CALENDARIO_MAX_AGE', '60'))
+
+# -------------------------------------------------------------------
+# Geração de certificados
+# -------------------------------------------------------------------
+# Processos usados para renderizar certificados em paralelo (0 = número de CPUs)
+CERTIFICADOS_WORKERS = int(os.environ.get('CERTIFICADOS_WORKERS', '0'))
+# Inscrições por lote enviado a cada processo; eventos com um único lote são
+# renderizados no próprio processo, sem iniciar o pool
+CERTIFICADOS_CHUNK_SIZE = int(os.environ.get('CERTIFICADOS_CHUNK_SIZE', '50'))
+# Inscrições processadas por lote de um job de certificados (o cursor é salvo a cada lote)
+CERTIFICADOS_JOB_CHUNK_SIZE = int(os.environ.get('CERTIFICADOS_JOB_CHUNK_SIZE', '200'))
+# Segundos sem heartbeat após os quais um job em execução é considerado interrompido
+CERTIFICADOS_JOB_STALE_SECONDS = int(os.environ.get('CERTIFICADOS_JOB_STALE_SECONDS', '120'))
+# Formato do PDF dos certificados: 'vetorial' (desenhado com primitivas do
+# ReportLab, leve e nítido na impressão) ou 'raster' (PNG embutido na página)
+CERTIFICADOS_PDF_MODO = os.environ.get('CERTIFICADOS_PDF_MODO', 'vetorial')
+# Larguras (px) aceitas para as miniaturas do PNG gerado sob demanda na
+# pré-visualização do certificado (`?largura=` em /usuarios/certificado/<id>/png/)
+CERTIFICADOS_PNG_LARGURAS = [int(l) for l in os.environ.get('CERTIFICADOS_PNG_LARGURAS', '320,640').split(',') if l.strip()]
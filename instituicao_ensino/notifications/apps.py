@@ -11,7 +11,10 @@ class NotificationsConfig(AppConfig):
     """
     Classe de configuração da app 'notifications'.
     - Inicializa sinais (caso existam).
-    - Inicia o worker de envio de emails em background ao iniciar o servidor.
+    - Em desenvolvimento, inicia o worker de envio de emails no próprio
+      processo (`settings.EMAIL_WORKER_AUTOSTART`; por padrão, só no runserver).
+      Em produção o worker roda no comando `run_notification_worker` e os
+      processos web apenas enfileiram.
     """
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notifications'
@@ -20,7 +23,9 @@ class NotificationsConfig(AppConfig):
         """
         Executa rotinas de inicialização da app:
         - Importa sinais (se existirem).
-        - Inicia o worker de emails em background apenas no processo principal do runserver.
+        - Inicia o worker de emails em background se EMAIL_WORKER_AUTOSTART
+          estiver ativo (ou, sem configuração, no runserver), e só no processo
+          principal do runserver.
         """
         # Importa sinais se existirem
         try:
@@ -30,6 +35,14 @@ class NotificationsConfig(AppConfig):
         # Inicia o worker de email em background (apenas no processo principal)
         try:
             import os
+            import sys
+            from django.conf import settings
+            autostart = getattr(settings, 'EMAIL_WORKER_AUTOSTART', None)
+            if autostart is None:
+                # Sem configuração: o runserver não tem outro processo que entregue os emails
+                autostart = 'runserver' in sys.argv
+            if not autostart:
+                return
             run_main = os.environ.get('RUN_MAIN')
             if run_main == 'true' or run_main is None:
                 from .worker import start_background_worker
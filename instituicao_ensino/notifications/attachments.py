@@ -0,0 +1,358 @@
+"""
+Anexos dos emails da fila (EmailJob).
+
+- Anexos compartilhados: arquivos usados por muitos emails (o logo inline dos
+  emails de boas-vindas e recuperação) são referenciados no JSON do job por
+  nome (`{'asset': 'sg-logo'}`) em vez de repetir caminho, nome e mimetype.
+- Cache de bytes: arquivos pequenos são lidos uma vez por processo e mantidos
+  em um LRU chaveado por (caminho, mtime, tamanho), limitado em bytes
+  (`settings.EMAIL_ATTACHMENT_CACHE_BYTES`). Um arquivo alterado em disco
+  gera uma nova chave e é relido.
+- Anexos grandes (acima de `settings.EMAIL_ATTACHMENT_CACHE_MAX_FILE`) não
+  entram no cache nem na mensagem: a parte MIME (`ParteArquivo`) guarda só o
+  caminho. No envio SMTP do worker (`enviar_smtp`), a mensagem é escrita direto
+  no comando DATA e o arquivo é lido e codificado em base64 bloco a bloco, com
+  memória limitada ao tamanho do bloco. Outros backends (locmem, console,
+  envio imediato) recebem o conteúdo codificado inteiro via `get_payload`.
+"""
+
+import os
+import re
+import base64
+import random
+import smtplib
+import mimetypes
+import threading
+from collections import OrderedDict
+from email.generator import BytesGenerator
+from email.mime.base import MIMEBase
+from email.mime.image import MIMEImage
+from django.conf import settings
+from django.core.mail.message import sanitize_address
+
+
+# Blocos de 57 bytes viram exatamente uma linha base64 de 76 caracteres
+_BLOCO_LEITURA = 57 * 1024
+# Bytes acumulados antes de cada escrita no socket SMTP
+_BLOCO_ESCRITA = 64 * 1024
+# Linhas iniciadas por ponto são duplicadas no DATA (RFC 5321, 4.5.2)
+_PONTO_INICIAL = re.compile(rb'(?m)^\.')
+
+_cache_lock = threading.Lock()
+_cache = OrderedDict()
+_cache_bytes = 0
+_estatisticas = {'hits': 0, 'misses': 0, 'streamed': 0}
+
+
+def _anexos_compartilhados():
+    """
+    Anexos referenciados por nome nos jobs (`{'asset': <nome>}`).
+    """
+    return {
+        'sg-logo': {
+            'path': str(settings.BASE_DIR / 'instituicao_ensino' / 'static' / 'favicon.png'),
+            'name': 'favicon.png',
+            'mimetype': 'image/png',
+            'cid': 'sg-logo',
+        },
+    }
+
+
+def _limite_cache():
+    return int(getattr(settings, 'EMAIL_ATTACHMENT_CACHE_BYTES', 8 * 1024 * 1024))
+
+
+def _limite_arquivo():
+    return int(getattr(settings, 'EMAIL_ATTACHMENT_CACHE_MAX_FILE', 512 * 1024))
+
+
+def cache_stats():
+    """
+    Contadores do cache de anexos deste processo.
+
+    Retorna:
+        dict: hits, misses, streamed (anexos grandes escritos em blocos),
+        size (arquivos em cache) e bytes.
+    """
+    with _cache_lock:
+        stats = dict(_estatisticas)
+        stats['size'] = len(_cache)
+        stats['bytes'] = _cache_bytes
+    return stats
+
+
+def limpar_cache_anexos():
+    """
+    Descarta os anexos em cache e zera os contadores.
+    """
+    global _cache_bytes
+    with _cache_lock:
+        _cache.clear()
+        _cache_bytes = 0
+        for chave in _estatisticas:
+            _estatisticas[chave] = 0
+
+
+def resolver(att):
+    """
+    Normaliza a entrada de anexo de um job: resolve anexos compartilhados e
+    completa nome e mimetype.
+
+    Retorna:
+        dict: path, name, mimetype e cid (ou None), ou None se a entrada é inválida.
+    """
+    if att.get('asset'):
+        base = _anexos_compartilhados().get(att['asset'])
+        if base is None:
+            return None
+        att = {**base, **{k: v for k, v in att.items() if k != 'asset'}}
+    path = att.get('path')
+    if not path:
+        return None
+    return {
+        'path': path,
+        'name': att.get('name') or os.path.basename(path) or 'anexo',
+        'mimetype': att.get('mimetype') or mimetypes.guess_type(path)[0] or 'application/octet-stream',
+        'cid': att.get('cid'),
+    }
+
+
+def ler_bytes(path):
+    """
+    Conteúdo de um anexo pequeno, do cache quando o arquivo não mudou.
+    Retorna None para arquivos acima de `EMAIL_ATTACHMENT_CACHE_MAX_FILE`,
+    que devem ser codificados em blocos (ver `ParteArquivo`).
+    """
+    global _cache_bytes
+    info = os.stat(path)
+    if info.st_size > _limite_arquivo():
+        return None
+    chave = (path, info.st_mtime_ns, info.st_size)
+    with _cache_lock:
+        dados = _cache.get(chave)
+        if dados is not None:
+            _cache.move_to_end(chave)
+            _estatisticas['hits'] += 1
+            return dados
+        _estatisticas['misses'] += 1
+
+    with open(path, 'rb') as f:
+        dados = f.read()
+
+    with _cache_lock:
+        if chave not in _cache:
+            _cache[chave] = dados
+            _cache_bytes += len(dados)
+        # Descarta os menos usados até caber no limite
+        while _cache_bytes > _limite_cache() and _cache:
+            _antiga, removidos = _cache.popitem(last=False)
+            _cache_bytes -= len(removidos)
+    return dados
+
+
+class ParteArquivo(MIMEBase):
+    """
+    Parte MIME base64 de um arquivo grande, lida do disco só quando a mensagem
+    é escrita. `escrever_mensagem` a codifica bloco a bloco; `get_payload`
+    (usado pelos geradores do módulo email) devolve o conteúdo inteiro.
+    """
+
+    def __init__(self, path, name, ctype):
+        maintype, _, subtype = ctype.partition('/')
+        super().__init__(maintype, subtype or 'octet-stream')
+        self.caminho = path
+        # Payload vazio (e não None) para os geradores chamarem get_payload
+        self._payload = ''
+        self['Content-Transfer-Encoding'] = 'base64'
+        self.add_header('Content-Disposition', 'attachment', filename=name)
+
+    def blocos_base64(self, linesep=b'\n'):
+        """
+        Gera o conteúdo codificado em base64, um bloco de leitura por vez.
+        """
+        with _cache_lock:
+            _estatisticas['streamed'] += 1
+        with open(self.caminho, 'rb') as f:
+            while True:
+                bloco = f.read(_BLOCO_LEITURA)
+                if not bloco:
+                    break
+                codificado = base64.encodebytes(bloco)
+                yield codificado if linesep == b'\n' else codificado.replace(b'\n', linesep)
+
+    def get_payload(self, i=None, decode=False):
+        if decode:
+            with open(self.caminho, 'rb') as f:
+                return f.read()
+        return b''.join(self.blocos_base64()).decode('ascii')
+
+    def is_multipart(self):
+        return False
+
+
+def _contem_arquivo(msg):
+    return any(isinstance(parte, ParteArquivo) for parte in msg.walk())
+
+
+def escrever_mensagem(msg, saida, linesep='\r\n'):
+    """
+    Serializa a mensagem em `saida` (objeto com write(bytes)). Partes sem
+    `ParteArquivo` usam o gerador padrão; as `ParteArquivo` são escritas em
+    blocos, sem montar o anexo codificado em memória.
+    """
+    politica = msg.policy.clone(linesep=linesep)
+    if not _contem_arquivo(msg):
+        BytesGenerator(saida, mangle_from_=False, policy=politica).flatten(msg, linesep=linesep)
+        return
+    fim_linha = linesep.encode('ascii')
+    if msg.is_multipart() and msg.get_boundary() is None:
+        msg.set_boundary('=' * 15 + f'{random.randrange(10 ** 19):019d}' + '==')
+    for nome, valor in msg.raw_items():
+        saida.write(politica.fold_binary(nome, valor))
+    saida.write(fim_linha)
+    if isinstance(msg, ParteArquivo):
+        for bloco in msg.blocos_base64(fim_linha):
+            saida.write(bloco)
+        return
+    separador = ('--' + msg.get_boundary()).encode('ascii')
+    if msg.preamble:
+        saida.write(msg.preamble.encode('utf-8') + fim_linha)
+    for i, parte in enumerate(msg.get_payload()):
+        saida.write((fim_linha if i else b'') + separador + fim_linha)
+        escrever_mensagem(parte, saida, linesep)
+    saida.write(fim_linha + separador + b'--' + fim_linha)
+    if msg.epilogue:
+        saida.write(msg.epilogue.encode('utf-8'))
+
+
+class _SaidaData:
+    """
+    Escreve o conteúdo do comando DATA no socket SMTP em blocos de até
+    `_BLOCO_ESCRITA` bytes, duplicando os pontos no início das linhas.
+    """
+
+    def __init__(self, smtp):
+        self._smtp = smtp
+        self._buffer = bytearray()
+        self._inicio_linha = True
+
+    def write(self, dados):
+        if not dados:
+            return
+        cabeca = b''
+        if not self._inicio_linha:
+            fim = dados.find(b'\n') + 1
+            if not fim:
+                self._enviar(dados)
+                return
+            cabeca, dados = dados[:fim], dados[fim:]
+        self._enviar(cabeca + _PONTO_INICIAL.sub(b'..', dados))
+        self._inicio_linha = (dados or cabeca).endswith(b'\n')
+
+    def _enviar(self, dados):
+        self._buffer += dados
+        if len(self._buffer) >= _BLOCO_ESCRITA:
+            self._smtp.send(bytes(self._buffer))
+            self._buffer.clear()
+
+    def fechar(self):
+        if not self._inicio_linha:
+            self._buffer += b'\r\n'
+        self._buffer += b'.\r\n'
+        self._smtp.send(bytes(self._buffer))
+        self._buffer.clear()
+
+
+def _reiniciar(smtp, codigo):
+    # 421: o servidor encerrou a sessão; senão, descarta a transação (RSET)
+    if codigo == 421:
+        smtp.close()
+    else:
+        try:
+            smtp.rset()
+        except smtplib.SMTPServerDisconnected:
+            pass
+
+
+def precisa_envio_em_blocos(email_message):
+    """
+    Indica se a mensagem tem anexos grandes (`ParteArquivo`).
+    """
+    return any(isinstance(att, ParteArquivo) for att in email_message.attachments)
+
+
+def enviar_smtp(backend, email_message):
+    """
+    Envia a mensagem pela conexão aberta do backend SMTP do Django, como
+    `EmailBackend._send`, mas escrevendo o DATA aos poucos (ver
+    `escrever_mensagem`) em vez de montar os bytes da mensagem inteira.
+    Levanta as mesmas exceções de `smtplib.SMTP.sendmail`.
+
+    Retorna:
+        bool: False se a mensagem não tem destinatários.
+    """
+    encoding = email_message.encoding or settings.DEFAULT_CHARSET
+    destinatarios = [sanitize_address(addr, encoding) for addr in email_message.recipients()]
+    if not destinatarios:
+        return False
+    remetente = sanitize_address(email_message.from_email, encoding)
+    mensagem = email_message.message()
+    smtp = backend.connection
+    smtp.ehlo_or_helo_if_needed()
+
+    codigo, resposta = smtp.mail(remetente)
+    if codigo != 250:
+        _reiniciar(smtp, codigo)
+        raise smtplib.SMTPSenderRefused(codigo, resposta, remetente)
+    recusados = {}
+    for destinatario in destinatarios:
+        codigo, resposta = smtp.rcpt(destinatario)
+        if codigo not in (250, 251):
+            recusados[destinatario] = (codigo, resposta)
+        if codigo == 421:
+            smtp.close()
+            raise smtplib.SMTPRecipientsRefused(recusados)
+    if len(recusados) == len(destinatarios):
+        _reiniciar(smtp, 0)
+        raise smtplib.SMTPRecipientsRefused(recusados)
+
+    smtp.putcmd('data')
+    codigo, resposta = smtp.getreply()
+    if codigo != 354:
+        _reiniciar(smtp, codigo)
+        raise smtplib.SMTPDataError(codigo, resposta)
+    saida = _SaidaData(smtp)
+    escrever_mensagem(mensagem, saida)
+    saida.fechar()
+    codigo, resposta = smtp.getreply()
+    if codigo != 250:
+        _reiniciar(smtp, codigo)
+        raise smtplib.SMTPDataError(codigo, resposta)
+    return True
+
+
+def anexar(msg, att):
+    """
+    Anexa à mensagem a entrada `att` do JSON de anexos de um job.
+    Imagens com `cid` vão inline (a mensagem passa a ser 'related').
+    Erros de leitura são propagados para o chamador decidir se ignora o anexo.
+
+    Retorna:
+        bool: True se algo foi anexado.
+    """
+    att = resolver(att)
+    if att is None:
+        return False
+    path, name, ctype = att['path'], att['name'], att['mimetype']
+    dados = ler_bytes(path)
+    if att['cid'] and ctype.startswith('image/') and dados is not None:
+        img = MIMEImage(dados, _subtype=ctype.split('/')[-1])
+        img.add_header('Content-ID', f"<{att['cid']}>")
+        img.add_header('Content-Disposition', 'inline', filename=name)
+        msg.attach(img)
+        msg.mixed_subtype = 'related'
+    elif dados is not None:
+        msg.attach(name, dados, ctype)
+    else:
+        msg.attach(ParteArquivo(path, name, ctype))
+    return True
@@ -0,0 +1,173 @@
+"""
+Comando Django que executa o worker de envio de emails (fila EmailJob) fora dos
+processos web, que passam apenas a enfileirar.
+
+- Roda N processos (`--processes`), cada um com M threads de envio (`--threads`).
+  Todos escutam a porta de push (EMAIL_QUEUE_PORT) com SO_REUSEPORT e reclamam
+  jobs do banco com `claim_pending`, sem envios duplicados.
+- SIGTERM/SIGINT encerram de forma ordenada: cada thread termina a mensagem em
+  andamento e os jobs recebidos e não enviados voltam para 'pending'.
+- Com `--health-port`, cada processo expõe /health e /metrics (JSON).
+"""
+
+import json
+import signal
+import logging
+import threading
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+logger = logging.getLogger(__name__)
+
+
+def _servidor_saude(porta):
+    """
+    Inicia o servidor HTTP de saúde/métricas deste processo em uma thread daemon.
+    """
+    from notifications.worker import worker_metrics
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            metricas = worker_metrics()
+            if self.path.startswith('/health'):
+                saudavel = metricas['running'] and metricas['threads_alive'] == metricas['threads']
+                codigo = 200 if saudavel else 503
+                corpo = {
+                    'status': 'ok' if saudavel else 'degraded',
+                    'pid': metricas['pid'],
+                    'threads_alive': metricas['threads_alive'],
+                    'threads': metricas['threads'],
+                }
+            elif self.path.startswith('/metrics'):
+                codigo, corpo = 200, metricas
+            else:
+                codigo, corpo = 404, {'error': 'not found'}
+            dados = json.dumps(corpo).encode('utf-8')
+            self.send_response(codigo)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', porta), Handler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name='EmailWorkerHealth', daemon=True).start()
+    return servidor
+
+
+def _aguardar_sinal():
+    """
+    Instala os tratadores de SIGTERM/SIGINT e retorna o evento que eles sinalizam.
+    """
+    parar = threading.Event()
+
+    def tratar(signum, frame):
+        parar.set()
+
+    signal.signal(signal.SIGTERM, tratar)
+    signal.signal(signal.SIGINT, tratar)
+    return parar
+
+
+def executar_worker(threads, porta_saude=0, timeout=30):
+    """
+    Executa o worker neste processo até receber SIGTERM/SIGINT.
+
+    Retorna:
+        bool: True se todas as threads terminaram dentro de `timeout` segundos.
+    """
+    from notifications.worker import start_background_worker, stop_background_worker
+
+    parar = _aguardar_sinal()
+    start_background_worker(num_cert_threads=threads)
+    saude = _servidor_saude(porta_saude) if porta_saude else None
+    logger.info('Worker de email iniciado com %s thread(s)', threads)
+    # Espera em intervalos curtos para que os sinais sejam tratados
+    while not parar.wait(1):
+        pass
+    encerrou = stop_background_worker(timeout)
+    if saude is not None:
+        saude.shutdown()
+    logger.info('Worker de email encerrado%s', '' if encerrou else ' (threads ainda ativas após o timeout)')
+    return encerrou
+
+
+def _processo_filho(threads, porta_saude, timeout):
+    """
+    Ponto de entrada dos processos filhos (contexto 'spawn').
+    """
+    import django
+    django.setup()
+    executar_worker(threads, porta_saude, timeout)
+
+
+class Command(BaseCommand):
+    """
+    Executa o worker de notificações com um ou mais processos.
+    """
+    help = 'Executa o worker de envio de emails (EmailJob) em processos dedicados.'
+
+    def add_arguments(self, parser):
+        """
+        Adiciona processos, threads, porta de saúde e timeout de encerramento.
+        """
+        parser.add_argument('--processes', type=int, default=getattr(settings, 'EMAIL_WORKER_PROCESSES', 1),
+                            help='Processos do worker (padrão: EMAIL_WORKER_PROCESSES)')
+        parser.add_argument('--threads', type=int, default=getattr(settings, 'EMAIL_WORKER_THREADS', 2),
+                            help='Threads de envio por processo (padrão: EMAIL_WORKER_THREADS)')
+        parser.add_argument('--health-port', type=int, default=getattr(settings, 'EMAIL_WORKER_HEALTH_PORT', 0),
+                            help='Porta HTTP de /health e /metrics (processo i usa porta + i; 0 = desligado)')
+        parser.add_argument('--shutdown-timeout', type=float, default=30,
+                            help='Segundos para as threads terminarem os envios em andamento')
+
+    def handle(self, *args, **options):
+        """
+        Inicia os processos do worker e os encerra de forma ordenada ao receber SIGTERM/SIGINT.
+        Processos filhos que morrem inesperadamente são reiniciados.
+        """
+        processos = options['processes']
+        threads = options['threads']
+        porta = options['health_port']
+        timeout = options['shutdown_timeout']
+        if processos < 1 or threads < 1:
+            raise CommandError('--processes e --threads devem ser maiores que zero')
+
+        self.stdout.write(self.style.NOTICE(f"Worker de email: {processos} processo(s) x {threads} thread(s)"))
+        if processos == 1:
+            encerrou = executar_worker(threads, porta, timeout)
+            self.stdout.write(self.style.SUCCESS('Worker encerrado') if encerrou else self.style.WARNING('Worker encerrado com envios pendentes'))
+            return
+
+        contexto = multiprocessing.get_context('spawn')
+
+        def iniciar(i):
+            processo = contexto.Process(
+                target=_processo_filho, args=(threads, porta + i if porta else 0, timeout),
+                name=f'EmailWorkerProcess-{i}',
+            )
+            processo.start()
+            return processo
+
+        parar = _aguardar_sinal()
+        filhos = [iniciar(i) for i in range(processos)]
+        while not parar.wait(1):
+            for i, processo in enumerate(filhos):
+                if not processo.is_alive():
+                    self.stderr.write(self.style.WARNING(f"Processo {processo.name} terminou (código {processo.exitcode}); reiniciando"))
+                    filhos[i] = iniciar(i)
+
+        # Repassa o encerramento e aguarda os envios em andamento
+        for processo in filhos:
+            if processo.is_alive():
+                processo.terminate()
+        for processo in filhos:
+            processo.join(timeout + 5)
+            if processo.is_alive():
+                processo.kill()
+        self.stdout.write(self.style.SUCCESS(f"Worker encerrado ({processos} processos)"))
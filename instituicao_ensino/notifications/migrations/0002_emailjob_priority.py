@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-16 22:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailjob',
+            name='priority',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'High'), (5, 'Normal'), (9, 'Bulk')], default=5),
+        ),
+        migrations.AddIndex(
+            model_name='emailjob',
+            index=models.Index(fields=['status', 'priority', 'scheduled_at'], name='emailjob_fila_idx'),
+        ),
+    ]
@@ -19,6 +19,8 @@ class EmailJob(models.Model):
         html_body (TextField): Corpo do email em HTML.
         attachments (JSONField): Lista de anexos (dicionários com path, nome, mimetype).
         status (CharField): Status do envio ('pending', 'sending', 'sent', 'failed').
+        priority (PositiveSmallIntegerField): Prioridade na fila (menor = antes);
+            fluxos interativos usam PRIORITY_HIGH e avisos em massa PRIORITY_BULK.
         retries (PositiveSmallIntegerField): Número de tentativas de envio.
         scheduled_at (DateTimeField): Data/hora agendada para envio.
         sent_at (DateTimeField): Data/hora em que foi enviado.
@@ -33,12 +35,22 @@ class EmailJob(models.Model):
         ('failed', 'Failed'),
     )
 
+    PRIORITY_HIGH = 0
+    PRIORITY_NORMAL = 5
+    PRIORITY_BULK = 9
+    PRIORITY_CHOICES = (
+        (PRIORITY_HIGH, 'High'),
+        (PRIORITY_NORMAL, 'Normal'),
+        (PRIORITY_BULK, 'Bulk'),
+    )
+
     to_email = models.EmailField()
     subject = models.CharField(max_length=255)
     text_body = models.TextField(blank=True, null=True)
     html_body = models.TextField(blank=True, null=True)
     attachments = models.JSONField(blank=True, null=True)  # list of {path, name, mimetype}
     status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='pending', db_index=True)
+    priority = models.PositiveSmallIntegerField(choices=PRIORITY_CHOICES, default=PRIORITY_NORMAL)
     retries = models.PositiveSmallIntegerField(default=0)
     scheduled_at = models.DateTimeField(default=timezone.now, db_index=True)
     sent_at = models.DateTimeField(blank=True, null=True)
@@ -48,6 +60,10 @@ class EmailJob(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Reclamação de jobs: pendentes por prioridade e vencimento
+            models.Index(fields=['status', 'priority', 'scheduled_at'], name='emailjob_fila_idx'),
+        ]
 
     def __str__(self):
         """
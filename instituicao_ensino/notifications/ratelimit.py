@@ -0,0 +1,157 @@
+"""
+Limite de taxa de envio de emails por domínio do destinatário.
+
+- Cada domínio tem um balde de fichas (token bucket) com taxa em mensagens por
+  segundo (`settings.EMAIL_RATE_LIMITS` por domínio, senão
+  `settings.EMAIL_RATE_LIMIT_PER_SECOND`) e rajada de
+  `settings.EMAIL_RATE_LIMIT_BURST` mensagens. As taxas valem para o conjunto
+  dos processos do worker: cada processo usa taxa / EMAIL_WORKER_PROCESSES.
+- A taxa é adaptativa: uma recusa temporária (SMTP 4xx) corta a taxa do domínio
+  pela metade e o pausa por um tempo que dobra a cada recusa seguida
+  (`settings.EMAIL_BACKOFF_BASE_SECONDS` até `settings.EMAIL_BACKOFF_MAX_SECONDS`);
+  cada envio aceito devolve 10% da taxa configurada, até o máximo. Assim o
+  envio se mantém perto da maior taxa que o servidor de destino aceita.
+"""
+
+import time
+import threading
+from django.conf import settings
+
+
+# Taxa mínima (mensagens/s) após cortes sucessivos
+_TAXA_MINIMA = 0.05
+_MAX_DOMINIOS = 10000
+
+_lock = threading.Lock()
+_baldes = {}
+
+
+def dominio(email):
+    """
+    Domínio do endereço, em minúsculas ('' se não houver).
+    """
+    return (email or '').rpartition('@')[2].strip().lower()
+
+
+def _taxa_configurada(nome):
+    taxas = getattr(settings, 'EMAIL_RATE_LIMITS', None) or {}
+    taxa = float(taxas.get(nome, getattr(settings, 'EMAIL_RATE_LIMIT_PER_SECOND', 5)))
+    processos = max(1, int(getattr(settings, 'EMAIL_WORKER_PROCESSES', 1)))
+    return max(_TAXA_MINIMA, taxa / processos)
+
+
+def _rajada():
+    return max(1.0, float(getattr(settings, 'EMAIL_RATE_LIMIT_BURST', 10)))
+
+
+def _balde(nome, agora):
+    """
+    Balde do domínio (criado cheio), com as fichas repostas até `agora`.
+    Chamar com `_lock` adquirido.
+    """
+    balde = _baldes.get(nome)
+    if balde is None:
+        if len(_baldes) >= _MAX_DOMINIOS:
+            _descartar_ociosos(agora)
+        maxima = _taxa_configurada(nome)
+        balde = _baldes[nome] = {
+            'maxima': maxima, 'taxa': maxima, 'fichas': _rajada(),
+            'atualizado': agora, 'pausa_ate': 0.0, 'recusas': 0,
+        }
+        return balde
+    # Durante uma pausa `atualizado` aponta para o fim dela: nada é reposto até lá
+    if agora > balde['atualizado']:
+        balde['fichas'] = min(_rajada(), balde['fichas'] + (agora - balde['atualizado']) * balde['taxa'])
+        balde['atualizado'] = agora
+    return balde
+
+
+def _descartar_ociosos(agora):
+    """
+    Remove baldes sem restrição em vigor (taxa cheia e sem pausa).
+    """
+    for nome in [n for n, b in _baldes.items() if b['taxa'] >= b['maxima'] and b['pausa_ate'] <= agora]:
+        del _baldes[nome]
+
+
+def reservar(nome, max_espera):
+    """
+    Reserva uma ficha para enviar uma mensagem ao domínio.
+
+    Retorna:
+        tuple: (reservado, segundos). Se reservado, o chamador deve aguardar
+        `segundos` (0 se havia ficha) antes de enviar; se não, o domínio está
+        pausado ou a espera passaria de `max_espera` e o envio deve ser adiado
+        por `segundos`.
+    """
+    agora = time.monotonic()
+    with _lock:
+        balde = _balde(nome, agora)
+        if balde['pausa_ate'] > agora:
+            return False, balde['pausa_ate'] - agora
+        espera = max(0.0, (1 - balde['fichas']) / balde['taxa'])
+        if espera > max_espera:
+            return False, espera
+        # Fichas negativas reservam a vez das próximas mensagens
+        balde['fichas'] -= 1
+        return True, espera
+
+
+def registrar_sucesso(nome):
+    """
+    Envio aceito: zera as recusas seguidas e aumenta a taxa do domínio.
+    """
+    with _lock:
+        balde = _baldes.get(nome)
+        if balde is not None:
+            balde['recusas'] = 0
+            balde['taxa'] = min(balde['maxima'], balde['taxa'] + balde['maxima'] * 0.1)
+
+
+def registrar_recusa(nome):
+    """
+    Recusa temporária (4xx) do domínio: corta a taxa pela metade e pausa o
+    domínio com backoff exponencial.
+
+    Retorna:
+        float: segundos de pausa do domínio.
+    """
+    base = float(getattr(settings, 'EMAIL_BACKOFF_BASE_SECONDS', 30))
+    maximo = float(getattr(settings, 'EMAIL_BACKOFF_MAX_SECONDS', 3600))
+    agora = time.monotonic()
+    with _lock:
+        balde = _balde(nome, agora)
+        balde['recusas'] += 1
+        balde['taxa'] = max(_TAXA_MINIMA, balde['taxa'] / 2)
+        balde['fichas'] = 0.0
+        pausa = min(maximo, base * 2 ** (balde['recusas'] - 1))
+        balde['pausa_ate'] = balde['atualizado'] = agora + pausa
+    return pausa
+
+
+def estado():
+    """
+    Domínios com restrição em vigor (taxa reduzida ou pausados).
+
+    Retorna:
+        dict: domínio -> rate, max_rate (mensagens/s), paused_seconds e refusals.
+    """
+    agora = time.monotonic()
+    with _lock:
+        return {
+            nome: {
+                'rate': round(b['taxa'], 3),
+                'max_rate': round(b['maxima'], 3),
+                'paused_seconds': round(max(0.0, b['pausa_ate'] - agora), 1),
+                'refusals': b['recusas'],
+            }
+            for nome, b in _baldes.items() if b['taxa'] < b['maxima'] or b['pausa_ate'] > agora
+        }
+
+
+def limpar_limites():
+    """
+    Descarta o estado de todos os domínios.
+    """
+    with _lock:
+        _baldes.clear()
@@ -5,20 +5,98 @@ Serviços para envio e agendamento de emails em background.
 Inclui funções para enfileirar emails de confirmação, certificados e recuperação de senha.
 """
 
-from django.template.loader import render_to_string
+from django.template import Context
+from django.template.loader import get_template
 from django.conf import settings
 from django.utils import timezone
 from django.urls import reverse
+from django.db import transaction
 from django.core.mail import EmailMultiAlternatives
 from .models import EmailJob
-from .worker import push_job
+from .worker import push_jobs, aguardar_envio, agendar, worker_no_processo
+from .attachments import anexar
 import socket
 
 
-def enqueue_email(to_email: str, subject: str, *, text_body: str = None, html_body: str = None, attachments=None, when=None, send_now: bool = False):
+# Templates de email compilados (nome -> django.template.base.Template)
+_templates = {}
+
+
+class EmailDeliveryError(Exception):
+    """
+    Falha na primeira tentativa de envio de um email aguardado com `wait`.
+    O job continua na fila e será reenviado pelo worker.
+    """
+
+
+def _enviar_pela_porta(linhas):
+    """
+    Envia linhas do protocolo do worker (ver `worker._ler_push`) pela sua porta TCP.
+    Retorna False se o worker não estiver escutando.
+    """
+    try:
+        host = '127.0.0.1'
+        port = int(getattr(settings, 'EMAIL_QUEUE_PORT', 9099))
+        with socket.create_connection((host, port), timeout=1.0) as s:
+            s.sendall(''.join(f"{linha}\n" for linha in linhas).encode('utf-8'))
+        return True
+    except Exception:
+        return False
+
+
+def _agendar_no_worker(*quandos):
+    """
+    Avisa o worker dos vencimentos futuros para que ele acorde na hora certa.
+    Com o worker neste processo, entram direto na agenda local; caso contrário
+    (processos web, ver `EMAIL_WORKER_AUTOSTART`), seguem pela porta do worker,
+    que os adiciona à própria agenda. Se o aviso não chegar, os jobs são
+    reclamados na varredura de segurança.
+    """
+    if not quandos:
+        return False
+    if worker_no_processo():
+        agendar(*quandos)
+        return True
+    return _enviar_pela_porta(f"@{quando.timestamp()}" for quando in set(quandos))
+
+
+def _entregar_ao_worker(job_ids, priority=EmailJob.PRIORITY_NORMAL):
+    """
+    Marca os jobs como 'sending' e os entrega ao worker em uma única notificação
+    (fila do processo ou, em seguida, socket TCP), com a prioridade dos jobs.
+    Se a entrega falhar, os jobs voltam para 'pending' e serão reclamados pelo
+    worker na próxima varredura.
+    """
+    job_ids = list(job_ids)
+    if not job_ids:
+        return False
+    # Mark as sending and push into socket to avoid DB pollers claiming it simultaneously
+    pushed = False
+    try:
+        # Set to 'sending' as a lock before pushing to socket; workers will process and set to 'sent'
+        EmailJob.objects.filter(pk__in=job_ids, status='pending').update(status='sending', updated_at=timezone.now())
+        # Try in-process queue first
+        if push_jobs(job_ids, priority):
+            pushed = True
+        else:
+            # Try TCP socket push fallback
+            pushed = _enviar_pela_porta(f"{job_id} {priority}" for job_id in job_ids)
+    except Exception:
+        pushed = False
+    # If we failed to push to socket, revert status back to pending so poller/worker can claim it later
+    if not pushed:
+        EmailJob.objects.filter(pk__in=job_ids, status='sending').update(status='pending', updated_at=timezone.now())
+    return pushed
+
+
+def enqueue_email(to_email: str, subject: str, *, text_body: str = None, html_body: str = None, attachments=None, when=None, send_now: bool = False, wait: float = None, priority: int = EmailJob.PRIORITY_NORMAL):
     """
-    Adiciona um novo email à fila de envio.
+    Adiciona um novo email à fila de envio, com a prioridade `priority`
+    (`EmailJob.PRIORITY_HIGH` para fluxos em que o usuário aguarda o email).
     Se send_now=True, envia imediatamente; caso contrário, agenda para o worker.
+    Com `wait` (segundos), aguarda no máximo esse tempo pela confirmação de envio
+    do worker e levanta EmailDeliveryError se a tentativa falhar; esgotado o
+    tempo, o email segue na fila normalmente.
     Aceita anexos, corpo em texto e HTML, e data/hora de envio.
     """
     # If immediate send requested, send synchronously to avoid duplicate processing
@@ -40,21 +118,8 @@ def enqueue_email(to_email: str, subject: str, *, text_body: str = None, html_bo
                 pass
         for att in (attachments or []):
             try:
-                path = att.get('path')
-                name = att.get('name') or (path.split('/')[-1] if path else 'anexo')
-                ctype = att.get('mimetype') or 'application/octet-stream'
-                cid = att.get('cid')
-                with open(path, 'rb') as f:
-                    data = f.read()
-                if cid and ctype.startswith('image/'):
-                    # Attach inline image for CID references in HTML body
-                    from email.mime.image import MIMEImage
-                    img = MIMEImage(data, _subtype=ctype.split('/')[-1])
-                    img.add_header('Content-ID', f'<{cid}>')
-                    img.add_header('Content-Disposition', 'inline', filename=name)
-                    msg.attach(img)
-                else:
-                    msg.attach(name, data, ctype)
+                # Imagens com 'cid' vão inline para as referências no HTML
+                anexar(msg, att)
             except Exception:
                 continue
         # Send and log any failure with context
@@ -75,39 +140,108 @@ def enqueue_email(to_email: str, subject: str, *, text_body: str = None, html_bo
         html_body=html_body or '',
         attachments=attachments or [],
         scheduled_at=when or timezone.now(),
+        priority=priority,
     )
-    # Mark as sending and push into socket to avoid DB pollers claiming it simultaneously
-    pushed = False
-    try:
-        # Set to 'sending' as a lock before pushing to socket; workers will process and set to 'sent'
-        from django.utils import timezone as _tz
-        EmailJob.objects.filter(pk=job.pk, status='pending').update(status='sending', updated_at=_tz.now())
-        # Try in-process queue first
-        if push_job(job.id):
-            pushed = True
-        else:
-            # Try TCP socket push fallback
-            try:
-                host = '127.0.0.1'
-                port = int(getattr(settings, 'EMAIL_QUEUE_PORT', 9099))
-                with socket.create_connection((host, port), timeout=1.0) as s:
-                    s.sendall(f"{job.id}\n".encode('utf-8'))
-                    pushed = True
-            except Exception:
-                pushed = False
-    except Exception:
-        pushed = False
-    # If we failed to push to socket, revert status back to pending so poller/worker can claim it later
-    if not pushed:
-        from django.utils import timezone as _tz
-        EmailJob.objects.filter(pk=job.pk, status='sending').update(status='pending', updated_at=_tz.now())
+    if job.scheduled_at <= timezone.now():
+        _entregar_ao_worker([job.pk], priority)
+    else:
+        _agendar_no_worker(job.scheduled_at)
+    if wait:
+        job = aguardar_envio(job.pk, wait) or job
+        if job.status != 'sent' and job.retries > 0:
+            raise EmailDeliveryError(job.last_error or 'Falha no envio')
     return job
 
 
-def queue_welcome_confirmation_email(user, usuario, *, send_now: bool = False):
+def _template(nome):
+    """
+    Template de email compilado, mantido em cache no processo.
+    Em DEBUG o cache é ignorado para refletir edições nos templates.
+    """
+    if settings.DEBUG:
+        return get_template(nome).template
+    template = _templates.get(nome)
+    if template is None:
+        template = _templates[nome] = get_template(nome).template
+    return template
+
+
+def limpar_cache_templates():
+    """
+    Descarta os templates de email compilados.
+    """
+    _templates.clear()
+
+
+def _renderizar(nomes, ctx):
+    """
+    Renderiza os templates `nomes` com o mesmo contexto.
+    Retorna uma tupla de strings, na ordem de `nomes`.
+    """
+    return _renderizar_em_lote(nomes, ctx, [{}])[0]
+
+
+def _renderizar_em_lote(nomes, invariantes, destinatarios):
+    """
+    Renderiza os templates `nomes` para cada destinatário.
+
+    O contexto comum (`invariantes`) é montado uma única vez; as variáveis de
+    cada destinatário são empilhadas sobre ele apenas durante a renderização.
+
+    Retorna:
+        list: uma tupla de strings por destinatário, na ordem de `nomes`.
+    """
+    templates = [_template(nome) for nome in nomes]
+    contexto = Context(invariantes)
+    corpos = []
+    for variaveis in destinatarios:
+        with contexto.push(variaveis):
+            corpos.append(tuple(template.render(contexto) for template in templates))
+    return corpos
+
+
+def enqueue_bulk(messages, *, chunk_size: int = 500, priority: int = EmailJob.PRIORITY_BULK):
+    """
+    Enfileira vários emails de uma vez, por padrão com a prioridade dos avisos
+    em massa (atrás dos emails interativos).
+
+    Cada item de `messages` é um dict com to_email e subject e, opcionalmente,
+    text_body, html_body, attachments e when. Os jobs são gravados com
+    `bulk_create` em lotes de `chunk_size` e os que já venceram são entregues ao
+    worker em uma única notificação, em vez de uma inserção, uma atualização e um
+    push por destinatário.
+
+    Retorna:
+        list: os EmailJob criados.
+    """
+    agora = timezone.now()
+    jobs = [
+        EmailJob(
+            to_email=m['to_email'],
+            subject=m['subject'],
+            text_body=m.get('text_body') or '',
+            html_body=m.get('html_body') or '',
+            attachments=m.get('attachments') or [],
+            scheduled_at=m.get('when') or agora,
+            priority=priority,
+        )
+        for m in messages if m
+    ]
+    if not jobs:
+        return []
+    with transaction.atomic():
+        criados = EmailJob.objects.bulk_create(jobs, batch_size=chunk_size)
+    # Sem chaves retornadas pelo banco, os jobs ficam 'pending' para o worker reclamar
+    _entregar_ao_worker([job.pk for job in criados if job.pk and job.scheduled_at <= agora], priority)
+    _agendar_no_worker(*[job.scheduled_at for job in criados if job.scheduled_at > agora])
+    return criados
+
+
+def queue_welcome_confirmation_email(user, usuario, *, send_now: bool = False, wait: float = None):
     """
     Enfileira email de boas-vindas com link de confirmação para um novo usuário.
     Gera link seguro de confirmação e envia template customizado.
+    O envio é feito pelo worker; use send_now=True para enviar na própria requisição.
     """
     if not user or not getattr(usuario, 'email', None):
         return None
@@ -134,33 +268,21 @@ def queue_welcome_confirmation_email(user, usuario, *, send_now: bool = False):
     }
 
     subject = f"Bem-vindo ao EventoEnsina, {usuario.nome.split(' ')[0]}! Confirme seu cadastro"
-    text = render_to_string('emails/welcome_confirmation.txt', ctx)
-    html = render_to_string('emails/welcome_confirmation.html', ctx)
-    attachments = []
-    try:
-        favicon_path = settings.BASE_DIR / 'instituicao_ensino' / 'static' / 'favicon.png'
-        attachments.append({'path': str(favicon_path), 'name': 'favicon.png', 'mimetype': 'image/png', 'cid': 'sg-logo'})
-    except Exception:
-        pass
-    return enqueue_email(usuario.email, subject, text_body=text, html_body=html, attachments=attachments, send_now=True)
+    text, html = _renderizar(('emails/welcome_confirmation.txt', 'emails/welcome_confirmation.html'), ctx)
+    # Logo inline (CID), referenciado como anexo compartilhado
+    attachments = [{'asset': 'sg-logo'}]
+    return enqueue_email(
+        usuario.email, subject, text_body=text, html_body=html, attachments=attachments,
+        send_now=send_now, wait=wait, priority=EmailJob.PRIORITY_HIGH,
+    )
 
 
-def queue_certificate_ready_email(usuario, cert, evento=None, *, send_now: bool = False):
+def _contexto_certificado_evento(evento=None):
     """
-    Enfileira email notificando que o certificado está disponível.
-    Inclui link para download e anexa o PDF se disponível.
+    Partes do email de certificado disponível que são iguais para todos os
+    participantes de um evento: assunto, URLs do site e do logo.
     """
-    if not getattr(usuario, 'email', None):
-        return None
-
     site_url = getattr(settings, 'SITE_URL', '').rstrip('/')
-    # Button should always lead to the user's public certificates page
-    try:
-        path = reverse('perfil_certificados', kwargs={'nome_usuario': usuario.nome_usuario})
-        cert_url = f"{site_url}{path}" if site_url else path
-    except Exception:
-        cert_url = None
-
     # Prefer hosted HTTPS logo URL; fall back to SITE_URL + static path
     logo_url = None
     try:
@@ -171,19 +293,29 @@ def queue_certificate_ready_email(usuario, cert, evento=None, *, send_now: bool
     except Exception:
         logo_url = None
 
-    ctx = {
-        'usuario': usuario,
-        'cert': cert,
+    return {
         'evento': evento,
-        'cert_url': cert_url,
         'site_url': site_url,
         'system_name': 'EventoEnsina',
         'logo_url': logo_url,
+        'subject': f"Seu certificado está disponível{f' - {evento.titulo}' if evento else ''}",
     }
-    subject = f"Seu certificado está disponível{f' - {evento.titulo}' if evento else ''}"
-    text = render_to_string('emails/certificate_ready.txt', ctx)
-    html = render_to_string('emails/certificate_ready.html', ctx)
 
+
+def _variaveis_certificado(usuario, cert, site_url):
+    """
+    Partes do email de certificado disponível que variam por participante.
+    """
+    # Button should always lead to the user's public certificates page
+    try:
+        path = reverse('perfil_certificados', kwargs={'nome_usuario': usuario.nome_usuario})
+        cert_url = f"{site_url}{path}" if site_url else path
+    except Exception:
+        cert_url = None
+    return {'usuario': usuario, 'cert': cert, 'cert_url': cert_url}
+
+
+def _anexos_certificado(cert):
     attachments = []
     # Inline favicon/logo as CID for email template
     # No need to attach logo when using base64 data URI
@@ -193,14 +325,94 @@ def queue_certificate_ready_email(usuario, cert, evento=None, *, send_now: bool
             attachments.append({'path': cert.pdf.path, 'name': getattr(cert.pdf, 'name', 'certificado.pdf').split('/')[-1], 'mimetype': 'application/pdf'})
     except Exception:
         pass
+    return attachments
+
+
+def _mensagens_certificado_pronto(destinatarios, evento=None):
+    """
+    Monta os emails de certificado disponível (dicts aceitos por `enqueue_bulk`).
+
+    O contexto comum do evento é calculado uma vez e os templates são
+    compilados uma vez; só nome, URL e anexo mudam a cada participante.
+
+    Parâmetros:
+        destinatarios (iterable): pares (usuario, certificado); usuários sem
+            email são ignorados.
+    """
+    invariantes = _contexto_certificado_evento(evento)
+    subject = invariantes['subject']
+    com_email = [(usuario, cert) for usuario, cert in destinatarios if getattr(usuario, 'email', None)]
+    variaveis = [_variaveis_certificado(usuario, cert, invariantes['site_url']) for usuario, cert in com_email]
+    corpos = _renderizar_em_lote(('emails/certificate_ready.txt', 'emails/certificate_ready.html'), invariantes, variaveis)
+    return [
+        {'to_email': usuario.email, 'subject': subject, 'text_body': text, 'html_body': html, 'attachments': _anexos_certificado(cert)}
+        for (usuario, cert), (text, html) in zip(com_email, corpos)
+    ]
+
+
+def queue_certificate_ready_email(usuario, cert, evento=None, *, send_now: bool = False, wait: float = None):
+    """
+    Enfileira email notificando que o certificado está disponível.
+    Inclui link para download e anexa o PDF se disponível.
+    O envio é feito pelo worker; use send_now=True para enviar na própria requisição.
+    """
+    mensagens = _mensagens_certificado_pronto([(usuario, cert)], evento)
+    if not mensagens:
+        return None
+    mensagem = mensagens[0]
+    return enqueue_email(
+        mensagem['to_email'], mensagem['subject'], text_body=mensagem['text_body'], html_body=mensagem['html_body'],
+        attachments=mensagem['attachments'], send_now=send_now, wait=wait,
+    )
 
-    return enqueue_email(usuario.email, subject, text_body=text, html_body=html, attachments=attachments, send_now=True)
 
+def queue_certificate_ready_emails(certificados, evento=None):
+    """
+    Enfileira em massa o email de certificado disponível para vários certificados
+    (ver `enqueue_bulk`). Participantes sem email são ignorados.
 
-def queue_password_recovery_email(user, usuario=None, *, login_url: str = None, send_now: bool = False):
+    Retorna:
+        list: os EmailJob criados.
+    """
+    return enqueue_bulk(_mensagens_certificado_pronto(((cert.usuario, cert) for cert in certificados), evento))
+
+
+def queue_waitlist_promotion_email(usuario, evento):
+    """
+    Enfileira o aviso de que o usuário saiu da lista de espera e está inscrito
+    no evento.
+
+    O job é criado na transação corrente e só é entregue ao worker após o
+    commit: se a promoção for desfeita, o email some junto; se a entrega
+    falhar, o job fica 'pending' e o worker o reclama na varredura.
+    """
+    if not getattr(usuario, 'email', None):
+        return None
+    site_url = getattr(settings, 'SITE_URL', '').rstrip('/')
+    path = reverse('detalhe_evento', kwargs={'evento_id': evento.pk})
+    ctx = {
+        'usuario': usuario,
+        'evento': evento,
+        'evento_url': f"{site_url}{path}" if site_url else path,
+        'site_url': site_url,
+        'system_name': 'EventoEnsina',
+    }
+    subject = f"Sua vaga foi confirmada - {evento.titulo}"
+    text, html = _renderizar(('emails/lista_espera_promovido.txt', 'emails/lista_espera_promovido.html'), ctx)
+    job = EmailJob.objects.create(
+        to_email=usuario.email, subject=subject, text_body=text, html_body=html,
+        scheduled_at=timezone.now(), priority=EmailJob.PRIORITY_HIGH,
+    )
+    transaction.on_commit(lambda: _entregar_ao_worker([job.pk], EmailJob.PRIORITY_HIGH))
+    return job
+
+
+def queue_password_recovery_email(user, usuario=None, *, login_url: str = None, send_now: bool = False, wait: float = None):
     """
     Envia email de recuperação de senha com link de acesso direto ao perfil.
     Utiliza token de uso único para autenticação e permite redefinir a senha.
+    O envio é feito pelo worker; `wait` aguarda a confirmação por tempo limitado
+    (ver `enqueue_email`).
     """
     to_email = None
     if usuario and getattr(usuario, 'email', None):
@@ -231,12 +443,10 @@ def queue_password_recovery_email(user, usuario=None, *, login_url: str = None,
         'system_name': 'EventoEnsina',
     }
     subject = 'Recuperação de acesso — EventoEnsina'
-    text = render_to_string('emails/recuperar_senha.txt', ctx)
-    html = render_to_string('emails/recuperar_senha.html', ctx)
-    attachments = []
-    try:
-        favicon_path = settings.BASE_DIR / 'instituicao_ensino' / 'static' / 'favicon.png'
-        attachments.append({'path': str(favicon_path), 'name': 'favicon.png', 'mimetype': 'image/png', 'cid': 'sg-logo'})
-    except Exception:
-        pass
-    return enqueue_email(to_email, subject, text_body=text, html_body=html, attachments=attachments, send_now=True)
+    text, html = _renderizar(('emails/recuperar_senha.txt', 'emails/recuperar_senha.html'), ctx)
+    # Logo inline (CID), referenciado como anexo compartilhado
+    attachments = [{'asset': 'sg-logo'}]
+    return enqueue_email(
+        to_email, subject, text_body=text, html_body=html, attachments=attachments,
+        send_now=send_now, wait=wait, priority=EmailJob.PRIORITY_HIGH,
+    )
@@ -0,0 +1,522 @@
+import io
+import os
+import smtplib
+import tempfile
+from email import message_from_bytes
+from types import SimpleNamespace
+from unittest.mock import patch
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from .models import EmailJob
+from . import worker
+
+
+class FlakyBackend(LocmemBackend):
+    """Backend em memória cuja primeira sessão cai no primeiro envio."""
+    falhas = 1
+
+    def send_messages(self, messages):
+        if FlakyBackend.falhas:
+            FlakyBackend.falhas -= 1
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        return super().send_messages(messages)
+
+
+class RecusaBackend(LocmemBackend):
+    """Backend em memória que recusa destinatários conforme o prefixo do endereço."""
+
+    def send_messages(self, messages):
+        destinatario = messages[0].to[0]
+        if destinatario.startswith('inexistente'):
+            raise smtplib.SMTPRecipientsRefused({destinatario: (550, b'5.1.1 User unknown')})
+        if destinatario.startswith('limitado'):
+            raise smtplib.SMTPDataError(421, b'4.7.0 Try again later')
+        return super().send_messages(messages)
+
+
+class EmailWorkerTests(TestCase):
+    def setUp(self):
+        from . import ratelimit
+        ratelimit.limpar_limites()
+        worker.fechar_conexao()
+        self.addCleanup(worker.fechar_conexao)
+
+    def _criar_jobs(self, n):
+        return [EmailJob.objects.create(to_email=f'aluno{i}@uni.test', subject=f'Assunto {i}', text_body='corpo') for i in range(n)]
+
+    @override_settings(EMAIL_BATCH_SIZE=2)
+    def test_fila_enviada_em_lotes_por_uma_conexao(self):
+        self._criar_jobs(5)
+        conexoes = worker.smtp_stats()['connections']
+
+        call_command('send_email_queue', stdout=io.StringIO())
+
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(EmailJob.objects.filter(status='sent').count(), 5)
+        # uma única sessão para os três lotes
+        self.assertEqual(worker.smtp_stats()['connections'] - conexoes, 1)
+
+    @override_settings(EMAIL_BACKEND='notifications.tests.FlakyBackend')
+    def test_reconecta_apos_queda_do_servidor(self):
+        FlakyBackend.falhas = 1
+        self._criar_jobs(2)
+        jobs = worker.claim_pending(10)
+        reconexoes = worker.smtp_stats()['reconnects']
+
+        resultados = worker.send_jobs(jobs)
+
+        self.assertTrue(all(erro is None for _job, erro in resultados))
+        self.assertEqual(worker.smtp_stats()['reconnects'] - reconexoes, 1)
+        self.assertEqual(EmailJob.objects.filter(status='sent').count(), 2)
+
+    def test_conexao_ociosa_e_reaberta(self):
+        with override_settings(EMAIL_CONNECTION_IDLE_SECONDS=0):
+            primeira = worker._obter_conexao()
+            with patch.object(worker.time, 'monotonic', return_value=worker._local.ultimo_uso + 1):
+                self.assertIsNot(worker._obter_conexao(), primeira)
+
+
+class EmailRateLimitTests(TestCase):
+    def setUp(self):
+        from . import ratelimit
+        ratelimit.limpar_limites()
+        self.addCleanup(ratelimit.limpar_limites)
+        worker.fechar_conexao()
+        self.addCleanup(worker.fechar_conexao)
+
+    @override_settings(EMAIL_RATE_LIMIT_PER_SECOND=1, EMAIL_RATE_LIMIT_BURST=2, EMAIL_RATE_LIMITS={'rapida.test': 100})
+    def test_balde_por_dominio(self):
+        from . import ratelimit
+        self.assertEqual(ratelimit.dominio('Ana@UFPR.br'), 'ufpr.br')
+        self.assertEqual([ratelimit.reservar('ufpr.br', 0)[0] for _ in range(3)], [True, True, False])
+        # a espera curta é reservada; a longa adia o envio
+        reservado, espera = ratelimit.reservar('ufpr.br', 5)
+        self.assertTrue(reservado)
+        self.assertAlmostEqual(espera, 1, delta=0.1)
+        self.assertTrue(all(ratelimit.reservar('rapida.test', 0)[0] for _ in range(2)))
+
+    @override_settings(EMAIL_RATE_LIMIT_PER_SECOND=0.1, EMAIL_RATE_LIMIT_BURST=2)
+    def test_excedentes_voltam_para_a_fila_sem_gastar_tentativa(self):
+        jobs = [EmailJob.objects.create(to_email=f'a{i}@ufpr.br', subject='Aviso', status='sending') for i in range(4)]
+        outro = EmailJob.objects.create(to_email='b@gmail.test', subject='Aviso', status='sending')
+
+        resultados = worker.send_jobs(jobs + [outro])
+
+        self.assertEqual([job.to_email for job, erro in resultados], ['a0@ufpr.br', 'a1@ufpr.br', 'b@gmail.test'])
+        adiados = EmailJob.objects.filter(pk__in=[jobs[2].pk, jobs[3].pk])
+        self.assertTrue(all(j.status == 'pending' and j.retries == 0 and j.scheduled_at > j.created_at for j in adiados))
+
+    @override_settings(EMAIL_BACKEND='notifications.tests.RecusaBackend', EMAIL_BACKOFF_BASE_SECONDS=60)
+    def test_recusa_temporaria_pausa_o_dominio_e_permanente_falha(self):
+        from . import ratelimit
+        jobs = [
+            EmailJob.objects.create(to_email='inexistente@ufpr.br', subject='Aviso', status='sending'),
+            EmailJob.objects.create(to_email='limitado@lenta.test', subject='Aviso', status='sending'),
+            EmailJob.objects.create(to_email='outro@lenta.test', subject='Aviso', status='sending'),
+            EmailJob.objects.create(to_email='ok@ufpr.br', subject='Aviso', status='sending'),
+        ]
+
+        worker.send_jobs(jobs)
+
+        estados = {j.to_email: j for j in EmailJob.objects.all()}
+        self.assertEqual((estados['inexistente@ufpr.br'].status, estados['inexistente@ufpr.br'].retries), ('failed', 1))
+        self.assertEqual((estados['limitado@lenta.test'].status, estados['limitado@lenta.test'].retries), ('pending', 0))
+        # o domínio pausado não recebe mais tentativas neste lote
+        self.assertEqual((estados['outro@lenta.test'].status, estados['outro@lenta.test'].retries), ('pending', 0))
+        self.assertEqual(estados['ok@ufpr.br'].status, 'sent')
+        self.assertEqual([m.to for m in mail.outbox], [['ok@ufpr.br']])
+        self.assertEqual(ratelimit.estado()['lenta.test']['refusals'], 1)
+        self.assertGreater(ratelimit.estado()['lenta.test']['paused_seconds'], 50)
+
+
+class EmailServicesTests(TestCase):
+    def test_certificado_pronto_vai_para_a_fila(self):
+        from usuarios.models import Usuario, TipoUsuario
+        from .services import queue_certificate_ready_email
+        tipo, _ = TipoUsuario.objects.get_or_create(tipo='Aluno')
+        usuario = Usuario.objects.create(nome='Aluno Fila', tipo=tipo, nome_usuario='aluno_fila', email='fila@uni.test')
+
+        job = queue_certificate_ready_email(usuario, cert=None)
+
+        # nada é enviado na requisição; o worker entrega depois
+        self.assertEqual(mail.outbox, [])
+        self.assertIn(EmailJob.objects.get(pk=job.pk).status, ('pending', 'sending'))
+
+    def test_espera_limitada_pela_confirmacao(self):
+        from .services import enqueue_email, EmailDeliveryError
+        inicio = worker.time.monotonic()
+        job = enqueue_email('espera@uni.test', 'Assunto', text_body='corpo', wait=0.3)
+        self.assertLess(worker.time.monotonic() - inicio, 2)
+        self.assertNotEqual(job.status, 'sent')
+
+        # a primeira tentativa falhou: o chamador é avisado e o job segue na fila
+        with patch('notifications.services.aguardar_envio') as aguardar:
+            aguardar.return_value = EmailJob(pk=job.pk, status='pending', retries=1, last_error='550 rejeitado')
+            with self.assertRaisesMessage(EmailDeliveryError, '550 rejeitado'):
+                enqueue_email('espera@uni.test', 'Assunto', text_body='corpo', wait=5)
+
+    def test_aguardar_envio_retorna_quando_enviado(self):
+        job = EmailJob.objects.create(to_email='ok@uni.test', subject='Assunto', status='sent')
+        self.assertEqual(worker.aguardar_envio(job.pk, 5).status, 'sent')
+
+    def test_enqueue_bulk_em_poucas_consultas(self):
+        from .services import enqueue_bulk
+        mensagens = [{'to_email': f'p{i}@uni.test', 'subject': 'Certificado', 'text_body': 'corpo'} for i in range(30)]
+        mensagens.append(None)  # participantes sem email são ignorados
+
+        # savepoint + INSERT em massa (2 lotes) + release + UPDATE para 'sending'
+        with patch('notifications.services.push_jobs', return_value=True) as push, self.assertNumQueries(5):
+            jobs = enqueue_bulk(mensagens, chunk_size=20)
+
+        # uma única notificação ao worker com todos os jobs
+        push.assert_called_once_with([job.pk for job in jobs], EmailJob.PRIORITY_BULK)
+
+        self.assertEqual(len(jobs), 30)
+        self.assertEqual(EmailJob.objects.filter(to_email__startswith='p').count(), 30)
+
+    @override_settings(DEBUG=False)
+    def test_templates_compilados_uma_vez_por_lote(self):
+        from django.template.loader import render_to_string
+        from usuarios.models import Usuario, TipoUsuario
+        from . import services
+        services.limpar_cache_templates()
+        tipo, _ = TipoUsuario.objects.get_or_create(tipo='Aluno')
+        usuarios = [Usuario.objects.create(nome=f'Aluno {i}', tipo=tipo, nome_usuario=f'aluno_tpl_{i}', email=f't{i}@uni.test') for i in range(3)]
+
+        with patch('notifications.services.get_template', wraps=services.get_template) as carregar:
+            mensagens = services._mensagens_certificado_pronto([(u, None) for u in usuarios])
+            services._mensagens_certificado_pronto([(usuarios[0], None)])
+        self.assertEqual(carregar.call_count, 2)  # txt e html, uma vez cada
+
+        # mesmo resultado da renderização completa por destinatário
+        ctx = services._contexto_certificado_evento()
+        ctx.update(services._variaveis_certificado(usuarios[1], None, ctx['site_url']))
+        self.assertEqual(mensagens[1]['html_body'], render_to_string('emails/certificate_ready.html', ctx))
+        self.assertEqual(mensagens[1]['text_body'], render_to_string('emails/certificate_ready.txt', ctx))
+
+
+class EmailAttachmentTests(TestCase):
+    def setUp(self):
+        from . import attachments
+        self.attachments = attachments
+        attachments.limpar_cache_anexos()
+        self.addCleanup(attachments.limpar_cache_anexos)
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def _arquivo(self, nome, conteudo):
+        caminho = os.path.join(self.dir.name, nome)
+        with open(caminho, 'wb') as f:
+            f.write(conteudo)
+        return caminho
+
+    def test_anexo_pequeno_lido_uma_vez_e_relido_se_mudar(self):
+        caminho = self._arquivo('logo.png', b'png-1')
+        for _ in range(3):
+            self.assertEqual(self.attachments.ler_bytes(caminho), b'png-1')
+        self.assertEqual(self.attachments.cache_stats()['misses'], 1)
+        self.assertEqual(self.attachments.cache_stats()['hits'], 2)
+
+        self._arquivo('logo.png', b'png-2-alterado')
+        self.assertEqual(self.attachments.ler_bytes(caminho), b'png-2-alterado')
+
+    @override_settings(EMAIL_ATTACHMENT_CACHE_MAX_FILE=1024)
+    def test_anexo_grande_codificado_em_blocos(self):
+        conteudo = os.urandom(200 * 1024)
+        caminho = self._arquivo('certificado.pdf', conteudo)
+        msg = mail.EmailMultiAlternatives('Assunto', 'corpo', to=['a@uni.test'])
+
+        self.attachments.anexar(msg, {'path': caminho})
+
+        parte = msg.message().get_payload()[-1]
+        self.assertEqual(parte.get_content_type(), 'application/pdf')
+        self.assertEqual(parte.get_filename(), 'certificado.pdf')
+        self.assertEqual(parte.get_payload(decode=True), conteudo)
+        self.assertEqual(self.attachments.cache_stats()['size'], 0)
+        self.assertEqual(self.attachments.cache_stats()['streamed'], 0)
+
+        # Serializada em blocos, a mensagem é a mesma do gerador padrão
+        saida = io.BytesIO()
+        self.attachments.escrever_mensagem(msg.message(), saida)
+        lida = message_from_bytes(saida.getvalue())
+        self.assertEqual(lida.get_payload()[0].get_payload(), 'corpo')
+        self.assertEqual(lida.get_payload()[-1].get_payload(decode=True), conteudo)
+        self.assertEqual(self.attachments.cache_stats()['streamed'], 1)
+
+    @override_settings(EMAIL_ATTACHMENT_CACHE_MAX_FILE=1024)
+    def test_envio_smtp_escreve_data_em_blocos(self):
+        conteudo = os.urandom(400 * 1024)
+        caminho = self._arquivo('certificado.pdf', conteudo)
+        msg = mail.EmailMultiAlternatives('Assunto', '.linha com ponto\ncorpo', from_email='n@uni.test', to=['a@uni.test'])
+        self.attachments.anexar(msg, {'path': caminho})
+        self.assertTrue(self.attachments.precisa_envio_em_blocos(msg))
+
+        class SMTPFalso:
+            def __init__(self):
+                self.enviados = []
+                self.respostas = [(354, b'go'), (250, b'ok')]
+            def ehlo_or_helo_if_needed(self):
+                pass
+            def mail(self, remetente):
+                return 250, b'ok'
+            def rcpt(self, destinatario):
+                return 250, b'ok'
+            def putcmd(self, cmd):
+                self.cmd = cmd
+            def getreply(self):
+                return self.respostas.pop(0)
+            def send(self, dados):
+                self.enviados.append(dados)
+
+        smtp = SMTPFalso()
+        self.assertTrue(self.attachments.enviar_smtp(SimpleNamespace(connection=smtp), msg))
+        dados = b''.join(smtp.enviados)
+        self.assertTrue(dados.endswith(b'\r\n.\r\n'))
+        # Nenhuma escrita carrega o anexo inteiro
+        self.assertLess(max(len(d) for d in smtp.enviados), len(conteudo))
+        lida = message_from_bytes(dados[:-3].replace(b'\r\n..', b'\r\n.'))
+        self.assertEqual(lida.get_payload()[0].get_payload().replace('\r\n', '\n'), '.linha com ponto\ncorpo')
+        self.assertEqual(lida.get_payload()[-1].get_payload(decode=True), conteudo)
+        self.assertIn(b'\r\n..linha com ponto', dados)
+
+    def test_anexo_compartilhado_por_nome(self):
+        caminho = self._arquivo('favicon.png', b'\x89PNG')
+        with patch.object(self.attachments, '_anexos_compartilhados', return_value={
+            'sg-logo': {'path': caminho, 'name': 'favicon.png', 'mimetype': 'image/png', 'cid': 'sg-logo'},
+        }):
+            msg = mail.EmailMultiAlternatives('Assunto', 'corpo', to=['a@uni.test'])
+            self.assertTrue(self.attachments.anexar(msg, {'asset': 'sg-logo'}))
+        self.assertEqual(msg.mixed_subtype, 'related')
+        self.assertEqual(msg.attachments[0]['Content-ID'], '<sg-logo>')
+
+
+class EmailWorkerAgendaTests(TestCase):
+    def setUp(self):
+        # isola a agenda das threads do worker iniciadas pelo app
+        fila = patch.object(worker, '_socket_queue', None)
+        fila.start()
+        self.addCleanup(fila.stop)
+        with worker._agenda_lock:
+            worker._agenda.clear()
+        self.addCleanup(worker._agenda.clear)
+
+    def test_espera_ate_o_proximo_vencimento(self):
+        from django.utils import timezone
+        varredura = worker.time.monotonic() + 60
+        self.assertAlmostEqual(worker._segundos_ate_acordar(varredura), 60, delta=1)
+
+        worker.agendar(timezone.now() + timezone.timedelta(seconds=10), timezone.now() + timezone.timedelta(seconds=30))
+        self.assertAlmostEqual(worker._segundos_ate_acordar(varredura), 10, delta=1)
+
+        # vencimentos passados acordam imediatamente e são descartados na varredura
+        worker.agendar(timezone.now() - timezone.timedelta(seconds=1))
+        self.assertEqual(worker._segundos_ate_acordar(varredura), 0)
+        worker._descartar_vencidos()
+        self.assertEqual(len(worker._agenda), 2)
+
+    def test_envio_agendado_fora_do_worker_segue_pela_porta(self):
+        from django.utils import timezone
+        from .services import enqueue_email
+        quando = timezone.now() + timezone.timedelta(minutes=5)
+
+        # processo web: a agenda local não é lida, o vencimento vai para o worker
+        with patch('notifications.services.worker_no_processo', return_value=False), \
+                patch('notifications.services._enviar_pela_porta', return_value=True) as porta:
+            enqueue_email('w@uni.test', 'Agendado', text_body='corpo', when=quando)
+        self.assertEqual(worker._agenda, [])
+        linhas = list(porta.call_args.args[0])
+        self.assertEqual(linhas, [f'@{quando.timestamp()}'])
+
+        # o worker adiciona o vencimento recebido à própria agenda
+        _ids, vencimentos = worker._ler_push('\n'.join(linhas))
+        worker.agendar(*vencimentos)
+        self.assertEqual(worker._agenda, [quando.timestamp()])
+
+        # com o worker no próprio processo, o vencimento entra direto na agenda
+        worker._agenda.clear()
+        with patch('notifications.services.worker_no_processo', return_value=True), \
+                patch('notifications.services._enviar_pela_porta') as porta:
+            enqueue_email('w@uni.test', 'Agendado', text_body='corpo', when=quando)
+        porta.assert_not_called()
+        self.assertEqual(worker._agenda, [quando.timestamp()])
+
+    def test_retentativa_entra_na_agenda(self):
+        job = EmailJob.objects.create(to_email='r@uni.test', subject='Assunto', status='sending')
+        worker._reagendar(job, Exception('421 tente mais tarde'))
+        self.assertEqual(worker._agenda, [job.scheduled_at.timestamp()])
+
+
+class EmailClaimTests(TestCase):
+    def test_claim_atomico_de_varios_jobs(self):
+        from django.utils import timezone
+        agora = timezone.now()
+        jobs = [
+            EmailJob.objects.create(to_email=f'c{i}@uni.test', subject='Assunto', scheduled_at=agora - timezone.timedelta(minutes=3 - i))
+            for i in range(3)
+        ]
+        EmailJob.objects.create(to_email='futuro@uni.test', subject='Assunto', scheduled_at=agora + timezone.timedelta(hours=1))
+        EmailJob.objects.filter(pk=jobs[0].pk).update(attachments=[{'asset': 'sg-logo'}])
+
+        with self.assertNumQueries(1):
+            primeiros = worker.claim_pending(2)
+
+        self.assertEqual([j.pk for j in primeiros], [jobs[0].pk, jobs[1].pk])
+        self.assertTrue(all(j.status == 'sending' for j in primeiros))
+        self.assertEqual(primeiros[0].attachments, [{'asset': 'sg-logo'}])
+        # nenhum job é reclamado duas vezes; o agendado para o futuro fica na fila
+        self.assertEqual([j.pk for j in worker.claim_pending(10)], [jobs[2].pk])
+        self.assertEqual(worker.claim_pending(10), [])
+
+    def test_claim_sem_returning_usa_transacao(self):
+        EmailJob.objects.create(to_email='l@uni.test', subject='Assunto')
+        with patch.object(worker, '_suporta_update_returning', return_value=False):
+            self.assertEqual(len(worker.claim_pending(5)), 1)
+        self.assertEqual(EmailJob.objects.get(to_email='l@uni.test').status, 'sending')
+
+
+    def _fila_mista(self):
+        from django.utils import timezone
+        agora = timezone.now()
+        massa = [
+            EmailJob.objects.create(to_email=f'm{i}@uni.test', subject='Aviso', priority=EmailJob.PRIORITY_BULK,
+                                    scheduled_at=agora - timezone.timedelta(seconds=60 - i))
+            for i in range(3)
+        ]
+        velho = EmailJob.objects.create(to_email='velho@uni.test', subject='Aviso', priority=EmailJob.PRIORITY_BULK,
+                                        scheduled_at=agora - timezone.timedelta(hours=1))
+        senha = EmailJob.objects.create(to_email='senha@uni.test', subject='Recuperação', priority=EmailJob.PRIORITY_HIGH)
+        return massa, velho, senha
+
+    @override_settings(EMAIL_PRIORITY_AGING_SECONDS=600)
+    def test_claim_por_prioridade_com_envelhecimento(self):
+        massa, velho, senha = self._fila_mista()
+        # o aviso pendente há uma hora conta como prioridade máxima e sai primeiro
+        self.assertEqual([j.pk for j in worker.claim_pending(2)], [velho.pk, senha.pk])
+        self.assertEqual([j.pk for j in worker.claim_pending(10)], [j.pk for j in massa])
+
+    @override_settings(EMAIL_PRIORITY_AGING_SECONDS=600)
+    def test_claim_por_prioridade_sem_returning(self):
+        massa, velho, senha = self._fila_mista()
+        with patch.object(worker, '_suporta_update_returning', return_value=False):
+            self.assertEqual([j.pk for j in worker.claim_pending(3)], [velho.pk, senha.pk, massa[0].pk])
+
+    def test_fila_do_processo_atende_prioridade_antes(self):
+        from queue import PriorityQueue
+        with patch.object(worker, '_socket_queue', PriorityQueue()):
+            worker.push_jobs([1, 2, 3], EmailJob.PRIORITY_BULK)
+            worker.push_jobs([4], EmailJob.PRIORITY_HIGH)
+            self.assertEqual(worker._item_ids(worker._socket_queue.get_nowait()), [4])
+        self.assertEqual(
+            worker._ler_push('7 0\n8\nlixo\n9 9\n@1700000000.5\n@lixo\n'),
+            ({0: [7], 5: [8], 9: [9]}, [1700000000.5]),
+        )
+
+    def test_servicos_definem_prioridade(self):
+        from django.contrib.auth.models import User
+        user = User.objects.create_user('prio', email='prio@uni.test', password='x')
+        with patch('notifications.services._entregar_ao_worker') as entregar:
+            from .services import enqueue_bulk, queue_password_recovery_email
+            queue_password_recovery_email(user, login_url='/login/')
+            enqueue_bulk([{'to_email': 'b@uni.test', 'subject': 'Aviso'}])
+        self.assertEqual(EmailJob.objects.get(to_email='prio@uni.test').priority, EmailJob.PRIORITY_HIGH)
+        self.assertEqual(EmailJob.objects.get(to_email='b@uni.test').priority, EmailJob.PRIORITY_BULK)
+        self.assertEqual([c.args[1] for c in entregar.call_args_list], [EmailJob.PRIORITY_HIGH, EmailJob.PRIORITY_BULK])
+
+
+class NotificationWorkerCommandTests(TestCase):
+    def test_encerramento_ordenado(self):
+        with patch.object(worker, '_socket_port', 0), patch.object(worker, 'claim_pending', return_value=[]), \
+                patch.object(worker, 'recuperar_jobs_presos', return_value=0):
+            worker.start_background_worker(num_cert_threads=2)
+            self.assertTrue(worker.worker_metrics()['running'])
+            self.assertTrue(worker.stop_background_worker(timeout=5))
+        metricas = worker.worker_metrics()
+        self.assertFalse(metricas['running'])
+        self.assertEqual(metricas['threads_alive'], 0)
+
+    def test_lote_interrompido_volta_para_a_fila(self):
+        jobs = [EmailJob.objects.create(to_email=f's{i}@uni.test', subject='Assunto', status='sending') for i in range(2)]
+        worker._parar.set()
+        self.addCleanup(worker._parar.clear)
+
+        self.assertEqual(worker.send_jobs(jobs), [])
+
+        self.assertEqual(list(EmailJob.objects.filter(to_email__startswith='s').values_list('status', flat=True)), ['pending', 'pending'])
+        self.assertEqual(mail.outbox, [])
+
+    def test_jobs_presos_em_sending_voltam_para_a_fila(self):
+        from django.utils import timezone
+        preso = EmailJob.objects.create(to_email='preso@uni.test', subject='Assunto', status='sending')
+        recente = EmailJob.objects.create(to_email='recente@uni.test', subject='Assunto', status='sending')
+        # processo que morreu há 20 minutos (updated_at tem auto_now: ajusta via UPDATE)
+        EmailJob.objects.filter(pk=preso.pk).update(updated_at=timezone.now() - timezone.timedelta(minutes=20))
+        self.addCleanup(setattr, worker, '_proxima_recuperacao', 0.0)
+        worker._proxima_recuperacao = 0.0
+
+        with override_settings(EMAIL_SENDING_TIMEOUT_SECONDS=600):
+            self.assertEqual(worker.recuperar_jobs_presos(), 1)
+            # no máximo uma vez por intervalo de varredura
+            EmailJob.objects.filter(pk=recente.pk).update(updated_at=timezone.now() - timezone.timedelta(minutes=20))
+            self.assertEqual(worker.recuperar_jobs_presos(), 0)
+
+        self.assertEqual(EmailJob.objects.get(pk=preso.pk).status, 'pending')
+        self.assertEqual(EmailJob.objects.get(pk=recente.pk).status, 'sending')
+
+    def test_push_recusado_devolve_jobs_a_fila(self):
+        import socket
+        from queue import PriorityQueue
+        # entrega tudo ou nada: sem espaço para todos os itens, nada entra na fila
+        with patch.object(worker, '_socket_queue', PriorityQueue(maxsize=2)), override_settings(EMAIL_BATCH_SIZE=1):
+            self.assertTrue(worker.push_jobs([1]))
+            self.assertFalse(worker.push_jobs([2, 3]))
+            self.assertEqual(worker._socket_queue.qsize(), 1)
+
+        # pela porta do worker, IDs recusados voltam para 'pending'
+        with patch.object(worker, '_socket_port', 0), patch.object(worker, 'claim_pending', return_value=[]), \
+                patch.object(worker, 'recuperar_jobs_presos', return_value=0), \
+                patch.object(worker, 'push_jobs', return_value=False), patch.object(worker, '_devolver_a_fila') as devolver:
+            worker.start_background_worker(num_cert_threads=1)
+            try:
+                with socket.create_connection(worker._socket_server.getsockname()) as conexao:
+                    conexao.sendall(b'41 5\n42 5\n')
+                for _ in range(50):
+                    if devolver.called:
+                        break
+                    worker.time.sleep(0.05)
+            finally:
+                worker.stop_background_worker(timeout=5)
+        devolver.assert_any_call([41, 42])
+
+    def test_autostart_padrao_apenas_no_runserver(self):
+        from django.apps import apps
+        config = apps.get_app_config('notifications')
+        with override_settings(EMAIL_WORKER_AUTOSTART=None), patch.dict(os.environ, {'RUN_MAIN': 'true'}), \
+                patch('notifications.worker.start_background_worker') as iniciar:
+            with patch('sys.argv', ['manage.py', 'runserver']):
+                config.ready()
+            iniciar.assert_called_once()
+            with patch('sys.argv', ['manage.py', 'test']):
+                config.ready()
+            iniciar.assert_called_once()
+            # configuração explícita vale para qualquer comando
+            with override_settings(EMAIL_WORKER_AUTOSTART=False), patch('sys.argv', ['manage.py', 'runserver']):
+                config.ready()
+            iniciar.assert_called_once()
+
+    def test_health_e_metrics(self):
+        import json
+        from urllib.error import HTTPError
+        from urllib.request import urlopen
+        from .management.commands.run_notification_worker import _servidor_saude
+        servidor = _servidor_saude(0)
+        self.addCleanup(servidor.shutdown)
+        base = f'http://127.0.0.1:{servidor.server_address[1]}'
+
+        with urlopen(f'{base}/metrics') as resposta:
+            self.assertIn('smtp', json.loads(resposta.read()))
+        # sem o worker rodando neste processo, a saúde é 'degraded'
+        with self.assertRaises(HTTPError) as erro:
+            urlopen(f'{base}/health')
+        self.assertEqual(erro.exception.code, 503)
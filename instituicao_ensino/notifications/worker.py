@@ -3,118 +3,681 @@
 Worker de envio de emails em background para a aplicação.
 
 Gerencia fila de jobs de email, threads de envio, socket para push e reenvio automático em caso de falha.
+
+Cada thread de envio mantém uma conexão de longa duração com o backend de email
+(`get_connection()`), reaberta de forma transparente após ociosidade
+(`settings.EMAIL_CONNECTION_IDLE_SECONDS`) ou queda do servidor. Os jobs são
+reclamados em lotes (`settings.EMAIL_BATCH_SIZE`) e cada lote é enviado pela
+mesma sessão SMTP.
+
+A fila tem prioridades (`EmailJob.priority`, menor = antes): emails de fluxos
+interativos passam à frente de avisos em massa, tanto na fila do processo quanto
+na reclamação no banco. Para que os avisos em massa não esperem indefinidamente,
+jobs pendentes há mais de `settings.EMAIL_PRIORITY_AGING_SECONDS` são reclamados
+como se tivessem a maior prioridade.
+
+O envio respeita o limite de taxa por domínio do destinatário (`ratelimit`).
+Jobs de um domínio pausado ou saturado voltam para a fila sem gastar tentativa.
+Recusas SMTP temporárias (4xx) pausam o domínio e adiam o job sem gastar
+tentativa (até `settings.EMAIL_DEFER_MAX_SECONDS` desde a criação); recusas
+permanentes (5xx) marcam o job como 'failed' na hora.
 """
 
+import os
+import heapq
+import itertools
+import logging
 import threading
 import time
-import mimetypes
+import smtplib
 import socket
-from queue import Queue
+from queue import PriorityQueue, Empty
 from django.utils import timezone
 from django.conf import settings
-from django.core.mail import EmailMultiAlternatives
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.smtp import EmailBackend as SMTPBackend
+from django.db import connections, router, transaction
+from django.db.models import Case, F, PositiveSmallIntegerField, Value, When
 from .models import EmailJob
+from .attachments import anexar, enviar_smtp, precisa_envio_em_blocos
+from . import ratelimit
+
+
+logger = logging.getLogger(__name__)
 
 
 _worker_started = False
-_socket_queue: Queue | None = None
+# Itens: (prioridade, sequência, [ids]); avisos internos usam prioridade -1
+_socket_queue: PriorityQueue | None = None
+_sequencia = itertools.count()
 _socket_server_thread: threading.Thread | None = None
+_socket_server: socket.socket | None = None
+_threads: list[threading.Thread] = []
+# Sinaliza o encerramento ordenado das threads do worker
+_parar = threading.Event()
+_metricas = {'started_at': None}
 _socket_host = '127.0.0.1'
 _socket_port = int(getattr(settings, 'EMAIL_QUEUE_PORT', 9099))
 
+# Conexão SMTP de longa duração, uma por thread de envio
+_local = threading.local()
+_stats_lock = threading.Lock()
+_estatisticas = {'connections': 0, 'reconnects': 0, 'sent': 0}
+
+# Próximos vencimentos (timestamps) de jobs agendados ou em retentativa
+_agenda = []
+_agenda_lock = threading.Lock()
+# Serializa as entregas na fila do processo (ver `push_jobs`)
+_fila_lock = threading.Lock()
+# Próxima recuperação de jobs presos em 'sending' neste processo (monotonic)
+_proxima_recuperacao = 0.0
+_recuperacao_lock = threading.Lock()
+_MAX_AGENDA = 10000
+
+# Sinalizada a cada lote processado, para quem aguarda a entrega de um job
+_entregas = threading.Condition()
+
+
+def _idle_seconds():
+    return float(getattr(settings, 'EMAIL_CONNECTION_IDLE_SECONDS', 30))
+
+
+def _safety_seconds():
+    return float(getattr(settings, 'EMAIL_WORKER_SAFETY_SECONDS', 60))
+
+
+def _sending_timeout_seconds():
+    return float(getattr(settings, 'EMAIL_SENDING_TIMEOUT_SECONDS', 900))
+
+
+def _rate_max_wait():
+    return float(getattr(settings, 'EMAIL_RATE_MAX_WAIT_SECONDS', 2))
+
+
+def _defer_max_seconds():
+    return float(getattr(settings, 'EMAIL_DEFER_MAX_SECONDS', 86400))
+
+
+def email_batch_size():
+    return max(1, int(getattr(settings, 'EMAIL_BATCH_SIZE', 50)))
+
+
+def smtp_stats():
+    """
+    Contadores das conexões SMTP deste processo.
+
+    Retorna:
+        dict: connections (sessões abertas), reconnects (reaberturas após queda)
+        e sent (mensagens enviadas).
+    """
+    with _stats_lock:
+        return dict(_estatisticas)
+
+
+def _contar(chave, n=1):
+    with _stats_lock:
+        _estatisticas[chave] += n
+
+
+def _obter_conexao():
+    """
+    Retorna a conexão do backend de email desta thread, abrindo-a se preciso.
+    Uma conexão ociosa há mais de `settings.EMAIL_CONNECTION_IDLE_SECONDS` é
+    fechada e reaberta, pois o servidor provavelmente já a encerrou.
+    """
+    conexao = getattr(_local, 'conexao', None)
+    if conexao is not None and time.monotonic() - getattr(_local, 'ultimo_uso', 0) > _idle_seconds():
+        fechar_conexao()
+        conexao = None
+    if conexao is None:
+        conexao = get_connection(fail_silently=False)
+        conexao.open()
+        _local.conexao = conexao
+        _local.ultimo_uso = time.monotonic()
+        _contar('connections')
+    return conexao
+
+
+def fechar_conexao():
+    """
+    Fecha a conexão SMTP da thread atual (se houver).
+    """
+    conexao = getattr(_local, 'conexao', None)
+    _local.conexao = None
+    if conexao is not None:
+        try:
+            conexao.close()
+        except Exception:
+            pass
+
+
+def _fechar_se_ociosa():
+    if getattr(_local, 'conexao', None) is not None and time.monotonic() - getattr(_local, 'ultimo_uso', 0) > _idle_seconds():
+        fechar_conexao()
+
+
+def _montar_mensagem(job: EmailJob):
+    """
+    Monta a mensagem de um EmailJob, com HTML e anexos (imagens com `cid` vão inline).
+    """
+    msg = EmailMultiAlternatives(
+        subject=job.subject,
+        body=job.text_body or '',
+        from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', None),
+        to=[job.to_email],
+    )
+    if job.html_body:
+        msg.attach_alternative(job.html_body, 'text/html')
+    for att in (job.attachments or []):
+        try:
+            anexar(msg, att)
+        except Exception:
+            continue
+    return msg
+
+
+def _enviar_mensagem(msg):
+    """
+    Envia a mensagem pela conexão da thread. Se o servidor derrubou a sessão,
+    reconecta uma vez e tenta de novo.
+    """
+    for tentativa in range(2):
+        conexao = _obter_conexao()
+        try:
+            if isinstance(conexao, SMTPBackend) and precisa_envio_em_blocos(msg):
+                # Anexos grandes: o DATA é escrito em blocos, sem montar a mensagem inteira
+                enviar_smtp(conexao, msg)
+            else:
+                conexao.send_messages([msg])
+        except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+            # Resposta do servidor (4xx/5xx): a sessão segue válida
+            raise
+        except (smtplib.SMTPServerDisconnected, OSError):
+            fechar_conexao()
+            if tentativa:
+                raise
+            _contar('reconnects')
+            continue
+        _local.ultimo_uso = time.monotonic()
+        _contar('sent')
+        return
+
+
+def agendar(*quandos):
+    """
+    Registra vencimentos futuros (envios agendados ou retentativas) para acordar
+    o worker deste processo na hora certa, sem consultar o banco até lá.
+    Aceita datetimes ou timestamps (como chegam pela porta do worker).
+    Acima de `_MAX_AGENDA` entradas, os excedentes ficam para a varredura de segurança.
+    """
+    with _agenda_lock:
+        for quando in set(quandos):
+            if len(_agenda) >= _MAX_AGENDA:
+                break
+            heapq.heappush(_agenda, quando if isinstance(quando, (int, float)) else quando.timestamp())
+    # Acorda as threads bloqueadas para recalcularem a espera
+    _acordar()
+
+
+def _acordar():
+    """
+    Coloca na fila do processo um aviso sem jobs, à frente dos demais itens,
+    para acordar uma thread bloqueada.
+    """
+    if _socket_queue is not None:
+        try:
+            with _fila_lock:
+                _socket_queue.put_nowait((-1, next(_sequencia), []))
+        except Exception:
+            pass
+
+
+def _descartar_vencidos():
+    """
+    Remove da agenda os vencimentos já alcançados (serão reclamados no banco).
+    """
+    agora = time.time()
+    with _agenda_lock:
+        while _agenda and _agenda[0] <= agora:
+            heapq.heappop(_agenda)
+
+
+def _segundos_ate_acordar(proxima_varredura):
+    """
+    Tempo que uma thread do worker pode ficar bloqueada na fila: até o próximo
+    vencimento da agenda ou até a próxima varredura de segurança no banco.
+    """
+    espera = proxima_varredura - time.monotonic()
+    with _agenda_lock:
+        if _agenda:
+            espera = min(espera, _agenda[0] - time.time())
+    return max(0.0, espera)
+
+
+def _classificar_erro(erro):
+    """
+    Classifica uma falha de envio pela resposta SMTP.
+
+    Retorna:
+        str | None: 'permanente' (5xx), 'temporario' (4xx) ou None (falha de
+        rede, autenticação ou sem código SMTP).
+    """
+    if isinstance(erro, smtplib.SMTPAuthenticationError):
+        return None
+    codigo = getattr(erro, 'smtp_code', None)
+    if isinstance(erro, smtplib.SMTPRecipientsRefused) and erro.recipients:
+        codigo = next(iter(erro.recipients.values()))[0]
+    if not isinstance(codigo, int):
+        return None
+    if 500 <= codigo < 600:
+        return 'permanente'
+    if 400 <= codigo < 500:
+        return 'temporario'
+    return None
+
+
+def _falhar(job: EmailJob, erro):
+    """
+    Recusa permanente (5xx): o job falha sem novas tentativas.
+    """
+    job.retries += 1
+    job.status = 'failed'
+    job.last_error = str(erro)[:1000]
+    job.save(update_fields=['retries', 'status', 'last_error', 'updated_at'])
+
+
+def _adiar(job: EmailJob, segundos, erro):
+    """
+    Recusa temporária (4xx): volta o job para a fila ao fim da pausa do domínio,
+    sem gastar tentativa. Jobs criados há mais de `settings.EMAIL_DEFER_MAX_SECONDS`
+    seguem o backoff normal (`_reagendar`).
+    """
+    agora = timezone.now()
+    if job.created_at and (agora - job.created_at).total_seconds() > _defer_max_seconds():
+        _reagendar(job, erro)
+        return
+    job.status = 'pending'
+    job.scheduled_at = agora + timezone.timedelta(seconds=segundos)
+    job.last_error = str(erro)[:1000]
+    job.save(update_fields=['status', 'scheduled_at', 'last_error', 'updated_at'])
+    agendar(job.scheduled_at)
+
+
+def _adiar_por_dominio(adiados):
+    """
+    Volta para a fila, sem gastar tentativa, os jobs não enviados por causa do
+    limite de taxa: uma atualização por domínio, agendada para quando o domínio
+    volta a aceitar envios.
+
+    Parâmetros:
+        adiados (dict): domínio -> (segundos, [ids]).
+    """
+    agora = timezone.now()
+    quandos = []
+    for segundos, job_ids in adiados.values():
+        quando = agora + timezone.timedelta(seconds=segundos)
+        EmailJob.objects.filter(pk__in=job_ids, status='sending').update(status='pending', scheduled_at=quando, updated_at=agora)
+        quandos.append(quando)
+    if quandos:
+        agendar(*quandos)
+
+
+def _reagendar(job: EmailJob, erro):
+    """
+    Registra a falha do job e o reagenda com backoff exponencial (até 5 tentativas).
+    """
+    job.retries += 1
+    job.status = 'pending' if job.retries < 5 else 'failed'
+    delay_minutes = 2 ** min(job.retries, 5)
+    job.scheduled_at = timezone.now() + timezone.timedelta(minutes=delay_minutes)
+    job.last_error = str(erro)[:1000]
+    job.save(update_fields=['retries', 'status', 'scheduled_at', 'last_error', 'updated_at'])
+    if job.status == 'pending':
+        agendar(job.scheduled_at)
+
+
+def send_jobs(jobs):
+    """
+    Envia um lote de EmailJobs (já em 'sending') pela mesma sessão SMTP.
+
+    As mensagens são enviadas uma a uma sobre a conexão da thread, de modo que
+    a falha de um destinatário não afeta os demais, e no ritmo permitido para o
+    domínio de cada destinatário (`ratelimit`). Os jobs enviados são marcados
+    como 'sent' em uma única atualização; os que falharam são reagendados,
+    adiados (4xx) ou marcados como 'failed' (5xx) individualmente.
+
+    Retorna:
+        list: tuplas (job, erro ou None), na ordem recebida. Jobs adiados pelo
+        limite de taxa, sem tentativa de envio, não aparecem.
+    """
+    resultados = []
+    enviados = []
+    adiados = {}
+    max_espera = _rate_max_wait()
+    for indice, job in enumerate(jobs):
+        if _parar.is_set():
+            # Encerrando: termina a mensagem em andamento e devolve o resto à fila
+            _devolver_a_fila([j.pk for j in jobs[indice:]])
+            break
+        dominio = ratelimit.dominio(job.to_email)
+        if dominio in adiados:
+            adiados[dominio][1].append(job.pk)
+            continue
+        reservado, espera = ratelimit.reservar(dominio, max_espera)
+        if not reservado:
+            adiados[dominio] = (espera, [job.pk])
+            continue
+        if espera and _parar.wait(espera):
+            _devolver_a_fila([j.pk for j in jobs[indice:]])
+            break
+        try:
+            _enviar_mensagem(_montar_mensagem(job))
+        except Exception as e:
+            tipo = _classificar_erro(e)
+            if tipo == 'permanente':
+                _falhar(job, e)
+            elif tipo == 'temporario':
+                _adiar(job, ratelimit.registrar_recusa(dominio), e)
+            else:
+                _reagendar(job, e)
+            resultados.append((job, e))
+            continue
+        ratelimit.registrar_sucesso(dominio)
+        enviados.append(job.pk)
+        resultados.append((job, None))
+    _adiar_por_dominio(adiados)
+    if enviados:
+        agora = timezone.now()
+        EmailJob.objects.filter(pk__in=enviados).update(status='sent', sent_at=agora, last_error='', updated_at=agora)
+        for job, erro in resultados:
+            if erro is None:
+                job.status, job.sent_at, job.last_error = 'sent', agora, ''
+    with _entregas:
+        _entregas.notify_all()
+    return resultados
+
+
+def _devolver_a_fila(job_ids):
+    """
+    Volta para 'pending' jobs reclamados por este processo e ainda não enviados.
+    """
+    if job_ids:
+        EmailJob.objects.filter(pk__in=list(job_ids), status='sending').update(status='pending', updated_at=timezone.now())
+
+
+def recuperar_jobs_presos():
+    """
+    Volta para 'pending' os jobs em 'sending' sem atualização há mais de
+    `settings.EMAIL_SENDING_TIMEOUT_SECONDS`: foram reclamados ou recebidos por
+    um processo do worker que morreu antes de enviá-los (o comando
+    `run_notification_worker` reinicia o processo, mas não as linhas dele).
+    Executada na varredura de segurança, no máximo uma vez por intervalo de
+    varredura em cada processo.
+
+    Retorna:
+        int: quantidade de jobs devolvidos à fila.
+    """
+    global _proxima_recuperacao
+    with _recuperacao_lock:
+        if time.monotonic() < _proxima_recuperacao:
+            return 0
+        _proxima_recuperacao = time.monotonic() + _safety_seconds()
+    agora = timezone.now()
+    limite = agora - timezone.timedelta(seconds=_sending_timeout_seconds())
+    recuperados = EmailJob.objects.filter(status='sending', updated_at__lt=limite).update(status='pending', updated_at=agora)
+    if recuperados:
+        logger.warning('%s job(s) de email presos em sending voltaram para a fila', recuperados)
+    return recuperados
+
+
+def aguardar_envio(job_id: int, timeout: float):
+    """
+    Aguarda até `timeout` segundos pela primeira tentativa de envio de um job.
+
+    Acorda a cada lote processado por este processo e, no máximo a cada 250 ms,
+    consulta o status no banco (o job pode ter sido enviado por outro processo).
+
+    Retorna:
+        EmailJob | None: o job atualizado ('sent', ou com `retries` > 0 se a
+        tentativa falhou; ainda na fila se o tempo esgotou), ou None se não existe.
+    """
+    limite = time.monotonic() + max(0.0, timeout)
+    while True:
+        job = EmailJob.objects.filter(pk=job_id).first()
+        if job is None or job.status in ('sent', 'failed') or job.retries > 0:
+            return job
+        restante = limite - time.monotonic()
+        if restante <= 0:
+            return job
+        with _entregas:
+            _entregas.wait(min(0.25, restante))
+
 
 def _send_job(job: EmailJob):
     """
     Envia um único EmailJob, atualizando o status conforme sucesso ou falha.
     Reagenda o job em caso de erro, com backoff exponencial.
     """
-    try:
-        # job should already be in 'sending' state
-        msg = EmailMultiAlternatives(
-            subject=job.subject,
-            body=job.text_body or '',
-            from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', None),
-            to=[job.to_email],
-        )
-        if job.html_body:
-            msg.attach_alternative(job.html_body, 'text/html')
-        for att in (job.attachments or []):
-            try:
-                path = att.get('path')
-                name = att.get('name') or (path.split('/')[-1] if path else 'anexo')
-                ctype = att.get('mimetype') or mimetypes.guess_type(path)[0] or 'application/octet-stream'
-                with open(path, 'rb') as f:
-                    msg.attach(name, f.read(), ctype)
-            except Exception:
-                continue
-        msg.send(fail_silently=False)
-        job.status = 'sent'
-        job.sent_at = timezone.now()
-        job.last_error = ''
-        job.save(update_fields=['status', 'sent_at', 'last_error', 'updated_at'])
-    except Exception as e:
-        job.retries += 1
-        job.status = 'pending' if job.retries < 5 else 'failed'
-        delay_minutes = 2 ** min(job.retries, 5)
-        job.scheduled_at = timezone.now() + timezone.timedelta(minutes=delay_minutes)
-        job.last_error = str(e)[:1000]
-        job.save(update_fields=['retries', 'status', 'scheduled_at', 'last_error', 'updated_at'])
+    send_jobs([job])
+
 
+def _aging_seconds():
+    return float(getattr(settings, 'EMAIL_PRIORITY_AGING_SECONDS', 300))
 
-def _try_claim_one_pending():
+
+def _prioridade_efetiva(job, limite_envelhecimento):
     """
-    Busca e marca atomicamente um job pendente como 'sending'.
-    Retorna o job reclamado ou None se não houver disponível.
+    Prioridade usada na reclamação: jobs vencidos antes de `limite_envelhecimento`
+    sobem para a maior prioridade (proteção contra espera indefinida).
+    """
+    if job.scheduled_at <= limite_envelhecimento:
+        return EmailJob.PRIORITY_HIGH
+    return job.priority
+
+
+def _suporta_update_returning(conexao):
+    """
+    Indica se o banco executa `UPDATE ... RETURNING` (PostgreSQL e SQLite >= 3.35).
+    """
+    if conexao.vendor == 'postgresql':
+        return True
+    if conexao.vendor == 'sqlite':
+        import sqlite3
+        return sqlite3.sqlite_version_info >= (3, 35, 0)
+    return False
+
+
+def _claim_returning(conexao, alias, limit, agora, limite_envelhecimento):
+    """
+    Reclama os jobs em um único comando: o UPDATE escolhe os vencidos em uma
+    subconsulta, por prioridade efetiva e vencimento, e devolve as linhas atualizadas. No PostgreSQL a subconsulta usa
+    FOR UPDATE SKIP LOCKED, de modo que processos concorrentes pegam linhas
+    diferentes em vez de disputar as primeiras; no SQLite a escrita já é
+    serializada pelo lock do banco.
+    """
+    qn = conexao.ops.quote_name
+
+    def campo(nome):
+        return qn(EmailJob._meta.get_field(nome).column)
+
+    tabela = qn(EmailJob._meta.db_table)
+    pk = qn(EmailJob._meta.pk.column)
+    lock = ' FOR UPDATE SKIP LOCKED' if conexao.vendor == 'postgresql' else ''
+    sql = (
+        f"UPDATE {tabela} SET {campo('status')} = %s, {campo('updated_at')} = %s "
+        f"WHERE {pk} IN ("
+        f"SELECT {pk} FROM {tabela} WHERE {campo('status')} = %s AND {campo('scheduled_at')} <= %s "
+        f"ORDER BY CASE WHEN {campo('scheduled_at')} <= %s THEN %s ELSE {campo('priority')} END, "
+        f"{campo('scheduled_at')} LIMIT %s{lock}"
+        f") RETURNING *"
+    )
+    params = [
+        'sending', conexao.ops.adapt_datetimefield_value(agora),
+        'pending', conexao.ops.adapt_datetimefield_value(agora),
+        conexao.ops.adapt_datetimefield_value(limite_envelhecimento), EmailJob.PRIORITY_HIGH, limit,
+    ]
+    return list(EmailJob.objects.db_manager(alias).raw(sql, params))
+
+
+def _claim_com_lock(alias, limit, agora, limite_envelhecimento):
+    """
+    Alternativa para bancos sem `UPDATE ... RETURNING`: seleciona com
+    SKIP LOCKED (quando suportado) e atualiza na mesma transação. O `updated_at`
+    único identifica as linhas reclamadas por esta chamada.
+    """
+    with transaction.atomic(using=alias):
+        pendentes = EmailJob.objects.using(alias).filter(status='pending', scheduled_at__lte=agora).annotate(
+            prioridade_efetiva=Case(
+                When(scheduled_at__lte=limite_envelhecimento, then=Value(EmailJob.PRIORITY_HIGH)),
+                default=F('priority'),
+                output_field=PositiveSmallIntegerField(),
+            ),
+        ).order_by('prioridade_efetiva', 'scheduled_at')
+        if connections[alias].features.has_select_for_update_skip_locked:
+            pendentes = pendentes.select_for_update(skip_locked=True)
+        ids = list(pendentes.values_list('pk', flat=True)[:limit])
+        if not ids:
+            return []
+        EmailJob.objects.using(alias).filter(pk__in=ids, status='pending').update(status='sending', updated_at=agora)
+        return list(EmailJob.objects.using(alias).filter(pk__in=ids, status='sending', updated_at=agora))
+
+
+def claim_pending(limit: int):
+    """
+    Marca como 'sending', de forma atômica, até `limit` jobs pendentes cujo envio
+    já venceu e os retorna (lista possivelmente vazia), por prioridade e depois
+    por agendamento. Jobs vencidos há mais de `settings.EMAIL_PRIORITY_AGING_SECONDS`
+    contam como prioridade máxima.
+
+    É a única forma de reclamar jobs da fila: vários processos e threads podem
+    chamá-la ao mesmo tempo sem que um job seja reclamado (e enviado) duas vezes.
     """
     try:
-        now = timezone.now()
-        job = EmailJob.objects.filter(status='pending', scheduled_at__lte=now).order_by('scheduled_at').first()
-        if not job:
-            return None
-        updated = EmailJob.objects.filter(pk=job.pk, status='pending').update(status='sending', updated_at=timezone.now())
-        if updated == 1:
-            return EmailJob.objects.get(pk=job.pk)
-        return None
+        alias = router.db_for_write(EmailJob)
+        conexao = connections[alias]
+        agora = timezone.now()
+        limite_envelhecimento = agora - timezone.timedelta(seconds=_aging_seconds())
+        if _suporta_update_returning(conexao):
+            jobs = _claim_returning(conexao, alias, max(1, int(limit)), agora, limite_envelhecimento)
+        else:
+            jobs = _claim_com_lock(alias, max(1, int(limit)), agora, limite_envelhecimento)
+        return sorted(jobs, key=lambda job: (_prioridade_efetiva(job, limite_envelhecimento), job.scheduled_at, job.pk))
     except Exception:
-        return None
+        logger.exception('Falha ao reclamar jobs de email')
+        return []
 
 
-def push_job(job_id: int):
+def push_job(job_id: int, priority: int = EmailJob.PRIORITY_NORMAL):
     """
     Adiciona o ID do job na fila global de socket para consumo imediato pelo worker.
     """
+    return push_jobs([job_id], priority)
+
+
+def push_jobs(job_ids, priority: int = EmailJob.PRIORITY_NORMAL):
+    """
+    Entrega um conjunto de IDs ao worker em uma única notificação por lote
+    (`settings.EMAIL_BATCH_SIZE` IDs por item da fila). Itens de prioridade
+    menor são consumidos antes, mesmo que cheguem depois.
+    A entrega é tudo ou nada: retorna False, sem enfileirar nenhum ID, se a
+    fila do processo não existe ou não tem espaço para todos os itens.
+    """
     global _socket_queue
     if _socket_queue is None:
         return False
-    try:
-        _socket_queue.put(job_id, block=False)
-        return True
-    except Exception:
-        return False
+    job_ids = list(job_ids)
+    lote = email_batch_size()
+    itens = [job_ids[i:i + lote] for i in range(0, len(job_ids), lote)]
+    with _fila_lock:
+        # Só as threads do worker retiram itens: o espaço livre não diminui entre a checagem e os puts
+        if _socket_queue.maxsize and _socket_queue.maxsize - _socket_queue.qsize() < len(itens):
+            return False
+        for ids in itens:
+            _socket_queue.put_nowait((priority, next(_sequencia), ids))
+    return True
+
+
+def _item_ids(item):
+    return item[2]
+
+
+def _ler_push(texto):
+    """
+    Interpreta o conteúdo recebido pela porta do worker: uma linha por job,
+    `<id>` ou `<id> <prioridade>`, ou uma linha por vencimento futuro,
+    `@<timestamp>` (envios agendados por processos sem o worker).
+
+    Retorna:
+        tuple: (dict prioridade -> lista de IDs, lista de timestamps).
+    """
+    por_prioridade, vencimentos = {}, []
+    for linha in texto.replace('\r', '').split('\n'):
+        partes = linha.split()
+        if not partes:
+            continue
+        if partes[0].startswith('@'):
+            try:
+                vencimentos.append(float(partes[0][1:]))
+            except ValueError:
+                pass
+            continue
+        try:
+            job_id = int(partes[0])
+            prioridade = int(partes[1]) if len(partes) > 1 else EmailJob.PRIORITY_NORMAL
+        except ValueError:
+            continue
+        por_prioridade.setdefault(prioridade, []).append(job_id)
+    return por_prioridade, vencimentos
+
+
+def worker_no_processo():
+    """
+    Indica se o worker roda neste processo (e, portanto, lê a agenda local).
+    """
+    return _worker_started and not _parar.is_set()
 
 
 def start_background_worker(interval_seconds: int = 5, num_cert_threads: int = 2):
     """
     Inicia o processamento em background com múltiplas threads para envio de emails.
-    Inclui servidor socket para push e polling periódico do banco de dados.
+    Inclui servidor socket para push. As threads ficam bloqueadas na fila até
+    receber jobs, até o próximo vencimento da agenda (`agendar`) ou até a
+    varredura de segurança no banco (`settings.EMAIL_WORKER_SAFETY_SECONDS`).
+    `interval_seconds` é a pausa após um erro inesperado.
+
+    Em produção é iniciado pelo comando `run_notification_worker`; use
+    `stop_background_worker` para encerrar.
     """
-    global _worker_started
+    global _worker_started, _socket_queue, _socket_server, _socket_server_thread
     if _worker_started:
         return
+    _parar.clear()
+    _metricas['started_at'] = time.time()
     # Create global socket queue
-    global _socket_queue
-    _socket_queue = Queue(maxsize=1000)
+    _socket_queue = PriorityQueue(maxsize=1000)
 
-    # Start TCP socket server to receive job IDs in real-time
-    def socket_server():
-        srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    # TCP socket server to receive job IDs in real-time. Com SO_REUSEPORT, vários
+    # processos do worker escutam na mesma porta e o kernel distribui as conexões.
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if hasattr(socket, 'SO_REUSEPORT'):
         try:
-            srv.bind((_socket_host, _socket_port))
-            srv.listen(5)
-        except Exception:
-            return
-        while True:
+            srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        except OSError:
+            pass
+    try:
+        srv.bind((_socket_host, _socket_port))
+        srv.listen(5)
+        # accept() acorda periodicamente para perceber o encerramento
+        srv.settimeout(1.0)
+        _socket_server = srv
+    except Exception:
+        srv.close()
+        _socket_server = None
+        logger.warning('Porta %s do worker de email indisponível; recebendo jobs apenas pelo banco', _socket_port)
+
+    def socket_server():
+        while not _parar.is_set():
             try:
                 conn, _addr = srv.accept()
             except Exception:
@@ -129,56 +692,148 @@ def start_background_worker(interval_seconds: int = 5, num_cert_threads: int = 2
                             break
                         data += chunk
                     text = data.decode('utf-8', errors='ignore')
-                    for part in text.replace('\r','').split('\n'):
-                        part = part.strip()
-                        if not part:
-                            continue
-                        try:
-                            job_id = int(part)
-                            _socket_queue.put(job_id, block=False)
-                        except Exception:
-                            continue
+                    por_prioridade, vencimentos = _ler_push(text)
+                    for prioridade, job_ids in por_prioridade.items():
+                        if not push_jobs(job_ids, prioridade):
+                            # Fila cheia: os jobs voltam para 'pending' e são reclamados na varredura
+                            _devolver_a_fila(job_ids)
+                    if vencimentos:
+                        agendar(*vencimentos)
             except Exception:
                 continue
 
-    global _socket_server_thread
-    _socket_server_thread = threading.Thread(target=socket_server, name='EmailSocketServer', daemon=True)
-    _socket_server_thread.start()
+    if _socket_server is not None:
+        _socket_server_thread = threading.Thread(target=socket_server, name='EmailSocketServer', daemon=True)
+        _socket_server_thread.start()
 
     # Start worker threads (two for certificates as requested)
     def worker_loop(idx: int):
-        while True:
+        lote = email_batch_size()
+        # Varredura inicial: recupera jobs pendentes deixados por execuções anteriores
+        proxima_varredura = time.monotonic()
+        while not _parar.is_set():
             try:
-                # Prefer consuming from socket queue if available
-                job = None
+                # Bloqueia na fila até o próximo vencimento conhecido ou a varredura de segurança
+                espera = _segundos_ate_acordar(proxima_varredura)
+                job_ids = []
+                acordado = False
                 try:
-                    if _socket_queue is not None:
-                        job_id = _socket_queue.get(block=False)
-                        try:
-                            job = EmailJob.objects.get(pk=job_id)
-                            # job should already be 'sending' set by producer; do not re-claim here
-                        except EmailJob.DoesNotExist:
-                            job = None
-                except Exception:
-                    job = None
-
-                # Fallback: claim from DB if queue empty
-                if job is None:
-                    job = _try_claim_one_pending()
-                if job is None:
-                    time.sleep(interval_seconds)
+                    item = _socket_queue.get(timeout=espera) if espera > 0 else _socket_queue.get_nowait()
+                    acordado = True
+                    job_ids.extend(_item_ids(item))
+                    # Drena o que mais estiver na fila, até um lote (no encerramento,
+                    # deixa os avisos de parada para as outras threads)
+                    while len(job_ids) < lote and not _parar.is_set():
+                        job_ids.extend(_item_ids(_socket_queue.get_nowait()))
+                except Empty:
+                    pass
+                if _parar.is_set():
+                    _devolver_a_fila(job_ids)
+                    break
+
+                if job_ids:
+                    # jobs should already be 'sending' set by producer; do not re-claim here
+                    jobs = list(EmailJob.objects.filter(pk__in=job_ids, status='sending').order_by('priority', 'scheduled_at'))
+                    if jobs:
+                        send_jobs(jobs)
+                    continue
+                if acordado:
+                    # Aviso de novo vencimento na agenda: recalcula a espera
+                    continue
+
+                # Um job agendado venceu ou é hora da varredura de segurança
+                _descartar_vencidos()
+                recuperar_jobs_presos()
+                jobs = claim_pending(lote)
+                if jobs:
+                    send_jobs(jobs)
+                    # Pode haver mais jobs vencidos: varre de novo sem esperar
+                    proxima_varredura = time.monotonic()
                     continue
-                _send_job(job)
+                proxima_varredura = time.monotonic() + _safety_seconds()
+                _fechar_se_ociosa()
             except Exception:
-                time.sleep(interval_seconds)
+                logger.exception('Erro no worker de email %s', idx)
+                fechar_conexao()
+                _parar.wait(interval_seconds)
+        fechar_conexao()
+        connections.close_all()
 
+    _threads.clear()
     for i in range(max(1, num_cert_threads)):
         t = threading.Thread(target=worker_loop, args=(i,), name=f'EmailWorker-{i}', daemon=True)
         t.start()
+        _threads.append(t)
 
     _worker_started = True
 
 
+def stop_background_worker(timeout: float = 30):
+    """
+    Encerra o worker de forma ordenada: para de aceitar jobs, deixa cada thread
+    terminar a mensagem em andamento e devolve à fila ('pending') os jobs
+    recebidos que não chegaram a ser enviados.
+
+    Retorna:
+        bool: True se todas as threads terminaram dentro de `timeout` segundos.
+    """
+    global _worker_started, _socket_server
+    if not _worker_started:
+        return True
+    _parar.set()
+    if _socket_server is not None:
+        try:
+            _socket_server.close()
+        except Exception:
+            pass
+        _socket_server = None
+    # Acorda as threads bloqueadas na fila
+    for _t in _threads:
+        _acordar()
+    limite = time.monotonic() + timeout
+    for t in _threads:
+        t.join(max(0.0, limite - time.monotonic()))
+    encerrou = not any(t.is_alive() for t in _threads)
+
+    # Jobs entregues a este processo que ninguém chegou a processar
+    pendentes = []
+    try:
+        while True:
+            pendentes.extend(_item_ids(_socket_queue.get_nowait()))
+    except Empty:
+        pass
+    _devolver_a_fila(pendentes)
+    _worker_started = False
+    return encerrou
+
+
+def worker_metrics():
+    """
+    Saúde e métricas do worker deste processo.
+
+    Retorna:
+        dict: pid, running, threads vivas/total, uptime, tamanho da fila do
+        processo e da agenda, contadores SMTP (`smtp_stats`) e do cache de anexos.
+    """
+    from .attachments import cache_stats as anexos_stats
+    with _agenda_lock:
+        agenda = len(_agenda)
+    iniciado = _metricas.get('started_at')
+    return {
+        'pid': os.getpid(),
+        'running': worker_no_processo(),
+        'threads_alive': sum(1 for t in _threads if t.is_alive()),
+        'threads': len(_threads),
+        'uptime_seconds': round(time.time() - iniciado, 1) if iniciado else 0,
+        'queue_size': _socket_queue.qsize() if _socket_queue is not None else 0,
+        'scheduled': agenda,
+        'listening': _socket_server is not None,
+        'smtp': smtp_stats(),
+        'attachments': anexos_stats(),
+        'rate_limited_domains': ratelimit.estado(),
+    }
+
+
 def send_job_now(job_id: int):
     """
     Força o envio imediato de um job de email, tentando push via socket e fallback direto.
@@ -190,12 +845,12 @@ def send_job_now(job_id: int):
     if job.status != 'pending':
         return
     # Try to push into socket for immediate processing via queue or TCP
-    if push_job(job.id):
+    if push_job(job.id, job.priority):
         return
     # TCP push as fallback
     try:
         with socket.create_connection((_socket_host, _socket_port), timeout=1.0) as s:
-            s.sendall(f"{job.id}\n".encode('utf-8'))
+            s.sendall(f"{job.id} {job.priority}\n".encode('utf-8'))
             return
     except Exception:
         pass
@@ -25,4 +25,16 @@ class AuditLogAdmin(admin.ModelAdmin):
 	list_filter = ('action', 'object_type', 'timestamp')
 	search_fields = ('description', 'object_id')
 	readonly_fields = ('timestamp',)
-	date_hierarchy = 'timestamp'
\ No newline at end of file
+	date_hierarchy = 'timestamp'
+
+from .models import CertificateBatchJob
+
+@admin.register(CertificateBatchJob)
+class CertificateBatchJobAdmin(admin.ModelAdmin):
+	"""
+	Acompanhamento dos jobs de geração de certificados por evento.
+	"""
+	list_display = ('id', 'evento', 'status', 'total', 'done', 'failed', 'created_at', 'finished_at')
+	list_filter = ('status',)
+	search_fields = ('evento__titulo',)
+	readonly_fields = ('created_at', 'started_at', 'finished_at', 'updated_at')
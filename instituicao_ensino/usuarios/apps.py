@@ -18,6 +18,7 @@ class UsuariosConfig(AppConfig):
         Executa inicializações ao carregar o app:
         - Registra os signal handlers do app.
         - Cria automaticamente um superusuário 'admin' caso não exista, exceto durante migrações, testes ou coletstatic.
+        - Retoma jobs de certificados interrompidos no processo principal do runserver.
         - Lida com possíveis exceções para evitar falhas na inicialização.
         """
         # Registra os signal handlers do app
@@ -42,6 +43,14 @@ class UsuariosConfig(AppConfig):
             # Cria superusuário admin padrão se não existir
             if not UserModel.objects.filter(username='admin').exists():
                 UserModel.objects.create_superuser(username='admin', email='', password='123456')
+
+            # Retoma jobs de certificados interrompidos (apenas no processo principal do runserver;
+            # em produção use o comando process_certificate_jobs)
+            import os
+            import threading
+            if 'runserver' in argv and os.environ.get('RUN_MAIN') == 'true':
+                from .jobs import retomar_jobs
+                threading.Timer(5.0, retomar_jobs).start()
         except (ProgrammingError, OperationalError):
             # DB não está pronto; ignora criação automática
             pass
@@ -0,0 +1,272 @@
+"""
+Benchmark do gerador de certificados (`usuarios.generator`).
+
+Para cada tamanho pedido, monta um evento sintético com N inscrições validadas
+em um MEDIA_ROOT temporário, executa `generate_certificates_parallel` e mede:
+
+- tempo de parede e de CPU (processo principal + workers do pool);
+- pico de memória residente (RSS) do processo principal e dos workers;
+- bytes e arquivos gravados em disco;
+- quantidade de consultas ao banco feitas pela geração.
+
+Os dados sintéticos são criados dentro de uma transação desfeita ao final de
+cada rodada e os arquivos ficam em um diretório temporário removido em seguida,
+de modo que o benchmark pode rodar contra qualquer banco sem deixar resíduos.
+O relatório é um dict serializável em JSON (ver `executar_benchmark`), para
+comparar resultados entre commits.
+"""
+
+import os
+import sys
+import time
+import shutil
+import platform
+import resource
+import tempfile
+import subprocess
+from django.conf import settings
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+
+TAMANHOS_PADRAO = (1, 100, 1000, 5000)
+
+
+# =============================================================================
+# MEDIÇÕES DO PROCESSO
+# =============================================================================
+
+def _zerar_pico_rss():
+    """
+    Zera o pico de RSS (VmHWM) do processo, quando o kernel permite.
+    Retorna True se o pico passou a refletir apenas a rodada atual.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _pico_rss_kb():
+    """
+    Pico de RSS do processo em KB (VmHWM no Linux, `ru_maxrss` nos demais).
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for linha in f:
+                if linha.startswith('VmHWM:'):
+                    return int(linha.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS informa em bytes
+    return maximo // 1024 if sys.platform == 'darwin' else maximo
+
+
+def _tempos_cpu():
+    """
+    Tempo de CPU (usuário + sistema) do processo e dos filhos já finalizados.
+    """
+    tempos = os.times()
+    return tempos.user + tempos.system, tempos.children_user + tempos.children_system
+
+
+def _bytes_gravados(raiz):
+    """
+    Soma o tamanho dos arquivos sob `raiz`, separando os certificados dos demais
+    (base do evento em cache, pastas do evento).
+    """
+    total = certificados = arquivos = 0
+    for pasta, _dirs, nomes in os.walk(raiz):
+        for nome in nomes:
+            tamanho = os.path.getsize(os.path.join(pasta, nome))
+            total += tamanho
+            arquivos += 1
+            if os.sep + 'certificados' in pasta:
+                certificados += tamanho
+    return total, certificados, arquivos
+
+
+def _commit_atual():
+    """
+    Hash do commit do repositório, se o git estiver disponível.
+    """
+    try:
+        saida = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return saida.stdout.strip() or None
+
+
+# =============================================================================
+# DADOS SINTÉTICOS
+# =============================================================================
+
+def _criar_evento_sintetico(quantidade):
+    """
+    Cria um evento finalizado com `quantidade` inscrições validadas.
+    Usuários e inscrições são inseridos em massa (sem passar por `Usuario.save`).
+    """
+    from eventos.models import Evento, TipoEvento, InscricaoEvento
+    from usuarios.models import Usuario, TipoUsuario, Instituicao
+
+    tipo_aluno, _ = TipoUsuario.objects.get_or_create(tipo='Aluno')
+    tipo_prof, _ = TipoUsuario.objects.get_or_create(tipo='Professor')
+    tipo_ev, _ = TipoEvento.objects.get_or_create(tipo='Palestra')
+    inst = Instituicao.objects.create(nome='Instituicao Benchmark')
+    sufixo = timezone.now().strftime('%Y%m%d%H%M%S%f')
+
+    organizador = Usuario.objects.create(
+        nome='Organizador Benchmark', tipo=tipo_prof, instituicao=inst,
+        nome_usuario=f'bench_org_{sufixo}',
+    )
+    hoje = timezone.now().date()
+    evento = Evento.objects.create(
+        titulo=f'Benchmark de Certificados {quantidade}', tipo=tipo_ev, modalidade='online',
+        data_inicio=hoje, data_fim=hoje, horario=timezone.now().time(), link='https://example.com',
+        organizador='Organização Benchmark', criador=organizador, horas=4, finalizado=True,
+    )
+
+    participantes = Usuario.objects.bulk_create([
+        Usuario(
+            nome=f'Participante Benchmark {i:05d}', tipo=tipo_aluno, instituicao=inst,
+            nome_usuario=f'bench_{sufixo}_{i}', base_dir=f'usuarios/bench_{sufixo}_{i}_Instituicao_Benchmark',
+        )
+        for i in range(quantidade)
+    ], batch_size=500)
+    if participantes and participantes[0].pk is None:
+        # Bancos sem RETURNING: recarrega as chaves
+        participantes = list(Usuario.objects.filter(nome_usuario__startswith=f'bench_{sufixo}_'))
+    InscricaoEvento.objects.bulk_create([
+        InscricaoEvento(evento=evento, inscrito=usuario, is_validated=True) for usuario in participantes
+    ], batch_size=500)
+    return evento
+
+
+# =============================================================================
+# EXECUÇÃO
+# =============================================================================
+
+def medir_geracao(quantidade, workers=None, chunk_size=None):
+    """
+    Executa uma rodada do benchmark para um evento com `quantidade` inscrições.
+
+    Os caches de base e de recursos do gerador são limpos antes da rodada, de
+    modo que cada tamanho é medido a frio.
+
+    Retorna:
+        dict: métricas da rodada (totais e por certificado).
+    """
+    from usuarios import generator
+
+    media_root = tempfile.mkdtemp(prefix='bench_certificados_')
+    try:
+        with override_settings(MEDIA_ROOT=media_root), transaction.atomic():
+            evento = _criar_evento_sintetico(quantidade)
+            generator.limpar_cache_bases()
+            generator.limpar_cache_recursos()
+
+            rss_isolado = _zerar_pico_rss()
+            cpu_inicio, cpu_filhos_inicio = _tempos_cpu()
+            inicio = time.perf_counter()
+            with CaptureQueriesContext(connection) as consultas:
+                resultado = generator.generate_certificates_parallel(evento.id, workers=workers, chunk_size=chunk_size)
+            parede = time.perf_counter() - inicio
+            cpu_fim, cpu_filhos_fim = _tempos_cpu()
+
+            pico_rss = _pico_rss_kb()
+            bytes_total, bytes_certificados, arquivos = _bytes_gravados(media_root)
+            # Nada do evento sintético permanece no banco
+            transaction.set_rollback(True)
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
+        generator.limpar_cache_bases()
+
+    cpu_principal = cpu_fim - cpu_inicio
+    cpu_workers = cpu_filhos_fim - cpu_filhos_inicio
+    gerados = resultado['generated']
+    divisor = gerados or 1
+    return {
+        'size': quantidade,
+        'generated': gerados,
+        'workers': resultado['workers'],
+        'chunks': len(resultado['chunks']),
+        'wall_seconds': round(parede, 4),
+        'cpu_seconds': round(cpu_principal + cpu_workers, 4),
+        'cpu_seconds_main': round(cpu_principal, 4),
+        'cpu_seconds_workers': round(cpu_workers, 4),
+        'peak_rss_kb': pico_rss,
+        'peak_rss_isolated': rss_isolado,
+        # Maior processo filho já finalizado (o kernel não zera este pico)
+        'peak_rss_workers_kb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        'bytes_written': bytes_total,
+        'bytes_certificates': bytes_certificados,
+        'files_written': arquivos,
+        'db_queries': len(consultas.captured_queries),
+        'per_certificate': {
+            'wall_ms': round(parede * 1000 / divisor, 3),
+            'cpu_ms': round((cpu_principal + cpu_workers) * 1000 / divisor, 3),
+            'bytes': bytes_certificados // divisor,
+            'db_queries': round(len(consultas.captured_queries) / divisor, 3),
+        },
+    }
+
+
+def executar_benchmark(tamanhos=TAMANHOS_PADRAO, workers=None, chunk_size=None):
+    """
+    Executa o benchmark para cada tamanho de evento.
+
+    Parâmetros:
+        tamanhos (iterable): quantidades de inscrições validadas por rodada.
+        workers (int): processos do pool (padrão: `settings.CERTIFICADOS_WORKERS`).
+        chunk_size (int): inscrições por lote (padrão: `settings.CERTIFICADOS_CHUNK_SIZE`).
+
+    Retorna:
+        dict: ambiente (commit, Python, plataforma, modo do PDF...) e a lista
+        `runs` com as métricas de `medir_geracao` de cada tamanho.
+    """
+    import django
+    from usuarios import generator
+
+    return {
+        'benchmark': 'certificados',
+        'commit': _commit_atual(),
+        'timestamp': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'database': connection.vendor,
+        'pdf_mode': generator._modo_pdf(),
+        'design_version': generator.DESIGN_VERSION,
+        'runs': [medir_geracao(int(n), workers=workers, chunk_size=chunk_size) for n in tamanhos],
+    }
+
+
+def comparar(atual, anterior):
+    """
+    Compara dois relatórios, tamanho a tamanho.
+
+    Retorna:
+        list: dicts com size e a variação relativa (%) de wall_ms, cpu_ms e
+        db_queries por certificado (negativo = mais rápido/menos consultas).
+    """
+    anteriores = {run['size']: run for run in anterior.get('runs', [])}
+    linhas = []
+    for run in atual.get('runs', []):
+        base = anteriores.get(run['size'])
+        if not base:
+            continue
+        linha = {'size': run['size']}
+        for chave in ('wall_ms', 'cpu_ms', 'db_queries'):
+            antes = base['per_certificate'].get(chave)
+            depois = run['per_certificate'].get(chave)
+            linha[chave] = round((depois - antes) * 100 / antes, 1) if antes else None
+        linhas.append(linha)
+    return linhas
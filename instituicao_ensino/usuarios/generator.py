@@ -9,511 +9,1732 @@ Características:
 - Tipografia hierárquica e elegante
 - Elementos decorativos nobres
 - QR code para verificação
-- Saída em PNG e PDF de alta qualidade
+- Saída em PDF vetorial (padrão, ver `settings.CERTIFICADOS_PDF_MODO`) e PNG
+  gerado sob demanda para pré-visualização (`obter_png_certificado`)
+
+Camadas do desenho:
+- Camada estática: bordas, cabeçalho, ornamentos, selo, título "CERTIFICADO",
+  textos fixos e linha de rodapé. Igual para todos os certificados.
+- Camada do evento: título, datas, organização, rodapé institucional e marca
+  d'água. Igual para todos os participantes de um mesmo evento.
+- Camada do participante: nome e QR code de verificação.
+
+As duas primeiras camadas formam a "base" do certificado, desenhada uma única
+vez por (evento, versão do design) e mantida em memória e em disco dentro do
+MEDIA_ROOT. Cada certificado é então uma cópia da base com nome e QR code.
+
+Fontes e selos de QR code ficam em um cache de recursos do processo, com
+contadores de acerto/erro disponíveis em `cache_stats()`.
+
+Geração em lote:
+- Eventos pequenos são processados no próprio processo.
+- Eventos grandes são divididos em lotes renderizados por um pool de processos
+  (`settings.CERTIFICADOS_WORKERS`). Os workers não acessam o banco: recebem os
+  textos do evento (e, no modo raster, a base já desenhada), o nome e a URL de
+  cada participante e devolvem os bytes do PDF (e do PNG, no modo raster). O
+  processo principal grava os arquivos e faz as escritas de `Certificado` em massa.
 """
 
 import os
 import io
 import uuid
+import hashlib
+import time
+import threading
+from collections import OrderedDict
 from textwrap import wrap
 from django.conf import settings
 from django.core.files.base import ContentFile
 from django.utils.text import slugify
 
-def generate_certificates_for_event(evento_id):
-    """
-    Gera certificados em PNG e PDF para todos os inscritos validados de um evento.
-    O design utiliza tema vermelho vinho e dourado, com elementos decorativos, QR code e marca d'água.
 
-    Parâmetros:
-        evento_id (int): ID do evento para o qual gerar os certificados.
+# =============================================================================
+# CONFIGURAÇÕES DE CORES E DESIGN - TEMA VERMELHO VINHO E DOURADO
+# =============================================================================
+
+# Versão do design: incremente ao alterar qualquer elemento visual para que as
+# bases em cache (memória e disco) sejam descartadas automaticamente.
+DESIGN_VERSION = 1
+
+# Dimensões do certificado
+LARGURA, ALTURA = 1400, 990
+
+# Paleta de cores nobre para o certificado
+CORES = {
+    'vinho_escuro': (139, 0, 0),      # #8B0000 - Vermelho vinho principal
+    'vinho_medio': (120, 0, 0),       # #780000 - Vinho mais escuro
+    'dourado_principal': (212, 175, 55),   # #D4AF37 - Dourado brilhante
+    'dourado_escuro': (180, 150, 40), # #B49628 - Dourado para contornos
+    'dourado_claro': (225, 190, 80),  # #E1BE50 - Dourado para realces
+    'creme': (240, 235, 225),         # #FAF5EB - Fundo creme elegante
+    'branco': (255, 255, 255),        # #FFFFFF - Branco puro
+    'cinza_escuro': (20, 20, 20),     # #282828 - Texto principal
+    'cinza_medio': (60, 60, 60),      # #505050 - Texto secundário
+}
+
+# Geometria compartilhada entre as camadas
+ALTURA_CABECALHO = 120
+POS_Y_NOME = ALTURA * 0.45
+TAMANHO_QR = 120
+POS_X_QR = LARGURA - 120
+POS_Y_QR = ALTURA - 140
+
+# Quantidade máxima de bases mantidas em memória (~4 MB cada)
+_MAX_BASES_EM_MEMORIA = 8
+
+_bases_cache = OrderedDict()
+_bases_lock = threading.Lock()
+
+
+# =============================================================================
+# CACHE DE RECURSOS (FONTES E QR CODE)
+# =============================================================================
+# Compartilhado entre todas as chamadas do processo (e por worker do pool):
+# - caminhos candidatos das fontes, montados uma única vez;
+# - fonte escolhida por estilo, resolvida uma única vez por lista de candidatos;
+# - objetos FreeTypeFont indexados por (caminho, tamanho), incluindo as falhas,
+#   para que fontes ausentes não voltem a consultar o sistema de arquivos;
+# - matrizes de QR code e selos já no tamanho final, indexados pela URL.
+
+# Quantidade máxima de QR codes (matriz + selo) mantidos em memória (~45 KB cada)
+_MAX_QR_EM_MEMORIA = 256
+
+_recursos_lock = threading.Lock()
+_caminhos_padrao = None
+_estilos_resolvidos = {}
+_fontes_cache = {}
+_qr_cache = OrderedDict()
+_estatisticas = {
+    'fontes': {'hits': 0, 'misses': 0},
+    'estilos': {'hits': 0, 'misses': 0},
+    'qr': {'hits': 0, 'misses': 0},
+}
+
+
+def _contar(tipo, hit):
+    with _recursos_lock:
+        _estatisticas[tipo]['hits' if hit else 'misses'] += 1
+
+
+def cache_stats():
+    """
+    Contadores de acerto/erro dos caches de recursos deste processo.
 
     Retorna:
-        int: Número de certificados gerados.
+        dict: por cache ('fontes', 'estilos', 'qr', 'bases'), hits, misses e size.
     """
-    # =========================================================================
-    # IMPORTAÇÕES E CONFIGURAÇÕES INICIAIS
-    # =========================================================================
-    # Importações locais para evitar problemas de importação circular
-    from eventos.models import Evento
-    from usuarios.models import Certificado
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib.utils import ImageReader
-    from PIL import Image, ImageDraw, ImageFont, ImageFilter
-    import qrcode
+    with _recursos_lock:
+        stats = {tipo: dict(contadores) for tipo, contadores in _estatisticas.items()}
+        stats['fontes']['size'] = len(_fontes_cache)
+        stats['estilos']['size'] = len(_estilos_resolvidos)
+        stats['qr']['size'] = len(_qr_cache)
+    with _bases_lock:
+        stats['bases'] = {'size': len(_bases_cache)}
+    return stats
+
+
+def limpar_cache_recursos():
+    """
+    Descarta fontes, estilos e selos de QR em cache e zera os contadores.
+    """
+    global _caminhos_padrao
+    with _recursos_lock:
+        _caminhos_padrao = None
+        _estilos_resolvidos.clear()
+        _fontes_cache.clear()
+        _qr_cache.clear()
+        for contadores in _estatisticas.values():
+            contadores['hits'] = contadores['misses'] = 0
+
+
+# =============================================================================
+# CONFIGURAÇÕES DE FONTES
+# =============================================================================
+
+def _caminhos_fontes():
+    """
+    Retorna as listas de fontes preferidas (em ordem de prioridade) por estilo.
+    As listas são montadas uma única vez por processo.
+    """
+    global _caminhos_padrao
+    if _caminhos_padrao is not None:
+        return _caminhos_padrao
 
-    # =========================================================================
-    # CONFIGURAÇÕES DE CORES E DESIGN - TEMA VERMELHO VINHO E DOURADO
-    # =========================================================================
-    # Paleta de cores nobre para o certificado
-    CORES = {
-        'vinho_escuro': (139, 0, 0),      # #8B0000 - Vermelho vinho principal
-        'vinho_medio': (120, 0, 0),       # #780000 - Vinho mais escuro
-        'dourado_principal': (212, 175, 55),   # #D4AF37 - Dourado brilhante
-        'dourado_escuro': (180, 150, 40), # #B49628 - Dourado para contornos
-        'dourado_claro': (225, 190, 80),  # #E1BE50 - Dourado para realces
-        'creme': (240, 235, 225),         # #FAF5EB - Fundo creme elegante
-        'branco': (255, 255, 255),        # #FFFFFF - Branco puro
-        'cinza_escuro': (20, 20, 20),     # #282828 - Texto principal
-        'cinza_medio': (60, 60, 60),      # #505050 - Texto secundário
+    fonts_dir = os.path.join(settings.BASE_DIR, "static", "fonts")
+    _caminhos_padrao = {
+        'bold': [
+            os.path.join(fonts_dir, "Montserrat-Bold.ttf"),
+            os.path.join(fonts_dir, "Roboto-Bold.ttf"),
+            "arialbd.ttf",
+            "DejaVuSans-Bold.ttf",
+        ],
+        'regular': [
+            os.path.join(fonts_dir, "Montserrat-Regular.ttf"),
+            os.path.join(fonts_dir, "Roboto-Regular.ttf"),
+            "arial.ttf",
+            "DejaVuSans.ttf",
+        ],
+        'elegant': [
+            os.path.join(fonts_dir, "PlayfairDisplay-Bold.ttf"),
+            os.path.join(fonts_dir, "Georgia.ttf"),
+            "timesbd.ttf",
+        ],
     }
+    return _caminhos_padrao
 
-    # =========================================================================
-    # CONFIGURAÇÕES DE FONTES
-    # =========================================================================
-    
-    # Busca o evento específico
-    evento = Evento.objects.get(pk=evento_id)
-    
-    # Obtém todas as inscrições validadas
-    inscricoes = evento.inscricaoevento_set.filter(is_validated=True)
-    generated = 0
-
-    def load_font(path, size):
-        """
-        Carrega uma fonte do sistema ou retorna None se não encontrar.
-        """
-        try:
-            return ImageFont.truetype(path, size=size)
-        except Exception:
-            return None
 
-    # Lista de fontes preferidas (em ordem de prioridade)
-    font_paths = [
-        os.path.join(settings.BASE_DIR, "static", "fonts", "Montserrat-Bold.ttf"),
-        os.path.join(settings.BASE_DIR, "static", "fonts", "Roboto-Bold.ttf"),
-        "arialbd.ttf", 
-        "DejaVuSans-Bold.ttf"
-    ]
+def _fonte(path, size):
+    """
+    Carrega uma fonte com cache por (caminho, tamanho).
+    Retorna None se a fonte não existir (a falha também fica em cache).
+    """
+    from PIL import ImageFont
 
-    font_paths_regular = [
-        os.path.join(settings.BASE_DIR, "static", "fonts", "Montserrat-Regular.ttf"),
-        os.path.join(settings.BASE_DIR, "static", "fonts", "Roboto-Regular.ttf"),
-        "arial.ttf", 
-        "DejaVuSans.ttf"
-    ]
+    chave = (path, size)
+    if chave in _fontes_cache:
+        _contar('fontes', True)
+        return _fontes_cache[chave]
+    _contar('fontes', False)
+    try:
+        fonte = ImageFont.truetype(path, size=size)
+    except Exception:
+        fonte = None
+    with _recursos_lock:
+        _fontes_cache[chave] = fonte
+    return fonte
 
-    font_paths_elegant = [
-        os.path.join(settings.BASE_DIR, "static", "fonts", "PlayfairDisplay-Bold.ttf"),
-        os.path.join(settings.BASE_DIR, "static", "fonts", "Georgia.ttf"),
-        "timesbd.ttf"
-    ]
 
+def _fonte_padrao():
+    """
+    Fonte padrão do Pillow, usada quando nenhum candidato existe (em cache).
+    """
+    from PIL import ImageFont
+
+    chave = (None, None)
+    if chave in _fontes_cache:
+        _contar('fontes', True)
+        return _fontes_cache[chave]
+    _contar('fontes', False)
+    fonte = ImageFont.load_default()
+    with _recursos_lock:
+        _fontes_cache[chave] = fonte
+    return fonte
+
+
+def _resolver_estilo(candidates):
+    """
+    Retorna o primeiro caminho carregável da lista de candidatos, ou None.
+    Cada lista é resolvida uma única vez por processo.
+    """
+    chave = tuple(candidates)
+    if chave in _estilos_resolvidos:
+        _contar('estilos', True)
+        return _estilos_resolvidos[chave]
+    _contar('estilos', False)
+    escolhido = None
+    for p in candidates:
+        # Tamanho de sondagem; o objeto fica no cache caso o tamanho seja usado
+        if _fonte(p, 16) is not None:
+            escolhido = p
+            break
+    with _recursos_lock:
+        _estilos_resolvidos[chave] = escolhido
+    return escolhido
+
+
+def _carregar_fontes(caminhos=None):
+    """
+    Carrega as fontes usadas em cada elemento do certificado.
+
+    Parâmetros:
+        caminhos (dict): listas de fontes por estilo (padrão: `_caminhos_fontes()`).
+            Os workers recebem os caminhos já resolvidos para não depender do settings.
+
+    Retorna:
+        dict: fontes indexadas pelo papel no design (titulo_principal, nome, ...).
+    """
     def pick_font(candidates, size):
         """
         Seleciona a melhor fonte disponível na lista de caminhos.
-        Retorna a primeira fonte encontrada, ou a fonte padrão se nenhuma for encontrada.
+        Retorna a fonte padrão se nenhuma for encontrada.
         """
-        for p in candidates:
-            f = load_font(p, size)
-            if f:
-                return f
-        return ImageFont.load_default()
-
-    # Definição das fontes para cada elemento
-    font_titulo_principal = pick_font(font_paths_elegant, 72)      # Título "CERTIFICADO"
-    font_nome_participante = pick_font(font_paths_elegant, 58)     # Nome em destaque
-    font_titulo_evento = pick_font(font_paths, 36)                 # Título do evento
-    font_texto_corpo = pick_font(font_paths_regular, 28)           # Texto informativo
-    font_texto_pequeno = pick_font(font_paths_regular, 20)         # Textos menores
-    font_rodape = pick_font(font_paths_regular, 16)                # Rodapé e QR
-
-    # =========================================================================
-    # PROCESSAMENTO PARA CADA INSCRITO
-    # =========================================================================
-    
-    for inscr in inscricoes:
-        usuario = inscr.inscrito
-
-        # =====================================================================
-        # CONFIGURAÇÃO DE DIRETÓRIOS E ARQUIVOS
-        # =====================================================================
-        
-        # Cria diretório específico para o usuário
-        instituicao_nome = getattr(usuario.instituicao, "nome", "sem_instituicao")
-        pasta_usuario = f"{usuario.nome_usuario}_{slugify(instituicao_nome)}"
-        cert_dir = os.path.join(settings.MEDIA_ROOT, "usuarios", pasta_usuario, "certificados")
-        os.makedirs(cert_dir, exist_ok=True)
-
-        # Nome base do arquivo
-        nome_base = f"{slugify(evento.titulo)}_{evento.data_fim.strftime('%Y_%m_%d') if evento.data_fim else 'sem_data'}"
-        pdf_path = os.path.join(cert_dir, f"{nome_base}.pdf")
-        png_path = os.path.join(cert_dir, f"{nome_base}.png")
-
-        # Verifica se certificado já existe
-        cert = Certificado.objects.filter(usuario=usuario, evento=evento).first()
-        if cert and cert.pdf and getattr(cert.pdf, 'path', None) and os.path.exists(cert.pdf.path):
-            continue  # Pula se já existir
-
-        # Garante ID público único
-        public_id = cert.public_id if cert and cert.public_id else str(uuid.uuid4())
-        if not cert:
-            cert = Certificado(usuario=usuario, evento=evento, public_id=public_id)
-        else:
-            if not cert.public_id:
-                cert.public_id = public_id
+        path = _resolver_estilo(candidates)
+        fonte = _fonte(path, size) if path else None
+        return fonte or _fonte_padrao()
 
-        cert.nome = f"{evento.titulo} - {evento.data_fim.strftime('%Y-%m-%d') if evento.data_fim else ''}"
+    caminhos = caminhos or _caminhos_fontes()
+    return {
+        'titulo_principal': pick_font(caminhos['elegant'], 72),   # Título "CERTIFICADO"
+        'nome': pick_font(caminhos['elegant'], 58),               # Nome em destaque
+        'titulo_evento': pick_font(caminhos['bold'], 36),         # Título do evento
+        'corpo': pick_font(caminhos['regular'], 28),              # Texto informativo
+        'pequeno': pick_font(caminhos['regular'], 20),            # Textos menores
+        'rodape': pick_font(caminhos['regular'], 16),             # Rodapé e QR
+        'marca': pick_font(caminhos['elegant'], 100),             # Marca d'água
+    }
 
-        # =====================================================================
-        # CRIAÇÃO DO CERTIFICADO - DESIGN DINÂMICO
-        # =====================================================================
-        
-        # Dimensões do certificado
-        LARGURA, ALTURA = 1400, 990
-        
-        # Cria imagem base com fundo creme elegante
-        certificado_img = Image.new("RGB", (LARGURA, ALTURA), CORES['creme'])
-        draw = ImageDraw.Draw(certificado_img)
-
-        # =====================================================================
-        # ELEMENTOS DECORATIVOS DO CERTIFICADO
-        # =====================================================================
-        
-        # 1. BORDAS ORNAMENTADAS
-        # ======================
-        
-        # Borda externa dourada
-        draw.rectangle([(0, 0), (LARGURA, ALTURA)], 
-                      outline=CORES['dourado_principal'], width=20)
-        
-        # Borda interna vinho
-        draw.rectangle([(30, 30), (LARGURA-30, ALTURA-30)], 
-                      outline=CORES['vinho_escuro'], width=4)
-        
-        # Linha decorativa interna dourada
-        draw.rectangle([(50, 50), (LARGURA-50, ALTURA-50)], 
-                      outline=CORES['dourado_principal'], width=2)
-
-        # 2. CABEÇALHO NOBRE
-        # ===================
-        
-        altura_cabecalho = 120
-        # Faixa superior vinho
-        draw.rectangle([(0, 0), (LARGURA, altura_cabecalho)], 
-                      fill=CORES['vinho_escuro'])
-        
-        # Linha decorativa abaixo do cabeçalho
-        draw.line([(0, altura_cabecalho), (LARGURA, altura_cabecalho)], 
-                 fill=CORES['dourado_principal'], width=6)
-
-        # 3. ORNAMENTOS DECORATIVOS NOS CANTOS
-        # ====================================
-        
-        def desenhar_ornamento_canto(x, y, tamanho=60):
-            """
-            Desenha elemento decorativo dourado nos cantos do certificado.
-            """
-            # Pontos para criar forma ornamental
-            pontos = [
-                (x, y), (x + tamanho//3, y), (x + tamanho//2, y + tamanho//4),
-                (x + tamanho*2//3, y), (x + tamanho, y), (x + tamanho, y + tamanho//3),
-                (x + tamanho*3//4, y + tamanho//2), (x + tamanho, y + tamanho*2//3),
-                (x + tamanho, y + tamanho), (x + tamanho*2//3, y + tamanho),
-                (x + tamanho//2, y + tamanho*3//4), (x + tamanho//3, y + tamanho),
-                (x, y + tamanho), (x, y + tamanho*2//3), (x + tamanho//4, y + tamanho//2),
-                (x, y + tamanho//3)
-            ]
-            draw.polygon(pontos, fill=CORES['dourado_principal'])
-        
-        # Aplica ornamentos nos quatro cantos
-        tamanho_ornamento = 60
-        margem_ornamento = 40
-        desenhar_ornamento_canto(margem_ornamento, margem_ornamento, tamanho_ornamento)
-        desenhar_ornamento_canto(LARGURA - margem_ornamento - tamanho_ornamento, margem_ornamento, tamanho_ornamento)
-        desenhar_ornamento_canto(margem_ornamento, ALTURA - margem_ornamento - tamanho_ornamento, tamanho_ornamento)
-        desenhar_ornamento_canto(LARGURA - margem_ornamento - tamanho_ornamento, ALTURA - margem_ornamento - tamanho_ornamento, tamanho_ornamento)
-
-        # 4. SELO DOURADO CENTRAL
-        # =======================
-        
-        raio_selo = 50
-        centro_x = LARGURA // 2
-        centro_y = altura_cabecalho + 80
-        
-        # Círculo principal do selo
-        draw.ellipse([(centro_x - raio_selo, centro_y - raio_selo),
-                     (centro_x + raio_selo, centro_y + raio_selo)], 
-                    fill=CORES['dourado_principal'], 
-                    outline=CORES['dourado_escuro'], width=4)
-        
-        # Anel interno
-        raio_interno = raio_selo - 12
-        draw.ellipse([(centro_x - raio_interno, centro_y - raio_interno),
-                     (centro_x + raio_interno, centro_y + raio_interno)], 
-                    outline=CORES['dourado_escuro'], width=2)
-        
-        # Estrela central
-        draw.regular_polygon((centro_x, centro_y, 20), 
-                           n_sides=8, 
-                           fill=CORES['vinho_escuro'], 
-                           outline=CORES['dourado_escuro'])
-
-        # =====================================================================
-        # CONTEÚDO TEXTUAL DO CERTIFICADO
-        # =====================================================================
-        
-        # 1. TÍTULO PRINCIPAL "CERTIFICADO"
-        # =================================
-        
-        texto_titulo = "CERTIFICADO"
-        pos_y_titulo = altura_cabecalho + 160
-        
-        # Sombra sutil para profundidade
-        draw.text((LARGURA/2 + 3, pos_y_titulo + 3), texto_titulo, 
-                 font=font_titulo_principal, 
-                 fill=CORES['vinho_medio'], 
-                 anchor="mm")
-        
-        # Texto principal
-        draw.text((LARGURA/2, pos_y_titulo), texto_titulo, 
-                 font=font_titulo_principal, 
-                 fill=CORES['vinho_escuro'], 
-                 anchor="mm")
 
-        # 2. NOME DO PARTICIPANTE (DESTAQUE MÁXIMO)
-        # ==========================================
-        
-        pos_y_nome = ALTURA * 0.45
-        
-        def desenhar_texto_com_contorno(pos, texto, fonte, cor_principal, cor_contorno, largura_contorno=3, anchor="mm"):
-            """
-            Desenha texto com contorno para destaque e legibilidade.
-            Utiliza múltiplas camadas para criar o efeito de contorno.
-            """
-            x, y = pos
-            # Desenha contorno (múltiplas posições ao redor)
-            for dx in range(-largura_contorno, largura_contorno + 1):
-                for dy in range(-largura_contorno, largura_contorno + 1):
-                    if dx == 0 and dy == 0:
-                        continue
-                    draw.text((x + dx, y + dy), texto, font=fonte, 
-                             fill=cor_contorno, anchor=anchor)
-            # Texto principal
-            draw.text((x, y), texto, font=fonte, fill=cor_principal, anchor=anchor)
-        
-        # Aplica efeito especial ao nome
-        desenhar_texto_com_contorno(
-            pos=(LARGURA/2, pos_y_nome),
-            texto=usuario.nome.upper(),
-            fonte=font_nome_participante,
-            cor_principal=CORES['dourado_principal'],
-            cor_contorno=CORES['vinho_escuro'],
-            largura_contorno=3
-        )
-
-        # 3. TEXTO DE OUTORGA
-        # ===================
-        
-        texto_outorga = "é outorgado o presente certificado por ter participado do"
-        pos_y_outorga = pos_y_nome + 80
-        
-        draw.text((LARGURA/2, pos_y_outorga), texto_outorga, 
-                 font=font_texto_corpo, 
-                 fill=CORES['cinza_escuro'], 
-                 anchor="mm")
+# =============================================================================
+# SELO DE QR CODE
+# =============================================================================
 
-        # 4. TÍTULO DO EVENTO
-        # ===================
-        
-        pos_y_evento = pos_y_outorga + 60
-        
-        # Quebra o título em múltiplas linhas se necessário
-        titulo_linhas = wrap(evento.titulo, width=50)
-        for i, linha in enumerate(titulo_linhas):
-            draw.text((LARGURA/2, pos_y_evento + i * 40), linha, 
-                     font=font_titulo_evento, 
-                     fill=CORES['vinho_escuro'], 
-                     anchor="mm")
-
-        # 5. INFORMAÇÕES ADICIONAIS DO EVENTO
-        # ====================================
-        
-        pos_y_info = pos_y_evento + len(titulo_linhas) * 45 + 40
-        
-        # Formata datas
-        data_inicio = evento.data_inicio.strftime("%d/%m/%Y") if evento.data_inicio else "data não informada"
-        data_fim = evento.data_fim.strftime("%d/%m/%Y") if evento.data_fim else None
-        texto_data = data_inicio + (f" a {data_fim}" if data_fim else "")
-        
-        # Texto de horas
-        texto_horas = f"({evento.horas} horas)" if getattr(evento, "horas", None) else ""
-        
-        # Linha de data e horas
-        linha_data_horas = f"{texto_data} {texto_horas}".strip()
-        draw.text((LARGURA/2, pos_y_info), linha_data_horas, 
-                 font=font_texto_pequeno, 
-                 fill=CORES['cinza_medio'], 
-                 anchor="mm")
+def _matriz_qr(cert_url):
+    """
+    Matriz de módulos do QR code de verificação (em cache por URL).
+    Compartilhada pelo selo do PNG e pelo QR vetorial do PDF.
 
-        # 6. INFORMAÇÕES DE ORGANIZAÇÃO
-        # ==============================
-        
-        pos_y_org = pos_y_info + 40
-        organizador = evento.organizador or "Organizador não informado"
-        local_texto = evento.local or evento.modalidade or ""
-        
-        texto_organizacao = f"Organizado por: {organizador} • Local: {local_texto}"
-        draw.text((LARGURA/2, pos_y_org), texto_organizacao, 
-                 font=font_texto_pequeno, 
-                 fill=CORES['cinza_medio'], 
-                 anchor="mm")
+    Retorna:
+        dict: entrada do cache com 'matriz' (linhas de booleanos) e 'selo'
+        (imagem do PNG, montada sob demanda).
+    """
+    import qrcode
 
-        # =====================================================================
-        # ELEMENTOS DE VALIDAÇÃO E RODAPÉ
-        # =====================================================================
-        
-        # 1. QR CODE PARA VERIFICAÇÃO
-        # ============================
-        
-        # Gera URL de verificação
-        site = getattr(settings, "SITE_URL", "").rstrip("/")
-        if site:
-            cert_url = f"{site}/usuarios/certificado/{public_id}/"
-        else:
-            cert_url = f"/usuarios/certificado/{public_id}/"
-
-        # Cria QR code
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=8,
-            border=1,
-        )
-        qr.add_data(cert_url)
-        qr.make(fit=True)
-        
-        qr_img = qr.make_image(fill_color="black", back_color="white").convert("RGB")
-        tamanho_qr = 120
-        qr_img = qr_img.resize((tamanho_qr, tamanho_qr), Image.LANCZOS)
-
-        # Posiciona QR code no rodapé
-        pos_x_qr = LARGURA - 120
-        pos_y_qr = ALTURA - 140
-        
-        # Moldura dourada para o QR
-        draw.rectangle([(pos_x_qr - 8, pos_y_qr - 8), 
-                       (pos_x_qr + tamanho_qr + 8, pos_y_qr + tamanho_qr + 8)], 
-                      outline=CORES['dourado_principal'], width=3)
-        
-        # Adiciona QR code à imagem principal
-        certificado_img.paste(qr_img, (pos_x_qr, pos_y_qr))
-
-        # Texto de verificação abaixo do QR
-        draw.text((pos_x_qr + tamanho_qr/2, pos_y_qr + tamanho_qr + 25), 
-                 "VERIFIQUE A AUTENTICIDADE", 
-                 font=font_rodape, 
-                 fill=CORES['vinho_escuro'], 
-                 anchor="mm")
+    with _recursos_lock:
+        entrada = _qr_cache.get(cert_url)
+        if entrada is not None:
+            _qr_cache.move_to_end(cert_url)
+    if entrada is not None:
+        _contar('qr', True)
+        return entrada
+    _contar('qr', False)
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        border=1,
+    )
+    qr.add_data(cert_url)
+    qr.make(fit=True)
+    entrada = {'matriz': tuple(tuple(linha) for linha in qr.get_matrix()), 'selo': None}
+
+    with _recursos_lock:
+        _qr_cache[cert_url] = entrada
+        while len(_qr_cache) > _MAX_QR_EM_MEMORIA:
+            _qr_cache.popitem(last=False)
+    return entrada
+
+
+def _geometria_qr(modulos):
+    """
+    Escala inteira dos módulos e margem para centralizar o QR em TAMANHO_QR.
+
+    Retorna:
+        tuple: (escala, lado, margem) em pixels do design.
+    """
+    escala = max(1, TAMANHO_QR // modulos)
+    lado = min(modulos * escala, TAMANHO_QR)
+    return escala, lado, (TAMANHO_QR - lado) // 2
+
+
+def _selo_qr(cert_url):
+    """
+    Gera o QR code de verificação já no tamanho final (TAMANHO_QR x TAMANHO_QR).
+
+    A matriz de módulos é ampliada por um fator inteiro com NEAREST (sem
+    reamostragem LANCZOS) e centralizada sobre fundo branco, mantendo os
+    módulos nítidos. Os selos ficam em cache por URL.
+
+    Retorna:
+        PIL.Image.Image: selo em RGB (não deve ser alterado pelo chamador).
+    """
+    from PIL import Image
+
+    entrada = _matriz_qr(cert_url)
+    if entrada['selo'] is not None:
+        return entrada['selo']
+
+    matriz = entrada['matriz']
+    modulos = len(matriz)
+    pixels = bytes(0 if modulo else 255 for linha in matriz for modulo in linha)
+    qr_img = Image.frombytes("L", (modulos, modulos), pixels)
+    _escala, lado, margem = _geometria_qr(modulos)
+    qr_img = qr_img.resize((lado, lado), Image.NEAREST)
+
+    selo = Image.new("RGB", (TAMANHO_QR, TAMANHO_QR), CORES['branco'])
+    selo.paste(qr_img, (margem, margem))
+    entrada['selo'] = selo
+    return selo
+
+
+# =============================================================================
+# CAMADA ESTÁTICA
+# =============================================================================
+
+def _desenhar_camada_estatica(draw, fontes):
+    """
+    Desenha os elementos comuns a todos os certificados: bordas, cabeçalho,
+    ornamentos, selo, título, texto de outorga, moldura do QR e rodapé.
+    """
+    # 1. BORDAS ORNAMENTADAS
+    # ======================
+
+    # Borda externa dourada
+    draw.rectangle([(0, 0), (LARGURA, ALTURA)],
+                  outline=CORES['dourado_principal'], width=20)
+
+    # Borda interna vinho
+    draw.rectangle([(30, 30), (LARGURA-30, ALTURA-30)],
+                  outline=CORES['vinho_escuro'], width=4)
+
+    # Linha decorativa interna dourada
+    draw.rectangle([(50, 50), (LARGURA-50, ALTURA-50)],
+                  outline=CORES['dourado_principal'], width=2)
+
+    # 2. CABEÇALHO NOBRE
+    # ===================
+
+    # Faixa superior vinho
+    draw.rectangle([(0, 0), (LARGURA, ALTURA_CABECALHO)],
+                  fill=CORES['vinho_escuro'])
+
+    # Linha decorativa abaixo do cabeçalho
+    draw.line([(0, ALTURA_CABECALHO), (LARGURA, ALTURA_CABECALHO)],
+             fill=CORES['dourado_principal'], width=6)
+
+    # 3. ORNAMENTOS DECORATIVOS NOS CANTOS
+    # ====================================
+
+    def desenhar_ornamento_canto(x, y, tamanho=60):
+        """
+        Desenha elemento decorativo dourado nos cantos do certificado.
+        """
+        # Pontos para criar forma ornamental
+        pontos = [
+            (x, y), (x + tamanho//3, y), (x + tamanho//2, y + tamanho//4),
+            (x + tamanho*2//3, y), (x + tamanho, y), (x + tamanho, y + tamanho//3),
+            (x + tamanho*3//4, y + tamanho//2), (x + tamanho, y + tamanho*2//3),
+            (x + tamanho, y + tamanho), (x + tamanho*2//3, y + tamanho),
+            (x + tamanho//2, y + tamanho*3//4), (x + tamanho//3, y + tamanho),
+            (x, y + tamanho), (x, y + tamanho*2//3), (x + tamanho//4, y + tamanho//2),
+            (x, y + tamanho//3)
+        ]
+        draw.polygon(pontos, fill=CORES['dourado_principal'])
+
+    # Aplica ornamentos nos quatro cantos
+    tamanho_ornamento = 60
+    margem_ornamento = 40
+    desenhar_ornamento_canto(margem_ornamento, margem_ornamento, tamanho_ornamento)
+    desenhar_ornamento_canto(LARGURA - margem_ornamento - tamanho_ornamento, margem_ornamento, tamanho_ornamento)
+    desenhar_ornamento_canto(margem_ornamento, ALTURA - margem_ornamento - tamanho_ornamento, tamanho_ornamento)
+    desenhar_ornamento_canto(LARGURA - margem_ornamento - tamanho_ornamento, ALTURA - margem_ornamento - tamanho_ornamento, tamanho_ornamento)
+
+    # 4. SELO DOURADO CENTRAL
+    # =======================
+
+    raio_selo = 50
+    centro_x = LARGURA // 2
+    centro_y = ALTURA_CABECALHO + 80
+
+    # Círculo principal do selo
+    draw.ellipse([(centro_x - raio_selo, centro_y - raio_selo),
+                 (centro_x + raio_selo, centro_y + raio_selo)],
+                fill=CORES['dourado_principal'],
+                outline=CORES['dourado_escuro'], width=4)
+
+    # Anel interno
+    raio_interno = raio_selo - 12
+    draw.ellipse([(centro_x - raio_interno, centro_y - raio_interno),
+                 (centro_x + raio_interno, centro_y + raio_interno)],
+                outline=CORES['dourado_escuro'], width=2)
+
+    # Estrela central
+    draw.regular_polygon((centro_x, centro_y, 20),
+                       n_sides=8,
+                       fill=CORES['vinho_escuro'],
+                       outline=CORES['dourado_escuro'])
+
+    # 5. TÍTULO PRINCIPAL "CERTIFICADO"
+    # =================================
+
+    texto_titulo = "CERTIFICADO"
+    pos_y_titulo = ALTURA_CABECALHO + 160
+
+    # Sombra sutil para profundidade
+    draw.text((LARGURA/2 + 3, pos_y_titulo + 3), texto_titulo,
+             font=fontes['titulo_principal'],
+             fill=CORES['vinho_medio'],
+             anchor="mm")
+
+    # Texto principal
+    draw.text((LARGURA/2, pos_y_titulo), texto_titulo,
+             font=fontes['titulo_principal'],
+             fill=CORES['vinho_escuro'],
+             anchor="mm")
 
-        # 2. LINHA DE RODAPÉ
-        # ===================
-        
-        draw.line([(80, ALTURA - 60), (LARGURA - 80, ALTURA - 60)], 
-                 fill=CORES['dourado_principal'], width=2)
-
-        # 3. INFORMAÇÕES INSTITUCIONAIS NO RODAPÉ
-        # ========================================
-        
-        instituicao_nome = getattr(evento.criador, "instituicao", "Instituição")
-        draw.text((LARGURA/2, ALTURA - 80), 
-                 f"{instituicao_nome} • EventoEnsina • www.eventoensina.com", 
-                 font=font_rodape, 
-                 fill=CORES['cinza_medio'], 
+    # 6. TEXTO DE OUTORGA
+    # ===================
+
+    texto_outorga = "é outorgado o presente certificado por ter participado do"
+    draw.text((LARGURA/2, POS_Y_NOME + 80), texto_outorga,
+             font=fontes['corpo'],
+             fill=CORES['cinza_escuro'],
+             anchor="mm")
+
+    # 7. MOLDURA E LEGENDA DO QR CODE
+    # ===============================
+
+    # Moldura dourada para o QR
+    draw.rectangle([(POS_X_QR - 8, POS_Y_QR - 8),
+                   (POS_X_QR + TAMANHO_QR + 8, POS_Y_QR + TAMANHO_QR + 8)],
+                  outline=CORES['dourado_principal'], width=3)
+
+    # Texto de verificação abaixo do QR
+    draw.text((POS_X_QR + TAMANHO_QR/2, POS_Y_QR + TAMANHO_QR + 25),
+             "VERIFIQUE A AUTENTICIDADE",
+             font=fontes['rodape'],
+             fill=CORES['vinho_escuro'],
+             anchor="mm")
+
+    # 8. LINHA DE RODAPÉ
+    # ===================
+
+    draw.line([(80, ALTURA - 60), (LARGURA - 80, ALTURA - 60)],
+             fill=CORES['dourado_principal'], width=2)
+
+
+# =============================================================================
+# CAMADA DO EVENTO
+# =============================================================================
+
+def _textos_evento(evento):
+    """
+    Monta os textos que dependem apenas do evento (iguais para todos os participantes).
+    """
+    # Formata datas
+    data_inicio = evento.data_inicio.strftime("%d/%m/%Y") if evento.data_inicio else "data não informada"
+    data_fim = evento.data_fim.strftime("%d/%m/%Y") if evento.data_fim else None
+    texto_data = data_inicio + (f" a {data_fim}" if data_fim else "")
+
+    # Texto de horas
+    texto_horas = f"({evento.horas} horas)" if getattr(evento, "horas", None) else ""
+
+    organizador = evento.organizador or "Organizador não informado"
+    local_texto = evento.local or evento.modalidade or ""
+    instituicao_nome = getattr(evento.criador, "instituicao", "Instituição")
+
+    return {
+        'titulo': evento.titulo,
+        'data_horas': f"{texto_data} {texto_horas}".strip(),
+        'organizacao': f"Organizado por: {organizador} • Local: {local_texto}",
+        'rodape': f"{instituicao_nome} • EventoEnsina • www.eventoensina.com",
+        'marca': evento.titulo[:40],  # Limita tamanho
+    }
+
+
+def _assinatura_evento(evento):
+    """
+    Gera uma assinatura curta dos textos do evento usados na base.
+    Qualquer alteração no evento (título, datas, organizador...) produz uma nova base.
+    """
+    textos = _textos_evento(evento)
+    conteudo = "|".join(f"{k}={textos[k]}" for k in sorted(textos))
+    return hashlib.sha1(conteudo.encode('utf-8')).hexdigest()[:16]
+
+
+def _desenhar_camada_evento(certificado_img, evento, fontes):
+    """
+    Desenha os elementos específicos do evento e aplica a marca d'água.
+    Retorna a imagem resultante (a marca d'água gera uma nova imagem).
+    """
+    from PIL import Image, ImageDraw
+
+    draw = ImageDraw.Draw(certificado_img)
+    textos = _textos_evento(evento)
+
+    # 1. TÍTULO DO EVENTO
+    # ===================
+
+    pos_y_evento = POS_Y_NOME + 80 + 60
+
+    # Quebra o título em múltiplas linhas se necessário
+    titulo_linhas = wrap(textos['titulo'], width=50)
+    for i, linha in enumerate(titulo_linhas):
+        draw.text((LARGURA/2, pos_y_evento + i * 40), linha,
+                 font=fontes['titulo_evento'],
+                 fill=CORES['vinho_escuro'],
                  anchor="mm")
 
-        # =====================================================================
-        # MARCA D'ÁGUA DECORATIVA
-        # =====================================================================
-        
+    # 2. INFORMAÇÕES ADICIONAIS DO EVENTO
+    # ====================================
+
+    pos_y_info = pos_y_evento + len(titulo_linhas) * 45 + 40
+
+    # Linha de data e horas
+    draw.text((LARGURA/2, pos_y_info), textos['data_horas'],
+             font=fontes['pequeno'],
+             fill=CORES['cinza_medio'],
+             anchor="mm")
+
+    # 3. INFORMAÇÕES DE ORGANIZAÇÃO
+    # ==============================
+
+    draw.text((LARGURA/2, pos_y_info + 40), textos['organizacao'],
+             font=fontes['pequeno'],
+             fill=CORES['cinza_medio'],
+             anchor="mm")
+
+    # 4. INFORMAÇÕES INSTITUCIONAIS NO RODAPÉ
+    # ========================================
+
+    draw.text((LARGURA/2, ALTURA - 80), textos['rodape'],
+             font=fontes['rodape'],
+             fill=CORES['cinza_medio'],
+             anchor="mm")
+
+    # 5. MARCA D'ÁGUA DECORATIVA
+    # ==========================
+
+    try:
+        # Cria marca d'água sutil com o título do evento
+        marca_dagua = Image.new("RGBA", certificado_img.size, (250, 250, 250, 0))
+        wdraw = ImageDraw.Draw(marca_dagua)
+
+        # Usa fonte grande e transparente
+        wdraw.text((LARGURA * 0.5, ALTURA * 0.8), textos['marca'],
+                  font=fontes['marca'],
+                  fill=(139, 0, 0, 15),  # Vinho muito transparente
+                  anchor="mm")
+
+        # Aplica marca d'água
+        certificado_img = Image.alpha_composite(
+            certificado_img.convert("RGBA"),
+            marca_dagua
+        ).convert("RGB")
+    except Exception:
+        pass  # Ignora erros na marca d'água
+
+    return certificado_img
+
+
+# =============================================================================
+# CACHE DA BASE (CAMADA ESTÁTICA + CAMADA DO EVENTO)
+# =============================================================================
+
+def _caminho_base_em_disco(evento, assinatura):
+    """
+    Caminho da base pré-renderizada do evento dentro do MEDIA_ROOT.
+    """
+    return os.path.join(
+        settings.MEDIA_ROOT, 'eventos', evento.get_gallery_name(), 'certificados',
+        f"base_v{DESIGN_VERSION}_{assinatura}.png",
+    )
+
+
+def obter_base_certificado(evento, fontes=None):
+    """
+    Retorna a base do certificado do evento (camadas estática e do evento).
+
+    A base é procurada primeiro em memória, depois em disco e, por fim, desenhada
+    e salva nos dois lugares. A imagem retornada é compartilhada: quem for desenhar
+    sobre ela deve trabalhar em uma cópia (`base.copy()`).
+
+    Parâmetros:
+        evento (Evento): evento dono da base.
+        fontes (dict): fontes já carregadas (opcional).
+
+    Retorna:
+        PIL.Image.Image: imagem RGB de LARGURA x ALTURA.
+    """
+    from PIL import Image, ImageDraw
+
+    assinatura = _assinatura_evento(evento)
+    chave = (evento.pk, DESIGN_VERSION, assinatura)
+
+    with _bases_lock:
+        base = _bases_cache.get(chave)
+        if base is not None:
+            _bases_cache.move_to_end(chave)
+            return base
+
+    caminho = _caminho_base_em_disco(evento, assinatura)
+    base = None
+    if os.path.exists(caminho):
         try:
-            # Cria marca d'água sutil com o título do evento
-            marca_dagua = Image.new("RGBA", certificado_img.size, (250, 250, 250, 0))
-            wdraw = ImageDraw.Draw(marca_dagua)
-            
-            # Usa fonte grande e transparente
-            fonte_marca = pick_font(font_paths_elegant, 100)
-            texto_marca = evento.titulo[:40]  # Limita tamanho
-            
-            wdraw.text((LARGURA * 0.5, ALTURA * 0.8), texto_marca, 
-                      font=fonte_marca, 
-                      fill=(139, 0, 0, 15),  # Vinho muito transparente
-                      anchor="mm")
-            
-            # Aplica marca d'água
-            certificado_img = Image.alpha_composite(
-                certificado_img.convert("RGBA"), 
-                marca_dagua
-            ).convert("RGB")
+            with Image.open(caminho) as img:
+                base = img.convert("RGB")
         except Exception:
-            pass  # Ignora erros na marca d'água
-
-        # =====================================================================
-        # SALVAMENTO DO CERTIFICADO PNG
-        # =====================================================================
-        
-        # Prepara buffer para PNG
-        png_buffer = io.BytesIO()
-        certificado_img.save(png_buffer, format="PNG", optimize=True, quality=95)
-        png_buffer.seek(0)
-
-        # =====================================================================
-        # GERAÇÃO DO PDF PROFISSIONAL
-        # =====================================================================
-        
-        # Prepara buffer para PDF
-        pdf_buffer = io.BytesIO()
-        c = canvas.Canvas(pdf_buffer, pagesize=A4)
-        
-        # Configurações da página A4
-        largura_a4, altura_a4 = A4
-        
-        # Converte a imagem para incluir no PDF
-        img_reader = ImageReader(png_buffer)
-        
-        # Calcula dimensões mantendo proporção
-        img_largura, img_altura = certificado_img.size
-        escala = min(largura_a4 / img_largura, altura_a4 / img_altura) * 0.95
-        nova_largura = img_largura * escala
-        nova_altura = img_altura * escala
-        
-        # Centraliza na página
-        x_pos = (largura_a4 - nova_largura) / 2
-        y_pos = (altura_a4 - nova_altura) / 2
-        
-        # Insere imagem no PDF
-        c.drawImage(img_reader, x_pos, y_pos, 
-                   width=nova_largura, height=nova_altura, 
-                   preserveAspectRatio=True, mask='auto')
-        
-        c.showPage()
-        c.save()
-        pdf_buffer.seek(0)
+            base = None
 
-        # =====================================================================
-        # SALVAMENTO NO BANCO DE DADOS
-        # =====================================================================
-        
+    if base is None:
+        fontes = fontes or _carregar_fontes()
+        # Cria imagem base com fundo creme elegante
+        base = Image.new("RGB", (LARGURA, ALTURA), CORES['creme'])
+        _desenhar_camada_estatica(ImageDraw.Draw(base), fontes)
+        base = _desenhar_camada_evento(base, evento, fontes)
         try:
-            # Configura campo de upload se necessário
-            setattr(cert, "_upload_field", "certificados")
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+            # Salva em arquivo temporário e renomeia para evitar leituras parciais
+            tmp = f"{caminho}.{os.getpid()}.tmp"
+            base.save(tmp, format="PNG")
+            os.replace(tmp, caminho)
         except Exception:
-            pass
+            pass  # O cache em disco é opcional
+
+    with _bases_lock:
+        _bases_cache[chave] = base
+        _bases_cache.move_to_end(chave)
+        while len(_bases_cache) > _MAX_BASES_EM_MEMORIA:
+            _bases_cache.popitem(last=False)
+    return base
+
+
+def limpar_cache_bases():
+    """
+    Esvazia o cache em memória das bases (os arquivos em disco são mantidos).
+    """
+    with _bases_lock:
+        _bases_cache.clear()
+
+
+# =============================================================================
+# CAMADA DO PARTICIPANTE
+# =============================================================================
+
+def _url_certificado(public_id):
+    """
+    Gera a URL pública de verificação do certificado.
+    """
+    site = getattr(settings, "SITE_URL", "").rstrip("/")
+    if site:
+        return f"{site}/usuarios/certificado/{public_id}/"
+    return f"/usuarios/certificado/{public_id}/"
+
+
+def _compor_certificado(base, nome, cert_url, fontes):
+    """
+    Compõe o certificado de um participante sobre uma cópia da base do evento.
+    Não acessa banco nem settings, podendo ser executada em processos workers.
+
+    Retorna:
+        PIL.Image.Image: certificado final em RGB.
+    """
+    from PIL import ImageDraw
+
+    certificado_img = base.copy()
+    draw = ImageDraw.Draw(certificado_img)
+
+    # 1. NOME DO PARTICIPANTE (DESTAQUE MÁXIMO)
+    # ==========================================
+
+    def desenhar_texto_com_contorno(pos, texto, fonte, cor_principal, cor_contorno, largura_contorno=3, anchor="mm"):
+        """
+        Desenha texto com contorno para destaque e legibilidade.
+        Utiliza múltiplas camadas para criar o efeito de contorno.
+        """
+        x, y = pos
+        # Desenha contorno (múltiplas posições ao redor)
+        for dx in range(-largura_contorno, largura_contorno + 1):
+            for dy in range(-largura_contorno, largura_contorno + 1):
+                if dx == 0 and dy == 0:
+                    continue
+                draw.text((x + dx, y + dy), texto, font=fonte,
+                         fill=cor_contorno, anchor=anchor)
+        # Texto principal
+        draw.text((x, y), texto, font=fonte, fill=cor_principal, anchor=anchor)
+
+    # Aplica efeito especial ao nome
+    desenhar_texto_com_contorno(
+        pos=(LARGURA/2, POS_Y_NOME),
+        texto=nome.upper(),
+        fonte=fontes['nome'],
+        cor_principal=CORES['dourado_principal'],
+        cor_contorno=CORES['vinho_escuro'],
+        largura_contorno=3
+    )
+
+    # 2. QR CODE PARA VERIFICAÇÃO
+    # ============================
+
+    qr_img = _selo_qr(cert_url)
+
+    # Adiciona QR code à imagem principal (a moldura já está na base)
+    certificado_img.paste(qr_img, (POS_X_QR, POS_Y_QR))
+
+    return certificado_img
+
+
+def _area_pdf(tamanho_img):
+    """
+    Posição e escala do certificado centralizado na página A4 do PDF.
+    Compartilhada pelos modos raster e vetorial para que o layout seja idêntico.
+
+    Retorna:
+        tuple: (x, y, escala) em pontos.
+    """
+    from reportlab.lib.pagesizes import A4
+
+    largura_a4, altura_a4 = A4
+    img_largura, img_altura = tamanho_img
+    escala = min(largura_a4 / img_largura, altura_a4 / img_altura) * 0.95
+    x_pos = (largura_a4 - img_largura * escala) / 2
+    y_pos = (altura_a4 - img_altura * escala) / 2
+    return x_pos, y_pos, escala
+
+
+def _montar_pdf(png_bytes, tamanho_img):
+    """
+    Gera o PDF A4 com a imagem do certificado centralizada (modo raster).
+
+    Retorna:
+        bytes: conteúdo do PDF.
+    """
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.utils import ImageReader
+
+    # Prepara buffer para PDF
+    pdf_buffer = io.BytesIO()
+    c = canvas.Canvas(pdf_buffer, pagesize=A4)
+
+    # Converte a imagem para incluir no PDF
+    img_reader = ImageReader(io.BytesIO(png_bytes))
+
+    # Calcula dimensões mantendo proporção e centraliza na página
+    x_pos, y_pos, escala = _area_pdf(tamanho_img)
+    nova_largura = tamanho_img[0] * escala
+    nova_altura = tamanho_img[1] * escala
+
+    # Insere imagem no PDF
+    c.drawImage(img_reader, x_pos, y_pos,
+               width=nova_largura, height=nova_altura,
+               preserveAspectRatio=True, mask='auto')
+
+    c.showPage()
+    c.save()
+    return pdf_buffer.getvalue()
+
+
+def _codificar_png(certificado_img):
+    """
+    Codifica o certificado em PNG.
+
+    Retorna:
+        bytes: conteúdo do PNG.
+    """
+    png_buffer = io.BytesIO()
+    certificado_img.save(png_buffer, format="PNG", optimize=True, quality=95)
+    return png_buffer.getvalue()
+
+
+def _codificar_certificado(certificado_img):
+    """
+    Codifica o certificado em PNG e monta o PDF raster correspondente.
+
+    Retorna:
+        tuple: (bytes do PNG, bytes do PDF).
+    """
+    png_bytes = _codificar_png(certificado_img)
+    return png_bytes, _montar_pdf(png_bytes, certificado_img.size)
+
+
+# =============================================================================
+# PDF VETORIAL
+# =============================================================================
+# Desenha o mesmo design diretamente com primitivas do ReportLab, sem imagem
+# embutida. As coordenadas seguem o sistema do PNG (LARGURA x ALTURA, origem no
+# canto superior esquerdo): o canvas é escalado para a área do certificado na
+# página e `_y()` converte o eixo vertical. As camadas estática e do evento são
+# desenhadas uma vez em um Form XObject ('base_certificado'), reutilizado por
+# todas as páginas do documento; cada página acrescenta só o nome e o QR code.
+
+# Fontes padrão do PDF usadas quando nenhuma TTF do estilo existe ou é aceita.
+# Só cobrem WinAnsi (cp1252): textos fora dele usam uma TTF registrada
+# (ver `_fonte_que_cobre`)
+_FONTES_PDF_PADRAO = {
+    'bold': 'Helvetica-Bold',
+    'regular': 'Helvetica',
+    'elegant': 'Times-Bold',
+}
+
+_fontes_pdf_registradas = {}
+
+
+def _modo_pdf():
+    """
+    Modo de saída do PDF: 'vetorial' (padrão) ou 'raster' (imagem embutida).
+    """
+    modo = str(getattr(settings, 'CERTIFICADOS_PDF_MODO', 'vetorial')).lower()
+    return 'raster' if modo == 'raster' else 'vetorial'
+
 
-        # Salva arquivos PNG e PDF
-        cert.png.save(f"{nome_base}.png", 
-                     ContentFile(png_buffer.getvalue()), 
-                     save=False)
-        cert.pdf.save(f"{nome_base}.pdf", 
-                     ContentFile(pdf_buffer.getvalue()), 
-                     save=False)
-        cert.save()
-
-        generated += 1
-
-    # =========================================================================
-    # RETORNO FINAL
-    # =========================================================================
-    
-    return generated
\ No newline at end of file
+def _y(y):
+    """
+    Converte a coordenada vertical do design (topo = 0) para o PDF (base = 0).
+    """
+    return ALTURA - y
+
+
+def _cor(rgb):
+    return tuple(v / 255 for v in rgb)
+
+
+def _registrar_fonte_pdf(estilo, candidates):
+    """
+    Registra no ReportLab a TTF resolvida para o estilo (uma vez por processo).
+    A fonte é embutida no PDF (subconjunto dos glifos usados), seja do projeto
+    (static/fonts) ou do sistema: os nomes dos participantes podem ter
+    caracteres fora do WinAnsi, que as fontes padrão do PDF não desenham.
+
+    Retorna:
+        str: nome da fonte para o canvas (TTF registrada ou fonte padrão do PDF).
+    """
+    chave = tuple(candidates)
+    if chave in _fontes_pdf_registradas:
+        return _fontes_pdf_registradas[chave]
+
+    nome = _FONTES_PDF_PADRAO[estilo]
+    path = _resolver_estilo(candidates)
+    if path:
+        try:
+            from reportlab.pdfbase import pdfmetrics
+            from reportlab.pdfbase.ttfonts import TTFont
+
+            nome_ttf = f"Cert-{os.path.splitext(os.path.basename(path))[0]}"
+            if nome_ttf not in pdfmetrics.getRegisteredFontNames():
+                # Nomes sem caminho (fontes do sistema) são procurados em rl_config.TTFSearchPath
+                pdfmetrics.registerFont(TTFont(nome_ttf, path))
+            nome = nome_ttf
+        except Exception:
+            pass  # Fonte não encontrada ou não suportada pelo ReportLab: usa a padrão
+    with _recursos_lock:
+        _fontes_pdf_registradas[chave] = nome
+    return nome
+
+
+def _fonte_que_cobre(nome, texto):
+    """
+    Fonte para desenhar `texto`: as fontes padrão do PDF só têm os caracteres
+    do WinAnsi (cp1252); fora dele, usa a primeira TTF registrada.
+    """
+    if nome not in _FONTES_PDF_PADRAO.values():
+        return nome
+    try:
+        texto.encode('cp1252')
+        return nome
+    except UnicodeEncodeError:
+        pass
+    for registrada in list(_fontes_pdf_registradas.values()):
+        if registrada not in _FONTES_PDF_PADRAO.values():
+            return registrada
+    return nome
+
+
+def _fontes_pdf(caminhos=None):
+    """
+    Fontes do PDF vetorial por papel no design, com os mesmos tamanhos do PNG.
+
+    Retorna:
+        dict: papel -> (nome da fonte, tamanho).
+    """
+    caminhos = caminhos or _caminhos_fontes()
+    elegant = _registrar_fonte_pdf('elegant', caminhos['elegant'])
+    bold = _registrar_fonte_pdf('bold', caminhos['bold'])
+    regular = _registrar_fonte_pdf('regular', caminhos['regular'])
+    return {
+        'titulo_principal': (elegant, 72),
+        'nome': (elegant, 58),
+        'titulo_evento': (bold, 36),
+        'corpo': (regular, 28),
+        'pequeno': (regular, 20),
+        'rodape': (regular, 16),
+        'marca': (elegant, 100),
+    }
+
+
+def _texto_centralizado_pdf(c, x, y, texto, fonte, cor, modo=0):
+    """
+    Equivalente ao `draw.text(..., anchor="mm")`: centraliza o texto em (x, y).
+    """
+    from reportlab.pdfbase import pdfmetrics
+
+    nome, tamanho = fonte
+    nome = _fonte_que_cobre(nome, texto)
+    ascent, descent = pdfmetrics.getAscentDescent(nome, tamanho)
+    largura = pdfmetrics.stringWidth(texto, nome, tamanho)
+    t = c.beginText()
+    t.setTextOrigin(x - largura / 2, _y(y) - (ascent + descent) / 2)
+    t.setFont(nome, tamanho)
+    t.setTextRenderMode(modo)
+    t.textOut(texto)
+    if modo:
+        c.setStrokeColorRGB(*_cor(cor))
+    else:
+        c.setFillColorRGB(*_cor(cor))
+    c.drawText(t)
+
+
+def _retangulo_pdf(c, x0, y0, x1, y1, contorno=None, largura=1, preenchimento=None):
+    """
+    Equivalente ao `draw.rectangle`: o contorno é desenhado para dentro da caixa.
+    """
+    if preenchimento is not None:
+        c.setFillColorRGB(*_cor(preenchimento))
+        c.rect(x0, _y(y1), x1 - x0, y1 - y0, stroke=0, fill=1)
+    if contorno is not None:
+        meio = largura / 2
+        c.setStrokeColorRGB(*_cor(contorno))
+        c.setLineWidth(largura)
+        c.rect(x0 + meio, _y(y1) + meio, x1 - x0 - largura, y1 - y0 - largura, stroke=1, fill=0)
+
+
+def _linha_pdf(c, x0, y0, x1, y1, cor, largura):
+    c.setStrokeColorRGB(*_cor(cor))
+    c.setLineWidth(largura)
+    c.line(x0, _y(y0), x1, _y(y1))
+
+
+def _poligono_pdf(c, pontos, preenchimento, contorno=None, largura=1):
+    p = c.beginPath()
+    p.moveTo(pontos[0][0], _y(pontos[0][1]))
+    for x, y in pontos[1:]:
+        p.lineTo(x, _y(y))
+    p.close()
+    c.setFillColorRGB(*_cor(preenchimento))
+    if contorno is not None:
+        c.setStrokeColorRGB(*_cor(contorno))
+        c.setLineWidth(largura)
+    c.drawPath(p, stroke=1 if contorno is not None else 0, fill=1)
+
+
+def _desenhar_pdf_estatico(c, fontes):
+    """
+    Versão vetorial de `_desenhar_camada_estatica`.
+    """
+    import math
+
+    # 1. Fundo creme e bordas ornamentadas
+    _retangulo_pdf(c, 0, 0, LARGURA, ALTURA, preenchimento=CORES['creme'])
+    _retangulo_pdf(c, 0, 0, LARGURA, ALTURA, contorno=CORES['dourado_principal'], largura=20)
+    _retangulo_pdf(c, 30, 30, LARGURA - 30, ALTURA - 30, contorno=CORES['vinho_escuro'], largura=4)
+    _retangulo_pdf(c, 50, 50, LARGURA - 50, ALTURA - 50, contorno=CORES['dourado_principal'], largura=2)
+
+    # 2. Cabeçalho
+    _retangulo_pdf(c, 0, 0, LARGURA, ALTURA_CABECALHO, preenchimento=CORES['vinho_escuro'])
+    _linha_pdf(c, 0, ALTURA_CABECALHO, LARGURA, ALTURA_CABECALHO, CORES['dourado_principal'], 6)
+
+    # 3. Ornamentos nos cantos
+    def ornamento(x, y, tamanho=60):
+        _poligono_pdf(c, [
+            (x, y), (x + tamanho//3, y), (x + tamanho//2, y + tamanho//4),
+            (x + tamanho*2//3, y), (x + tamanho, y), (x + tamanho, y + tamanho//3),
+            (x + tamanho*3//4, y + tamanho//2), (x + tamanho, y + tamanho*2//3),
+            (x + tamanho, y + tamanho), (x + tamanho*2//3, y + tamanho),
+            (x + tamanho//2, y + tamanho*3//4), (x + tamanho//3, y + tamanho),
+            (x, y + tamanho), (x, y + tamanho*2//3), (x + tamanho//4, y + tamanho//2),
+            (x, y + tamanho//3)
+        ], CORES['dourado_principal'])
+
+    tamanho_ornamento = 60
+    margem_ornamento = 40
+    ornamento(margem_ornamento, margem_ornamento, tamanho_ornamento)
+    ornamento(LARGURA - margem_ornamento - tamanho_ornamento, margem_ornamento, tamanho_ornamento)
+    ornamento(margem_ornamento, ALTURA - margem_ornamento - tamanho_ornamento, tamanho_ornamento)
+    ornamento(LARGURA - margem_ornamento - tamanho_ornamento, ALTURA - margem_ornamento - tamanho_ornamento, tamanho_ornamento)
+
+    # 4. Selo dourado central
+    raio_selo = 50
+    centro_x = LARGURA // 2
+    centro_y = ALTURA_CABECALHO + 80
+    c.setFillColorRGB(*_cor(CORES['dourado_principal']))
+    c.circle(centro_x, _y(centro_y), raio_selo, stroke=0, fill=1)
+    c.setStrokeColorRGB(*_cor(CORES['dourado_escuro']))
+    c.setLineWidth(4)
+    c.circle(centro_x, _y(centro_y), raio_selo - 2, stroke=1, fill=0)
+    c.setLineWidth(2)
+    c.circle(centro_x, _y(centro_y), raio_selo - 12 - 1, stroke=1, fill=0)
+    estrela = [
+        (centro_x + 20 * math.cos(math.radians(22.5 + 45 * i)),
+         centro_y + 20 * math.sin(math.radians(22.5 + 45 * i)))
+        for i in range(8)
+    ]
+    _poligono_pdf(c, estrela, CORES['vinho_escuro'], contorno=CORES['dourado_escuro'], largura=1)
+
+    # 5. Título "CERTIFICADO" com sombra
+    pos_y_titulo = ALTURA_CABECALHO + 160
+    _texto_centralizado_pdf(c, LARGURA/2 + 3, pos_y_titulo + 3, "CERTIFICADO", fontes['titulo_principal'], CORES['vinho_medio'])
+    _texto_centralizado_pdf(c, LARGURA/2, pos_y_titulo, "CERTIFICADO", fontes['titulo_principal'], CORES['vinho_escuro'])
+
+    # 6. Texto de outorga
+    _texto_centralizado_pdf(c, LARGURA/2, POS_Y_NOME + 80,
+                            "é outorgado o presente certificado por ter participado do",
+                            fontes['corpo'], CORES['cinza_escuro'])
+
+    # 7. Moldura e legenda do QR code
+    _retangulo_pdf(c, POS_X_QR - 8, POS_Y_QR - 8, POS_X_QR + TAMANHO_QR + 8, POS_Y_QR + TAMANHO_QR + 8,
+                   contorno=CORES['dourado_principal'], largura=3)
+    _texto_centralizado_pdf(c, POS_X_QR + TAMANHO_QR/2, POS_Y_QR + TAMANHO_QR + 25,
+                            "VERIFIQUE A AUTENTICIDADE", fontes['rodape'], CORES['vinho_escuro'])
+
+    # 8. Linha de rodapé
+    _linha_pdf(c, 80, ALTURA - 60, LARGURA - 80, ALTURA - 60, CORES['dourado_principal'], 2)
+
+
+def _desenhar_pdf_evento(c, textos, fontes):
+    """
+    Versão vetorial de `_desenhar_camada_evento`.
+    """
+    # Marca d'água: cor já misturada ao fundo creme (opacidade 15/255), sem
+    # transparência; desenhada antes dos textos porque só se sobrepõe ao fundo
+    alfa = 15 / 255
+    cor_marca = tuple(round(f * (1 - alfa) + v * alfa) for f, v in zip(CORES['creme'], CORES['vinho_escuro']))
+    _texto_centralizado_pdf(c, LARGURA * 0.5, ALTURA * 0.8, textos['marca'], fontes['marca'], cor_marca)
+
+    pos_y_evento = POS_Y_NOME + 80 + 60
+    titulo_linhas = wrap(textos['titulo'], width=50)
+    for i, linha in enumerate(titulo_linhas):
+        _texto_centralizado_pdf(c, LARGURA/2, pos_y_evento + i * 40, linha, fontes['titulo_evento'], CORES['vinho_escuro'])
+
+    pos_y_info = pos_y_evento + len(titulo_linhas) * 45 + 40
+    _texto_centralizado_pdf(c, LARGURA/2, pos_y_info, textos['data_horas'], fontes['pequeno'], CORES['cinza_medio'])
+    _texto_centralizado_pdf(c, LARGURA/2, pos_y_info + 40, textos['organizacao'], fontes['pequeno'], CORES['cinza_medio'])
+    _texto_centralizado_pdf(c, LARGURA/2, ALTURA - 80, textos['rodape'], fontes['rodape'], CORES['cinza_medio'])
+
+
+def _desenhar_pdf_participante(c, nome, cert_url, fontes):
+    """
+    Nome com contorno e QR code nativo do participante.
+    """
+    # Nome: contorno (traço de 3px para cada lado) e preenchimento por cima
+    texto = nome.upper()
+    c.saveState()
+    c.setLineWidth(6)
+    c.setLineJoin(1)
+    _texto_centralizado_pdf(c, LARGURA/2, POS_Y_NOME, texto, fontes['nome'], CORES['vinho_escuro'], modo=1)
+    c.restoreState()
+    _texto_centralizado_pdf(c, LARGURA/2, POS_Y_NOME, texto, fontes['nome'], CORES['dourado_principal'])
+
+    # QR code vetorial sobre fundo branco (a moldura está na base): a mesma
+    # matriz do PNG, desenhada como um único path com um retângulo por trecho
+    # contínuo de módulos escuros em cada linha
+    _retangulo_pdf(c, POS_X_QR, POS_Y_QR, POS_X_QR + TAMANHO_QR, POS_Y_QR + TAMANHO_QR, preenchimento=CORES['branco'])
+    matriz = _matriz_qr(cert_url)['matriz']
+    escala, _lado, margem = _geometria_qr(len(matriz))
+    p = c.beginPath()
+    for i, linha in enumerate(matriz):
+        y = POS_Y_QR + margem + (i + 1) * escala
+        j = 0
+        while j < len(linha):
+            if not linha[j]:
+                j += 1
+                continue
+            inicio = j
+            while j < len(linha) and linha[j]:
+                j += 1
+            p.rect(POS_X_QR + margem + inicio * escala, _y(y), (j - inicio) * escala, escala)
+    c.setFillColorRGB(0, 0, 0)
+    c.drawPath(p, stroke=0, fill=1)
+
+
+# Serializa a troca temporária de rl_config.useA85 (ver `_montar_pdf_vetorial`)
+_rl_config_lock = threading.Lock()
+
+
+def _montar_pdf_vetorial(textos, participantes, caminhos=None):
+    """
+    Gera o PDF A4 vetorial (uma página por participante).
+
+    Parâmetros:
+        textos (dict): textos do evento (ver `_textos_evento`).
+        participantes (list): tuplas (nome, cert_url).
+        caminhos (dict): listas de fontes por estilo (padrão: `_caminhos_fontes()`).
+
+    Retorna:
+        bytes: conteúdo do PDF.
+    """
+    from reportlab import rl_config
+
+    # Streams apenas com Flate, sem a camada ASCII85 (que aumenta 25% o arquivo).
+    # O ReportLab só lê essa opção do rl_config global: ela é desligada durante
+    # a montagem deste PDF e restaurada em seguida.
+    with _rl_config_lock:
+        use_a85 = rl_config.useA85
+        rl_config.useA85 = 0
+        try:
+            return _desenhar_pdf_vetorial(textos, participantes, caminhos)
+        finally:
+            rl_config.useA85 = use_a85
+
+
+def _desenhar_pdf_vetorial(textos, participantes, caminhos=None):
+    """
+    Desenha as páginas do PDF vetorial (ver `_montar_pdf_vetorial`).
+    """
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import A4
+
+    fontes = _fontes_pdf(caminhos)
+    pdf_buffer = io.BytesIO()
+    c = canvas.Canvas(pdf_buffer, pagesize=A4, pageCompression=1)
+    x_pos, y_pos, escala = _area_pdf((LARGURA, ALTURA))
+
+    # Base (camadas estática e do evento) desenhada uma única vez
+    c.beginForm('base_certificado', 0, 0, LARGURA, ALTURA)
+    _desenhar_pdf_estatico(c, fontes)
+    _desenhar_pdf_evento(c, textos, fontes)
+    c.endForm()
+
+    for nome, cert_url in participantes:
+        c.saveState()
+        c.translate(x_pos, y_pos)
+        c.scale(escala, escala)
+        c.doForm('base_certificado')
+        _desenhar_pdf_participante(c, nome, cert_url, fontes)
+        c.restoreState()
+        c.showPage()
+    c.save()
+    return pdf_buffer.getvalue()
+
+
+# =============================================================================
+# WORKERS DO POOL DE PROCESSOS
+# =============================================================================
+
+# Estado por processo worker: fontes carregadas e bases decodificadas
+_fontes_worker = None
+_caminhos_worker = None
+_bases_worker = {}
+
+
+def _inicializar_worker(caminhos_fontes):
+    """
+    Inicializador dos processos do pool: carrega as fontes uma única vez por processo.
+    """
+    global _fontes_worker, _caminhos_worker
+    _fontes_worker = _carregar_fontes(caminhos_fontes)
+    _caminhos_worker = caminhos_fontes
+    _bases_worker.clear()
+
+
+def _gerar_arquivos(base, textos, nome, cert_url, fontes, modo_pdf, caminhos=None):
+    """
+    Unidade de geração: compõe um certificado sobre a base e o codifica.
+    Usada tanto pela geração individual quanto pelos lotes.
+
+    No modo 'vetorial' só o PDF é gerado, desenhado com primitivas do ReportLab
+    a partir dos textos do evento (a base raster não é usada e o PNG fica para
+    `obter_png_certificado`, sob demanda). No modo 'raster' o PDF embute o PNG,
+    que então também é devolvido.
+
+    Retorna:
+        tuple: (png_bytes ou None, pdf_bytes).
+    """
+    if modo_pdf == 'raster':
+        return _codificar_certificado(_compor_certificado(base, nome, cert_url, fontes))
+    return None, _montar_pdf_vetorial(textos, [(nome, cert_url)], caminhos)
+
+
+def _renderizar_lote(indice, assinatura, base_png, textos, modo_pdf, itens):
+    """
+    Renderiza um lote de certificados (executado dentro de um worker).
+
+    Parâmetros:
+        indice (int): posição do lote, usada no relatório de tempos.
+        assinatura (str): identifica a base, para decodificá-la uma vez por processo.
+        base_png (bytes): base do evento codificada em PNG (None no modo vetorial).
+        textos (dict): textos do evento, usados pelo PDF vetorial.
+        modo_pdf (str): 'vetorial' ou 'raster'.
+        itens (list): tuplas (inscricao_id, nome, cert_url).
+
+    Retorna:
+        dict: index, size, pid, render_seconds, cache (contadores do worker)
+        e items [(inscricao_id, png ou None, pdf)].
+    """
+    from PIL import Image
+
+    inicio = time.perf_counter()
+    base = _bases_worker.get(assinatura)
+    if base is None and base_png is not None:
+        with Image.open(io.BytesIO(base_png)) as img:
+            base = img.convert("RGB")
+        _bases_worker.clear()
+        _bases_worker[assinatura] = base
+
+    resultados = []
+    for inscricao_id, nome, cert_url in itens:
+        png_bytes, pdf_bytes = _gerar_arquivos(base, textos, nome, cert_url, _fontes_worker, modo_pdf, _caminhos_worker)
+        resultados.append((inscricao_id, png_bytes, pdf_bytes))
+
+    return {
+        'index': indice,
+        'size': len(itens),
+        'pid': os.getpid(),
+        'render_seconds': round(time.perf_counter() - inicio, 4),
+        'cache': cache_stats(),
+        'items': resultados,
+    }
+
+
+# =============================================================================
+# PNG SOB DEMANDA
+# =============================================================================
+# O PNG só é usado na pré-visualização pública do certificado. No modo vetorial
+# ele não é gerado em lote: é renderizado no primeiro acesso, a partir da base
+# em cache do evento, e gravado em disco ao lado do PDF. Miniaturas são
+# derivadas do PNG completo e também ficam em disco (<nome>_w<largura>.png).
+
+def _larguras_miniatura():
+    """
+    Larguras de miniatura aceitas (`settings.CERTIFICADOS_PNG_LARGURAS`).
+    """
+    larguras = getattr(settings, 'CERTIFICADOS_PNG_LARGURAS', (320, 640))
+    return sorted(int(l) for l in larguras if 0 < int(l) < LARGURA)
+
+
+def _largura_miniatura(largura):
+    """
+    Ajusta a largura pedida para a menor largura aceita que a comporte,
+    limitando a quantidade de arquivos em cache por certificado.
+
+    Retorna:
+        int | None: largura da miniatura, ou None para o PNG completo.
+    """
+    try:
+        largura = int(largura)
+    except (TypeError, ValueError):
+        return None
+    for aceita in _larguras_miniatura():
+        if largura <= aceita:
+            return aceita
+    return None
+
+
+def _nome_png(cert, largura=None):
+    """
+    Nome (relativo ao storage) do PNG completo ou da miniatura do certificado.
+    """
+    from usuarios.models import user_directory_path
+
+    if cert.pdf:
+        raiz = os.path.splitext(cert.pdf.name)[0]
+    else:
+        raiz = os.path.splitext(user_directory_path(cert, f"{_nome_base_arquivo(cert.evento)}.png"))[0]
+    return f"{raiz}_w{largura}.png" if largura else f"{raiz}.png"
+
+
+def _gravar_png(img, caminho):
+    """
+    Grava o PNG em arquivo temporário e renomeia, evitando leituras parciais
+    quando duas requisições geram o mesmo arquivo ao mesmo tempo.
+    """
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    tmp = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    img.save(tmp, format="PNG")
+    os.replace(tmp, caminho)
+
+
+def _remover_pngs(cert):
+    """
+    Remove o PNG completo e as miniaturas de um certificado que será regerado.
+    """
+    if not cert.pk:
+        return
+    nomes = [cert.png.name] if cert.png else []
+    if cert.pdf:
+        nomes += [_nome_png(cert)] + [_nome_png(cert, l) for l in _larguras_miniatura()]
+    for nome in set(nomes):
+        try:
+            caminho = cert.png.storage.path(nome)
+            if os.path.exists(caminho):
+                os.remove(caminho)
+        except Exception:
+            pass
+    cert.png = None
+
+
+def obter_png_certificado(cert, largura=None):
+    """
+    Retorna o caminho do PNG do certificado, renderizando-o no primeiro acesso.
+
+    Parâmetros:
+        cert (Certificado): certificado com evento e usuário.
+        largura (int): largura desejada para miniatura (opcional). É ajustada para
+            uma das larguras de `settings.CERTIFICADOS_PNG_LARGURAS`; acima da
+            maior delas, o PNG completo é usado.
+
+    Retorna:
+        str | None: caminho absoluto do PNG, ou None se o certificado não tem evento.
+    """
+    from PIL import Image
+    from usuarios.models import Certificado
+
+    if cert.evento is None:
+        return None
+    storage = cert.png.storage
+
+    # 1. PNG completo (já gravado ou renderizado agora)
+    caminho = cert.png.path if cert.png else None
+    if not caminho or not os.path.exists(caminho):
+        nome = _nome_png(cert)
+        caminho = storage.path(nome)
+        if not os.path.exists(caminho):
+            fontes = _carregar_fontes()
+            base = obter_base_certificado(cert.evento, fontes)
+            _gravar_png(_compor_certificado(base, cert.usuario.nome, _url_certificado(cert.public_id), fontes), caminho)
+        if cert.png.name != nome:
+            cert.png.name = nome
+            Certificado.objects.filter(pk=cert.pk).update(png=nome)
+
+    # 2. Miniatura derivada do PNG completo
+    largura = _largura_miniatura(largura) if largura else None
+    if not largura:
+        return caminho
+    caminho_mini = storage.path(_nome_png(cert, largura))
+    if not os.path.exists(caminho_mini):
+        with Image.open(caminho) as img:
+            altura = round(img.height * largura / img.width)
+            _gravar_png(img.convert("RGB").resize((largura, altura), Image.LANCZOS), caminho_mini)
+    return caminho_mini
+
+
+# =============================================================================
+# GERAÇÃO EM LOTE
+# =============================================================================
+
+def _nome_base_arquivo(evento):
+    """
+    Nome base dos arquivos de certificado de um evento (igual para todos os participantes).
+    """
+    return f"{slugify(evento.titulo)}_{evento.data_fim.strftime('%Y_%m_%d') if evento.data_fim else 'sem_data'}"
+
+
+def _nome_certificado(evento):
+    """
+    Nome de exibição gravado em `Certificado.nome`.
+    """
+    return f"{evento.titulo} - {evento.data_fim.strftime('%Y-%m-%d') if evento.data_fim else ''}"
+
+
+def _fingerprint(textos, nome, public_id, modo_pdf):
+    """
+    Impressão digital das entradas de um certificado: versão do design, modo do
+    PDF, textos do evento, nome do participante, public_id e URL do QR code.
+    Só muda quando o arquivo renderizado mudaria.
+
+    Retorna:
+        str: hash sha256 em hexadecimal.
+    """
+    partes = [
+        f"design={DESIGN_VERSION}",
+        f"modo={modo_pdf}",
+        f"nome={nome}",
+        f"public_id={public_id}",
+        f"url={_url_certificado(public_id)}",
+    ] + [f"{k}={textos[k]}" for k in sorted(textos)]
+    return hashlib.sha256("\n".join(partes).encode('utf-8')).hexdigest()
+
+
+def _pendente(inscr, cert, textos, modo_pdf, verificar_arquivo=False):
+    """
+    Monta o item pendente de uma inscrição, ou None se o certificado gravado
+    corresponde às entradas atuais (mesma impressão digital).
+
+    Parâmetros:
+        verificar_arquivo (bool): também considera pendente se o PDF não está em disco.
+
+    Retorna:
+        tuple | None: (inscricao, certificado ou None, public_id, fingerprint).
+    """
+    # Garante ID público único
+    public_id = cert.public_id if cert and cert.public_id else str(uuid.uuid4())
+    fingerprint = _fingerprint(textos, inscr.inscrito.nome, public_id, modo_pdf)
+    if cert and cert.pdf and cert.fingerprint == fingerprint:
+        if not verificar_arquivo or os.path.exists(cert.pdf.path):
+            return None
+    return inscr, cert, public_id, fingerprint
+
+
+def _preparar_pendentes(evento, inscricao_ids=None):
+    """
+    Lista as inscrições validadas cujo certificado precisa ser (re)gerado.
+
+    Carrega os certificados existentes do evento em uma única consulta e
+    compara a impressão digital gravada com a das entradas atuais: só são
+    regerados os certificados cujas entradas mudaram (ou que não existem).
+
+    Parâmetros:
+        inscricao_ids (list): restringe a busca a estas inscrições (opcional).
+
+    Retorna:
+        tuple: (lista de (inscricao, certificado ou None, public_id, fingerprint), quantidade pulada).
+    """
+    from usuarios.models import Certificado
+
+    inscricoes = evento.inscricaoevento_set.filter(is_validated=True).select_related('inscrito').order_by('id')
+    certificados = Certificado.objects.filter(evento=evento)
+    if inscricao_ids is not None:
+        inscricoes = inscricoes.filter(id__in=list(inscricao_ids))
+        certificados = certificados.filter(usuario__inscricaoevento__id__in=list(inscricao_ids))
+    existentes = {c.usuario_id: c for c in certificados}
+    textos = _textos_evento(evento)
+    modo_pdf = _modo_pdf()
+
+    pendentes = []
+    pulados = 0
+    for inscr in inscricoes:
+        pendente = _pendente(inscr, existentes.get(inscr.inscrito_id), textos, modo_pdf)
+        if pendente is None:
+            pulados += 1
+            continue  # Pula se não mudou
+        pendentes.append(pendente)
+    return pendentes, pulados
+
+
+def _gravar_arquivo(campo, nome, conteudo):
+    """
+    Grava o arquivo no caminho endereçado pelo conteúdo, se ainda não existir.
+    O nome é determinístico: regravar as mesmas entradas não cria cópias.
+    """
+    caminho = campo.storage.path(nome)
+    if not os.path.exists(caminho):
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        # Arquivo temporário + rename evita leituras parciais
+        tmp = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(conteudo)
+        os.replace(tmp, caminho)
+    campo.name = nome
+
+
+def _persistir_certificados(evento, renderizados):
+    """
+    Grava os arquivos PNG/PDF e salva os `Certificado` em massa.
+
+    Os arquivos são nomeados pela impressão digital das entradas
+    (`<nome_base>_<fingerprint[:16]>.pdf`). Os arquivos antigos de certificados
+    regerados são removidos depois que o banco é atualizado.
+
+    Parâmetros:
+        renderizados (list): tuplas ((inscricao, certificado ou None, public_id, fingerprint), png ou None, pdf).
+            Sem PNG, o PNG anterior (e suas miniaturas) é descartado e volta a
+            ser gerado sob demanda.
+
+    Retorna:
+        list: certificados gravados, na ordem de `renderizados`.
+    """
+    from django.db import transaction
+    from usuarios.models import Certificado, user_directory_path
+
+    nome_base = _nome_base_arquivo(evento)
+    nome_cert = _nome_certificado(evento)
+    novos, alterados, gravados, obsoletos = [], [], [], []
+
+    for (inscr, cert, public_id, fingerprint), png_bytes, pdf_bytes in renderizados:
+        if cert is None:
+            cert = Certificado(usuario=inscr.inscrito, evento=evento, public_id=public_id)
+            novos.append(cert)
+        else:
+            if not cert.public_id:
+                cert.public_id = public_id
+            alterados.append(cert)
+            if cert.pdf:
+                obsoletos.append((cert.pdf.storage, cert.pdf.name))
+        cert.nome = nome_cert
+        cert.fingerprint = fingerprint
+        nome_arquivo = f"{nome_base}_{fingerprint[:16]}"
+        # Salva arquivos PNG e PDF (os diretórios do usuário são criados se preciso)
+        _remover_pngs(cert)
+        if png_bytes is not None:
+            _gravar_arquivo(cert.png, user_directory_path(cert, f"{nome_arquivo}.png"), png_bytes)
+        _gravar_arquivo(cert.pdf, user_directory_path(cert, f"{nome_arquivo}.pdf"), pdf_bytes)
+        gravados.append(cert)
+
+    with transaction.atomic():
+        if novos:
+            Certificado.objects.bulk_create(novos)
+        if alterados:
+            Certificado.objects.bulk_update(alterados, ['public_id', 'nome', 'fingerprint', 'png', 'pdf'])
+
+    # Remove os PDFs substituídos (entradas antigas)
+    atuais = {cert.pdf.name for cert in gravados}
+    for storage, nome in obsoletos:
+        if nome not in atuais:
+            try:
+                storage.delete(nome)
+            except Exception:
+                pass
+    return gravados
+
+
+def generate_certificate_for_inscription(inscricao, fontes=None):
+    """
+    Gera o certificado de uma única inscrição validada.
+
+    Consulta apenas o certificado do próprio participante e reaproveita a base do
+    evento (memória ou disco), de modo que o custo não cresce com o tamanho do
+    evento. É a unidade sobre a qual a geração em lote é construída.
+    O certificado só é regerado se as entradas mudaram (impressão digital
+    diferente) ou se o PDF não está mais em disco.
+
+    Parâmetros:
+        inscricao (InscricaoEvento): inscrição do participante.
+        fontes (dict): fontes já carregadas (opcional).
+
+    Retorna:
+        Certificado | None: o certificado (existente ou recém-gerado), ou None se
+        a inscrição não foi validada.
+    """
+    from usuarios.models import Certificado
+
+    if not inscricao.is_validated:
+        return None
+
+    evento = inscricao.evento
+    textos = _textos_evento(evento)
+    modo_pdf = _modo_pdf()
+    cert = Certificado.objects.filter(usuario_id=inscricao.inscrito_id, evento_id=inscricao.evento_id).first()
+    pendente = _pendente(inscricao, cert, textos, modo_pdf, verificar_arquivo=True)
+    if pendente is None:
+        return cert
+
+    fontes = fontes or _carregar_fontes()
+    base = obter_base_certificado(evento, fontes) if modo_pdf == 'raster' else None
+    png_bytes, pdf_bytes = _gerar_arquivos(
+        base, textos, inscricao.inscrito.nome, _url_certificado(pendente[2]), fontes, modo_pdf,
+    )
+    return _persistir_certificados(evento, [(pendente, png_bytes, pdf_bytes)])[0]
+
+
+def _numero_workers(workers=None):
+    """
+    Resolve a quantidade de processos do pool (0 ou None = número de CPUs).
+    """
+    if workers is None:
+        workers = getattr(settings, 'CERTIFICADOS_WORKERS', 0)
+    try:
+        workers = int(workers)
+    except (TypeError, ValueError):
+        workers = 0
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def criar_pool_certificados(workers=None):
+    """
+    Cria o pool de processos usado na geração em lote.
+
+    Os processos só são iniciados na primeira tarefa submetida, então um pool que
+    não chega a ser usado não custa nada. Quem cria o pool é responsável por
+    chamar `shutdown()`.
+
+    Parâmetros:
+        workers (int): processos do pool (padrão: `settings.CERTIFICADOS_WORKERS`).
+
+    Retorna:
+        ProcessPoolExecutor | None: o pool, ou None se há um único worker.
+    """
+    workers = _numero_workers(workers)
+    if workers == 1:
+        return None
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # 'spawn' evita herdar threads e conexões de banco do processo web
+    contexto = multiprocessing.get_context('spawn')
+    return ProcessPoolExecutor(max_workers=workers, mp_context=contexto,
+                               initializer=_inicializar_worker, initargs=(_caminhos_fontes(),))
+
+
+def generate_certificates_parallel(evento_id, workers=None, chunk_size=None, inscricao_ids=None, pool=None):
+    """
+    Gera os certificados de um evento dividindo as inscrições em lotes processados
+    por um pool de processos.
+
+    Cada item passa pela mesma unidade de `generate_certificate_for_inscription`
+    (`_pendente` + `_gerar_arquivos` + `_persistir_certificados`), apenas agrupada
+    em lotes. Quando há um único lote (ou um único worker) a renderização acontece
+    no próprio processo, evitando o custo de iniciar o pool em eventos pequenos.
+
+    Parâmetros:
+        evento_id (int): ID do evento.
+        workers (int): processos do pool (padrão: `settings.CERTIFICADOS_WORKERS`).
+        chunk_size (int): inscrições por lote (padrão: `settings.CERTIFICADOS_CHUNK_SIZE`).
+        inscricao_ids (list): processa apenas estas inscrições (usado pelos jobs em lote).
+        pool (ProcessPoolExecutor): pool já criado por `criar_pool_certificados`,
+            reaproveitado entre chamadas (os jobs em lote usam um pool por job).
+            Sem ele, um pool é criado e encerrado dentro desta chamada.
+
+    Retorna:
+        dict: generated, skipped, workers, seconds, chunks (tempos por lote) e
+        cache (contadores de `cache_stats()` do processo principal).
+    """
+    # Importações locais para evitar problemas de importação circular
+    from eventos.models import Evento
+    # Garante que as bibliotecas de imagem/PDF estejam disponíveis antes de iniciar
+    import PIL  # noqa: F401
+    import qrcode  # noqa: F401
+    import reportlab  # noqa: F401
+
+    inicio = time.perf_counter()
+    evento = Evento.objects.select_related('criador').get(pk=evento_id)
+    pendentes, pulados = _preparar_pendentes(evento, inscricao_ids)
+
+    chunk_size = max(1, int(chunk_size or getattr(settings, 'CERTIFICADOS_CHUNK_SIZE', 50)))
+    lotes = [pendentes[i:i + chunk_size] for i in range(0, len(pendentes), chunk_size)]
+    workers = min(_numero_workers(workers), len(lotes)) or 1
+
+    resultado = {'generated': 0, 'skipped': pulados, 'workers': workers, 'seconds': 0.0, 'chunks': []}
+    if not lotes:
+        return resultado
+
+    caminhos_fontes = _caminhos_fontes()
+    textos = _textos_evento(evento)
+    modo_pdf = _modo_pdf()
+    assinatura, base_png = _assinatura_evento(evento), None
+    if modo_pdf == 'raster':
+        # A base é desenhada uma vez no processo principal e enviada aos workers
+        base = obter_base_certificado(evento, _carregar_fontes(caminhos_fontes))
+        base_buffer = io.BytesIO()
+        base.save(base_buffer, format="PNG", compress_level=1)
+        base_png = base_buffer.getvalue()
+
+    por_inscricao = {item[0].id: item for item in pendentes}
+    tarefas = [
+        (i, assinatura, base_png, textos, modo_pdf, [(inscr.id, inscr.inscrito.nome, _url_certificado(public_id)) for inscr, _cert, public_id, _fp in lote])
+        for i, lote in enumerate(lotes)
+    ]
+
+    def gravar(lote_resultado):
+        inicio_escrita = time.perf_counter()
+        renderizados = [(por_inscricao[inscricao_id], png, pdf) for inscricao_id, png, pdf in lote_resultado.pop('items')]
+        resultado['generated'] += len(_persistir_certificados(evento, renderizados))
+        lote_resultado['write_seconds'] = round(time.perf_counter() - inicio_escrita, 4)
+        resultado['chunks'].append(lote_resultado)
+
+    if workers == 1:
+        _inicializar_worker(caminhos_fontes)
+        for tarefa in tarefas:
+            gravar(_renderizar_lote(*tarefa))
+    else:
+        from concurrent.futures import as_completed
+
+        proprio = pool is None
+        if proprio:
+            pool = criar_pool_certificados(workers)
+        try:
+            futuros = [pool.submit(_renderizar_lote, *tarefa) for tarefa in tarefas]
+            # Grava cada lote assim que fica pronto, mantendo a memória limitada
+            for futuro in as_completed(futuros):
+                gravar(futuro.result())
+        finally:
+            if proprio:
+                pool.shutdown()
+
+    resultado['chunks'].sort(key=lambda c: c['index'])
+    resultado['cache'] = cache_stats()
+    resultado['seconds'] = round(time.perf_counter() - inicio, 4)
+    return resultado
+
+
+def generate_certificates_for_event(evento_id):
+    """
+    Gera certificados em PNG e PDF para todos os inscritos validados de um evento.
+    O design utiliza tema vermelho vinho e dourado, com elementos decorativos, QR code e marca d'água.
+    A base do certificado é desenhada uma única vez por evento (ver `obter_base_certificado`)
+    e eventos grandes são renderizados em paralelo (ver `generate_certificates_parallel`).
+
+    Parâmetros:
+        evento_id (int): ID do evento para o qual gerar os certificados.
+
+    Retorna:
+        int: Número de certificados gerados.
+    """
+    return generate_certificates_parallel(evento_id)['generated']
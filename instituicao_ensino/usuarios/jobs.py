@@ -0,0 +1,260 @@
+"""
+Execução em background dos jobs de geração de certificados (CertificateBatchJob).
+
+Fluxo:
+- `criar_job(evento)` registra o job ao finalizar o evento (a view retorna na hora).
+- `dispatch_job(job_id)` inicia uma thread daemon que processa o job.
+- `process_job(job_id)` reivindica o job e processa as inscrições validadas em
+  lotes ordenados por id, reaproveitando um único pool de processos durante todo
+  o job. Após cada lote, o progresso (done/failed) e o cursor
+  são gravados em uma única atualização, e os participantes do lote são notificados.
+- `retomar_jobs()` redespacha jobs pendentes ou interrompidos. Um job em 'running'
+  cujo heartbeat (`updated_at`) está parado há mais de
+  `settings.CERTIFICADOS_JOB_STALE_SECONDS` é considerado interrompido e é
+  retomado a partir do cursor, sem refazer os lotes já concluídos.
+"""
+
+import logging
+import threading
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+from .models import CertificateBatchJob
+
+
+logger = logging.getLogger(__name__)
+
+_jobs_ativos = set()
+_jobs_lock = threading.Lock()
+
+
+def _stale_seconds():
+    return int(getattr(settings, 'CERTIFICADOS_JOB_STALE_SECONDS', 120))
+
+
+def criar_job(evento):
+    """
+    Cria o job de geração de certificados do evento.
+    Se já houver um job ativo para o evento, ele é reaproveitado.
+    """
+    job = CertificateBatchJob.objects.filter(evento=evento, status__in=('pending', 'running')).first()
+    if job:
+        return job
+    total = evento.inscricaoevento_set.filter(is_validated=True).count()
+    return CertificateBatchJob.objects.create(evento=evento, total=total)
+
+
+def is_stale(job):
+    """
+    Indica se um job ativo parou de enviar heartbeat (processo interrompido).
+    """
+    if job.status == 'pending':
+        return True
+    if job.status != 'running' or not job.updated_at:
+        return False
+    return job.updated_at < timezone.now() - timezone.timedelta(seconds=_stale_seconds())
+
+
+def _reivindicar(job_id):
+    """
+    Marca o job como 'running' para este processo, de forma atômica.
+    Só reivindica jobs pendentes ou cujo processo anterior foi interrompido.
+    """
+    agora = timezone.now()
+    limite = agora - timezone.timedelta(seconds=_stale_seconds())
+    updated = CertificateBatchJob.objects.filter(pk=job_id).filter(
+        Q(status='pending') | Q(status='running', updated_at__lt=limite)
+    ).update(status='running', updated_at=agora)
+    if updated != 1:
+        return None
+    job = CertificateBatchJob.objects.select_related('evento').get(pk=job_id)
+    if not job.started_at:
+        job.started_at = agora
+        job.save(update_fields=['started_at', 'updated_at'])
+    return job
+
+
+def _notificar_lote(evento, inscricao_ids):
+    """
+    Enfileira o e-mail de certificado pronto para os participantes do lote.
+    """
+    try:
+        from notifications.services import queue_certificate_ready_emails
+        from .models import Certificado
+    except Exception:
+        return
+    certificados = Certificado.objects.filter(
+        evento=evento,
+        usuario__inscricaoevento__id__in=inscricao_ids,
+    ).select_related('usuario')
+    try:
+        # Um único INSERT em massa e uma notificação ao worker por lote
+        queue_certificate_ready_emails(certificados, evento)
+    except Exception:
+        logger.exception('Falha ao enfileirar e-mails de certificado: evento=%s', evento.id)
+
+
+def _processar_lote(evento, inscricao_ids, pool=None):
+    """
+    Gera os certificados de um lote, usando o pool do job quando houver.
+
+    Retorna:
+        tuple: (processadas com sucesso, falhas, último erro).
+
+    Levanta:
+        BrokenProcessPool: um processo de `pool` morreu; o pool não aceita mais
+        tarefas e deve ser recriado por quem o criou.
+    """
+    from .generator import generate_certificates_parallel
+
+    try:
+        resultado = generate_certificates_parallel(evento.id, inscricao_ids=inscricao_ids, pool=pool)
+        return resultado['generated'] + resultado['skipped'], 0, None
+    except ImportError:
+        # Sem bibliotecas de imagem/PDF nenhuma inscrição pode ser processada
+        raise
+    except Exception as e:
+        if isinstance(e, BrokenProcessPool) and pool is not None:
+            raise
+        logger.exception('Falha no lote de certificados do evento %s; processando individualmente', evento.id)
+        return _processar_individualmente(evento, inscricao_ids, str(e))
+
+
+def _processar_individualmente(evento, inscricao_ids, ultimo_erro):
+    """
+    Gera os certificados do lote um a um, no próprio processo, isolando as
+    inscrições com problema para não perder o lote inteiro.
+
+    Retorna:
+        tuple: (processadas com sucesso, falhas, último erro).
+    """
+    from .generator import generate_certificate_for_inscription
+    from eventos.models import InscricaoEvento
+
+    ok, falhas = 0, 0
+    inscricoes = InscricaoEvento.objects.filter(id__in=inscricao_ids).select_related('evento', 'inscrito')
+    for inscr in inscricoes:
+        try:
+            if generate_certificate_for_inscription(inscr) is not None:
+                ok += 1
+        except Exception as e:
+            falhas += 1
+            ultimo_erro = str(e)
+    return ok, falhas, ultimo_erro
+
+
+def process_job(job_id):
+    """
+    Processa um job de certificados a partir do cursor, em lotes de
+    `settings.CERTIFICADOS_JOB_CHUNK_SIZE` inscrições. O pool de processos é
+    criado uma vez por job e compartilhado por todos os lotes, evitando iniciar
+    novos processos (e recarregar as fontes) a cada lote.
+
+    Retorna:
+        CertificateBatchJob | None: o job ao final, ou None se não foi possível reivindicá-lo.
+    """
+    job = _reivindicar(job_id)
+    if job is None:
+        return None
+
+    evento = job.evento
+    chunk_size = max(1, int(getattr(settings, 'CERTIFICADOS_JOB_CHUNK_SIZE', 200)))
+    from .generator import criar_pool_certificados
+    pool = criar_pool_certificados()
+    try:
+        while True:
+            inscricao_ids = list(
+                evento.inscricaoevento_set.filter(is_validated=True, id__gt=job.cursor)
+                .order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not inscricao_ids:
+                break
+
+            try:
+                ok, falhas, erro = _processar_lote(evento, inscricao_ids, pool)
+            except BrokenProcessPool as e:
+                # Um processo do pool morreu: o lote é refeito aqui mesmo e o pool é recriado para os próximos
+                logger.warning('Pool de certificados do job %s quebrado; recriando', job.pk)
+                pool.shutdown(wait=False)
+                pool = criar_pool_certificados()
+                ok, falhas, erro = _processar_individualmente(evento, inscricao_ids, str(e))
+            _notificar_lote(evento, inscricao_ids)
+
+            # Progresso e cursor em uma única atualização (também renova o heartbeat)
+            campos = {
+                'done': F('done') + ok,
+                'failed': F('failed') + falhas,
+                'cursor': inscricao_ids[-1],
+                'updated_at': timezone.now(),
+            }
+            if erro:
+                campos['last_error'] = erro[:1000]
+            CertificateBatchJob.objects.filter(pk=job.pk).update(**campos)
+            job.cursor = inscricao_ids[-1]
+
+        job.refresh_from_db()
+        job.status = 'failed' if job.failed and not job.done else 'done'
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'finished_at', 'updated_at'])
+    except Exception as e:
+        logger.exception('Job de certificados %s interrompido', job.pk)
+        CertificateBatchJob.objects.filter(pk=job.pk).update(
+            status='failed', last_error=str(e)[:1000], finished_at=timezone.now(), updated_at=timezone.now()
+        )
+        job.refresh_from_db()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return job
+
+
+def _executar(job_id):
+    """
+    Corpo da thread de background: processa o job e libera a conexão com o banco.
+    """
+    try:
+        process_job(job_id)
+    except Exception:
+        logger.exception('Erro inesperado no job de certificados %s', job_id)
+    finally:
+        with _jobs_lock:
+            _jobs_ativos.discard(job_id)
+        # Cada thread tem sua própria conexão; fecha ao terminar
+        connection.close()
+
+
+def dispatch_job(job_id):
+    """
+    Inicia o processamento do job em uma thread daemon deste processo.
+    Não inicia uma segunda thread para um job que já está sendo processado aqui.
+    """
+    with _jobs_lock:
+        if job_id in _jobs_ativos:
+            return False
+        _jobs_ativos.add(job_id)
+    t = threading.Thread(target=_executar, args=(job_id,), name=f'CertificateJob-{job_id}', daemon=True)
+    t.start()
+    return True
+
+
+def jobs_retomaveis():
+    """
+    Jobs pendentes ou interrompidos (heartbeat parado), do mais antigo ao mais novo.
+    """
+    limite = timezone.now() - timezone.timedelta(seconds=_stale_seconds())
+    return CertificateBatchJob.objects.filter(
+        Q(status='pending') | Q(status='running', updated_at__lt=limite)
+    ).order_by('created_at')
+
+
+def retomar_jobs():
+    """
+    Redespacha os jobs pendentes e os jobs interrompidos neste processo.
+
+    Retorna:
+        int: quantidade de jobs despachados.
+    """
+    ids = list(jobs_retomaveis().values_list('id', flat=True))
+    return sum(1 for job_id in ids if dispatch_job(job_id))
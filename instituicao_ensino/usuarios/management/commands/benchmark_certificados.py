@@ -0,0 +1,65 @@
+"""
+Comando Django para medir o custo da geração de certificados.
+Monta eventos sintéticos (sem deixar dados no banco) e emite um relatório JSON
+comparável entre commits.
+"""
+
+import json
+from django.core.management.base import BaseCommand, CommandError
+from usuarios.benchmark import TAMANHOS_PADRAO, executar_benchmark, comparar
+
+
+class Command(BaseCommand):
+    """
+    Executa o benchmark do gerador de certificados para um ou mais tamanhos de evento.
+    """
+    help = 'Mede tempo, CPU, memória, bytes gravados e consultas por certificado gerado.'
+
+    def add_arguments(self, parser):
+        """
+        Adiciona os tamanhos de evento, parâmetros do pool e arquivos de saída/comparação.
+        """
+        parser.add_argument('--tamanhos', default=','.join(str(n) for n in TAMANHOS_PADRAO),
+                            help='Inscrições por evento, separadas por vírgula (padrão: 1,100,1000,5000)')
+        parser.add_argument('--workers', type=int, help='Processos do pool (padrão: CERTIFICADOS_WORKERS)')
+        parser.add_argument('--chunk-size', type=int, help='Inscrições por lote (padrão: CERTIFICADOS_CHUNK_SIZE)')
+        parser.add_argument('--saida', help='Grava o relatório JSON neste arquivo (padrão: stdout)')
+        parser.add_argument('--comparar', help='Relatório JSON anterior para comparar por certificado')
+
+    def handle(self, *args, **options):
+        """
+        Executa as rodadas, grava o relatório e, se pedido, mostra a variação em relação ao anterior.
+        """
+        try:
+            tamanhos = [int(n) for n in options['tamanhos'].split(',') if n.strip()]
+        except ValueError:
+            raise CommandError('--tamanhos deve ser uma lista de inteiros separados por vírgula')
+        if not tamanhos or min(tamanhos) < 1:
+            raise CommandError('Informe ao menos um tamanho positivo em --tamanhos')
+
+        anterior = None
+        if options.get('comparar'):
+            try:
+                with open(options['comparar']) as f:
+                    anterior = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Não foi possível ler {options['comparar']}: {e}")
+
+        relatorio = executar_benchmark(tamanhos, workers=options.get('workers'), chunk_size=options.get('chunk_size'))
+        if anterior is not None:
+            relatorio['comparison'] = {'baseline_commit': anterior.get('commit'), 'runs': comparar(relatorio, anterior)}
+
+        texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+        if options.get('saida'):
+            with open(options['saida'], 'w') as f:
+                f.write(texto + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Relatório gravado em {options['saida']}"))
+        else:
+            self.stdout.write(texto)
+
+        for run in relatorio['runs']:
+            por_cert = run['per_certificate']
+            self.stderr.write(self.style.NOTICE(
+                f"{run['size']:>6} inscrições: {por_cert['wall_ms']} ms/cert, {por_cert['cpu_ms']} ms CPU/cert, "
+                f"{run['peak_rss_kb']} KB RSS, {run['db_queries']} consultas"
+            ))
@@ -0,0 +1,41 @@
+"""
+Comando Django para processar jobs de geração de certificados (CertificateBatchJob).
+Retoma jobs pendentes ou interrompidos a partir do cursor salvo, sem refazer lotes concluídos.
+"""
+
+from django.core.management.base import BaseCommand
+from usuarios.jobs import process_job, jobs_retomaveis
+
+
+class Command(BaseCommand):
+    """
+    Processa no próprio processo os jobs de certificados pendentes ou interrompidos.
+    Pode ser executado manualmente ou via agendamento (cron/task scheduler).
+    """
+    help = 'Processa jobs de geração de certificados pendentes ou interrompidos.'
+
+    def add_arguments(self, parser):
+        """
+        Adiciona argumento opcional '--job' para processar apenas um job específico.
+        """
+        parser.add_argument('--job', type=int, help='ID do job a processar')
+
+    def handle(self, *args, **options):
+        """
+        Reivindica e processa cada job elegível, exibindo o resultado final.
+        """
+        if options.get('job'):
+            ids = [options['job']]
+        else:
+            ids = list(jobs_retomaveis().values_list('id', flat=True))
+
+        for job_id in ids:
+            job = process_job(job_id)
+            if job is None:
+                self.stderr.write(self.style.WARNING(f"Job {job_id} em execução por outro processo ou já concluído"))
+                continue
+            self.stdout.write(self.style.SUCCESS(
+                f"Job {job.id} ({job.evento}): {job.status} — {job.done} gerados, {job.failed} com erro, de {job.total}"
+            ))
+
+        self.stdout.write(self.style.NOTICE(f"Total de jobs: {len(ids)}"))
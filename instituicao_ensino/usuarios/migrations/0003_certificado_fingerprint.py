@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-16 21:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0002_certificatebatchjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificado',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
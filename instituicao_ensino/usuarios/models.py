@@ -280,6 +280,8 @@ class Certificado(models.Model):
     nome = models.CharField(max_length=200, blank=True)
     horas = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     public_id = models.CharField(max_length=64, blank=True, null=True, unique=True)
+    # sha256 das entradas do certificado renderizado (ver usuarios.generator._fingerprint)
+    fingerprint = models.CharField(max_length=64, blank=True, default='')
     data_emitido = models.DateField(auto_now_add=True)
 
     def save(self, *args, **kwargs):
@@ -294,6 +296,64 @@ class Certificado(models.Model):
         return f'Certificado {self.nome or self.arquivo.name} de {self.usuario.nome_usuario}'
 
 
+# -----------------------------
+# Jobs de geração de certificados
+# -----------------------------
+class CertificateBatchJob(models.Model):
+    """
+    Job persistente de geração de certificados de um evento.
+
+    Criado ao finalizar um evento e processado em background, em lotes, por
+    `usuarios.jobs`. O campo `cursor` guarda o id da última inscrição processada,
+    permitindo retomar o job de onde parou após um reinício do servidor.
+
+    Campos:
+    - evento: evento cujos certificados estão sendo gerados
+    - status: 'pending', 'running', 'done' ou 'failed'
+    - total: inscrições validadas no momento da criação
+    - done: inscrições processadas com sucesso (geradas ou já existentes)
+    - failed: inscrições cuja geração falhou
+    - cursor: id da última InscricaoEvento processada
+    - last_error: último erro registrado
+    - created_at/started_at/finished_at/updated_at: marcos do processamento
+      (updated_at funciona como heartbeat do processo que executa o job)
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    evento = models.ForeignKey('eventos.Evento', on_delete=models.CASCADE, related_name='certificate_jobs')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default='pending', db_index=True)
+    total = models.PositiveIntegerField(default=0)
+    done = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    cursor = models.BigIntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    @property
+    def is_active(self):
+        return self.status in ('pending', 'running')
+
+    @property
+    def percent(self):
+        if not self.total:
+            return 100 if self.status == 'done' else 0
+        return min(100, int((self.done + self.failed) * 100 / self.total))
+
+    def __str__(self):
+        return f"CertificateBatchJob(evento={self.evento_id}, status={self.status}, {self.done + self.failed}/{self.total})"
+
+
 # -----------------------------
 # Registro de Auditoria
 # -----------------------------
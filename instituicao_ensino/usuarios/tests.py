@@ -1,4 +1,9 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+from django.test import TestCase, override_settings
 from .models import Usuario, TipoUsuario, Instituicao, Certificado
 from eventos.models import Evento, TipoEvento, InscricaoEvento
 from django.utils import timezone
@@ -6,15 +11,21 @@ from django.utils import timezone
 
 class CertificateGenerationTests(TestCase):
     def setUp(self):
+        # isola os arquivos gerados em um MEDIA_ROOT temporário
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
         # create minimal dataset
         tipo_aluno, _ = TipoUsuario.objects.get_or_create(tipo='Aluno')
         tipo_ev, _ = TipoEvento.objects.get_or_create(tipo='Palestra')
         inst, _ = Instituicao.objects.get_or_create(nome='Uni Teste')
-        # armazenamos apenas o DDD local como string (ex: '11')
-        self.usuario = Usuario.objects.create(nome='Aluno Teste', tipo=tipo_aluno, instituicao=inst, ddd='11', telefone='999999999', nome_usuario='aluno_teste')
-        self.organizador = Usuario.objects.create(nome='Prof Teste', tipo=TipoUsuario.objects.get_or_create(tipo='Professor')[0], instituicao=inst, ddd='11', telefone='999999999', nome_usuario='prof_teste')
+        self.usuario = Usuario.objects.create(nome='Aluno Teste', tipo=tipo_aluno, instituicao=inst, telefone='11999999999', nome_usuario='aluno_teste')
+        self.organizador = Usuario.objects.create(nome='Prof Teste', tipo=TipoUsuario.objects.get_or_create(tipo='Professor')[0], instituicao=inst, telefone='11999999999', nome_usuario='prof_teste')
         self.evento = Evento.objects.create(titulo='Evento Teste', tipo=tipo_ev, modalidade='online', data_inicio=timezone.now().date(), data_fim=timezone.now().date(), horario=timezone.now().time(), criador=self.organizador, finalizado=True)
-        InscricaoEvento.objects.create(evento=self.evento, aluno=self.usuario, is_validated=True)
+        InscricaoEvento.objects.create(evento=self.evento, inscrito=self.usuario, is_validated=True)
 
     def test_generator_creates_public_id_and_horas_field(self):
         # call generator (should not raise); generator may need libs; we assert DB fields behavior
@@ -33,6 +44,262 @@ class CertificateGenerationTests(TestCase):
         self.assertIsNotNone(cert.public_id)
         # horas may be null (unless evento.horas set), but attribute must exist
         self.assertTrue(hasattr(cert, 'horas'))
-from django.test import TestCase
 
-# Create your tests here.
+    def test_base_do_certificado_reaproveitada_entre_participantes(self):
+        from . import generator
+        generator.limpar_cache_bases()
+
+        base = generator.obter_base_certificado(self.evento)
+        self.assertEqual(base.size, (generator.LARGURA, generator.ALTURA))
+        # mesma instância em memória na segunda chamada
+        self.assertIs(generator.obter_base_certificado(self.evento), base)
+
+        # a base também fica salva em disco dentro do MEDIA_ROOT
+        caminho = generator._caminho_base_em_disco(self.evento, generator._assinatura_evento(self.evento))
+        self.assertTrue(caminho.startswith(self.media_root))
+        self.assertTrue(os.path.exists(caminho))
+
+        # alterar o evento gera uma nova base
+        self.evento.titulo = 'Evento Teste Renomeado'
+        self.assertIsNot(generator.obter_base_certificado(self.evento), base)
+
+    def test_cache_de_fontes_e_qr(self):
+        from . import generator
+        generator.limpar_cache_recursos()
+
+        fontes = generator._carregar_fontes()
+        misses = generator.cache_stats()['fontes']['misses']
+        # segunda carga não toca o sistema de arquivos
+        self.assertIs(generator._carregar_fontes()['nome'], fontes['nome'])
+        stats = generator.cache_stats()
+        self.assertEqual(stats['fontes']['misses'], misses)
+        self.assertGreater(stats['fontes']['hits'], 0)
+
+        url = '/usuarios/certificado/abc/'
+        selo = generator._selo_qr(url)
+        self.assertEqual(selo.size, (generator.TAMANHO_QR, generator.TAMANHO_QR))
+        self.assertIs(generator._selo_qr(url), selo)
+        self.assertEqual(generator.cache_stats()['qr'], {'hits': 1, 'misses': 1, 'size': 1})
+
+    def test_pdf_vetorial_sem_imagem_embutida(self):
+        from .generator import generate_certificate_for_inscription
+        inscr = InscricaoEvento.objects.get(evento=self.evento, inscrito=self.usuario)
+
+        cert = generate_certificate_for_inscription(inscr)
+        with open(cert.pdf.path, 'rb') as f:
+            pdf = f.read()
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        # base desenhada em um Form XObject e nenhuma imagem raster
+        self.assertIn(b'/Subtype /Form', pdf)
+        self.assertNotIn(b'/Subtype /Image', pdf)
+        # streams só com Flate, sem alterar a configuração global do ReportLab
+        from reportlab import rl_config
+        self.assertIn(b'/FlateDecode', pdf)
+        self.assertNotIn(b'/ASCII85Decode', pdf)
+        self.assertEqual(rl_config.useA85, 1)
+        # restaurada mesmo se o desenho falhar
+        from . import generator
+        with patch.object(generator, '_desenhar_pdf_participante', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                generator._montar_pdf_vetorial(generator._textos_evento(self.evento), [('Aluno', 'https://example.com/c/1')])
+        self.assertEqual(rl_config.useA85, 1)
+
+        os.remove(cert.pdf.path)
+        with override_settings(CERTIFICADOS_PDF_MODO='raster'):
+            cert = generate_certificate_for_inscription(inscr)
+        with open(cert.pdf.path, 'rb') as f:
+            self.assertIn(b'/Subtype /Image', f.read())
+
+    def test_pdf_vetorial_embute_fonte_para_nome_fora_do_latin1(self):
+        from . import generator
+        if generator._resolver_estilo(generator._caminhos_fontes()['bold']) is None:
+            self.skipTest('Nenhuma TTF disponível para o estilo bold')
+        pdf = generator._montar_pdf_vetorial(generator._textos_evento(self.evento), [('Дмитрий Łukasz Nguyễn', 'https://example.com/c/1')])
+        # TTF embutida (subconjunto) em vez de só as fontes padrão WinAnsi
+        self.assertIn(b'/FontFile2', pdf)
+        fonte = generator._fonte_que_cobre(generator._FONTES_PDF_PADRAO['elegant'], 'ДМИТРИЙ')
+        self.assertNotIn(fonte, generator._FONTES_PDF_PADRAO.values())
+        self.assertEqual(generator._fonte_que_cobre('Times-Bold', 'JOSÉ'), 'Times-Bold')
+
+    def test_geracao_paralela_em_lotes(self):
+        from .generator import generate_certificates_parallel
+        tipo_aluno = TipoUsuario.objects.get(tipo='Aluno')
+        for i in range(2):
+            outro = Usuario.objects.create(nome=f'Aluno {i}', tipo=tipo_aluno, nome_usuario=f'aluno_lote_{i}')
+            InscricaoEvento.objects.create(evento=self.evento, inscrito=outro, is_validated=True)
+
+        resultado = generate_certificates_parallel(self.evento.id, workers=2, chunk_size=2)
+
+        self.assertEqual(resultado['generated'], 3)
+        self.assertEqual(resultado['workers'], 2)
+        self.assertEqual([c['size'] for c in resultado['chunks']], [2, 1])
+        for cert in Certificado.objects.filter(evento=self.evento):
+            self.assertTrue(os.path.exists(cert.pdf.path))
+            # o PNG só é gerado sob demanda, na pré-visualização
+            self.assertFalse(cert.png)
+
+        # segunda execução não regera certificados existentes
+        self.assertEqual(generate_certificates_parallel(self.evento.id, workers=2, chunk_size=2)['skipped'], 3)
+
+    def test_regeneracao_so_quando_entradas_mudam(self):
+        from .generator import generate_certificates_parallel
+        tipo_aluno = TipoUsuario.objects.get(tipo='Aluno')
+        outro = Usuario.objects.create(nome='Aluno Outro', tipo=tipo_aluno, nome_usuario='aluno_outro')
+        InscricaoEvento.objects.create(evento=self.evento, inscrito=outro, is_validated=True)
+
+        self.assertEqual(generate_certificates_parallel(self.evento.id, workers=1)['generated'], 2)
+        antes = {c.usuario_id: c for c in Certificado.objects.filter(evento=self.evento)}
+        for cert in antes.values():
+            # arquivo endereçado pela impressão digital das entradas
+            self.assertIn(cert.fingerprint[:16], cert.pdf.name)
+
+        # nada mudou: apenas comparação de impressões digitais
+        self.assertEqual(generate_certificates_parallel(self.evento.id, workers=1)['skipped'], 2)
+
+        # só o participante que mudou de nome é regerado; o arquivo antigo é removido
+        outro.nome = 'Aluno Renomeado'
+        outro.save()
+        resultado = generate_certificates_parallel(self.evento.id, workers=1)
+        self.assertEqual((resultado['generated'], resultado['skipped']), (1, 1))
+        novo = Certificado.objects.get(evento=self.evento, usuario=outro)
+        self.assertNotEqual(novo.fingerprint, antes[outro.id].fingerprint)
+        self.assertEqual(novo.public_id, antes[outro.id].public_id)
+        self.assertTrue(os.path.exists(novo.pdf.path))
+        self.assertFalse(os.path.exists(antes[outro.id].pdf.path))
+
+    def test_png_gerado_sob_demanda_com_miniatura(self):
+        from django.urls import reverse
+        from PIL import Image
+        from .generator import generate_certificate_for_inscription
+        inscr = InscricaoEvento.objects.get(evento=self.evento, inscrito=self.usuario)
+        cert = generate_certificate_for_inscription(inscr)
+        url = reverse('certificado_png', args=[cert.public_id])
+
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp['Content-Type'], 'image/png')
+        resp.close()
+        cert.refresh_from_db()
+        self.assertTrue(os.path.exists(cert.png.path))
+
+        # largura pedida é ajustada para uma das miniaturas aceitas
+        with override_settings(CERTIFICADOS_PNG_LARGURAS=[320, 640]):
+            resp = self.client.get(url, {'largura': 300})
+            imagem = Image.open(io.BytesIO(b''.join(resp.streaming_content)))
+        self.assertEqual(imagem.width, 320)
+
+        # certificado inexistente cai no handler 404 do projeto (redirecionamento)
+        self.assertNotEqual(self.client.get(reverse('certificado_png', args=['inexistente'])).status_code, 200)
+
+    def test_geracao_individual_nao_percorre_o_evento(self):
+        from .generator import generate_certificate_for_inscription
+        tipo_aluno = TipoUsuario.objects.get(tipo='Aluno')
+        outro = Usuario.objects.create(nome='Aluno Outro', tipo=tipo_aluno, nome_usuario='aluno_outro')
+        InscricaoEvento.objects.create(evento=self.evento, inscrito=outro, is_validated=True)
+        inscr = InscricaoEvento.objects.get(evento=self.evento, inscrito=self.usuario)
+
+        cert = generate_certificate_for_inscription(inscr)
+
+        self.assertTrue(os.path.exists(cert.pdf.path))
+        # apenas o certificado do próprio participante é gerado
+        self.assertEqual(Certificado.objects.filter(evento=self.evento).count(), 1)
+        # chamada repetida devolve o certificado existente sem regerar
+        with self.assertNumQueries(1):
+            self.assertEqual(generate_certificate_for_inscription(inscr).pk, cert.pk)
+
+        # inscrição não validada não recebe certificado
+        pendente = InscricaoEvento.objects.get(evento=self.evento, inscrito=outro)
+        pendente.is_validated = False
+        self.assertIsNone(generate_certificate_for_inscription(pendente))
+
+    @patch('notifications.services.queue_certificate_ready_emails')
+    def test_job_de_certificados_retoma_do_cursor(self, mock_email):
+        from .jobs import process_job
+        from .models import CertificateBatchJob
+        tipo_aluno = TipoUsuario.objects.get(tipo='Aluno')
+        outro = Usuario.objects.create(nome='Aluno Dois', tipo=tipo_aluno, nome_usuario='aluno_dois')
+        segunda = InscricaoEvento.objects.create(evento=self.evento, inscrito=outro, is_validated=True)
+        primeira = InscricaoEvento.objects.get(evento=self.evento, inscrito=self.usuario)
+
+        # simula um job interrompido depois do primeiro lote
+        job = CertificateBatchJob.objects.create(evento=self.evento, total=2, done=1, cursor=primeira.id)
+
+        with override_settings(CERTIFICADOS_JOB_CHUNK_SIZE=1):
+            job = process_job(job.id)
+
+        self.assertEqual(job.status, 'done')
+        self.assertEqual((job.done, job.failed, job.cursor), (2, 0, segunda.id))
+        # só a inscrição após o cursor foi processada
+        self.assertTrue(Certificado.objects.filter(evento=self.evento, usuario=outro).exists())
+        self.assertFalse(Certificado.objects.filter(evento=self.evento, usuario=self.usuario).exists())
+        mock_email.assert_called_once()
+        self.assertEqual([c.usuario for c in mock_email.call_args[0][0]], [outro])
+        # job concluído não é reivindicado novamente
+        self.assertIsNone(process_job(job.id))
+
+    @patch('notifications.services.queue_certificate_ready_emails')
+    def test_job_de_certificados_usa_um_pool_por_job(self, mock_email):
+        from . import generator
+        from .jobs import criar_job, process_job
+        tipo_aluno = TipoUsuario.objects.get(tipo='Aluno')
+        for i in range(3):
+            outro = Usuario.objects.create(nome=f'Aluno {i}', tipo=tipo_aluno, nome_usuario=f'aluno_pool_{i}')
+            InscricaoEvento.objects.create(evento=self.evento, inscrito=outro, is_validated=True)
+        job = criar_job(self.evento)
+
+        with override_settings(CERTIFICADOS_JOB_CHUNK_SIZE=2, CERTIFICADOS_CHUNK_SIZE=1, CERTIFICADOS_WORKERS=2), \
+                patch.object(generator, 'criar_pool_certificados', wraps=generator.criar_pool_certificados) as criar_pool:
+            job = process_job(job.id)
+
+        self.assertEqual((job.status, job.done, job.failed), ('done', 4, 0))
+        # dois lotes do job, um único pool
+        criar_pool.assert_called_once()
+        self.assertEqual(mock_email.call_count, 2)
+
+    @patch('notifications.services.queue_certificate_ready_emails')
+    def test_job_recria_pool_quebrado(self, mock_email):
+        from concurrent.futures.process import BrokenProcessPool
+        from unittest.mock import MagicMock
+        from . import generator
+        from .jobs import criar_job, process_job
+        tipo_aluno = TipoUsuario.objects.get(tipo='Aluno')
+        outro = Usuario.objects.create(nome='Aluno Dois', tipo=tipo_aluno, nome_usuario='aluno_dois')
+        InscricaoEvento.objects.create(evento=self.evento, inscrito=outro, is_validated=True)
+        job = criar_job(self.evento)
+        pools = [MagicMock(), MagicMock()]
+        real = generator.generate_certificates_parallel
+
+        def gerar(evento_id, inscricao_ids=None, pool=None):
+            # o primeiro lote derruba um processo do pool
+            if pool is pools[0]:
+                raise BrokenProcessPool('processo do pool morreu')
+            return real(evento_id, inscricao_ids=inscricao_ids, workers=1)
+
+        with override_settings(CERTIFICADOS_JOB_CHUNK_SIZE=1), \
+                patch.object(generator, 'criar_pool_certificados', side_effect=pools) as criar_pool, \
+                patch.object(generator, 'generate_certificates_parallel', side_effect=gerar):
+            job = process_job(job.id)
+
+        # o lote do pool quebrado é refeito no próprio processo e os seguintes usam um pool novo
+        self.assertEqual((job.status, job.done, job.failed), ('done', 2, 0))
+        self.assertEqual(criar_pool.call_count, 2)
+        pools[0].shutdown.assert_called_once_with(wait=False)
+        pools[1].shutdown.assert_called_once_with()
+        self.assertEqual(Certificado.objects.filter(evento=self.evento).count(), 2)
+
+    def test_benchmark_relatorio_json_sem_residuos(self):
+        import json
+        from .benchmark import executar_benchmark
+        usuarios_antes = Usuario.objects.count()
+
+        relatorio = executar_benchmark([2], workers=1)
+
+        json.dumps(relatorio)
+        run = relatorio['runs'][0]
+        self.assertEqual((run['size'], run['generated']), (2, 2))
+        self.assertGreater(run['bytes_certificates'], 0)
+        self.assertGreater(run['db_queries'], 0)
+        self.assertGreater(run['per_certificate']['wall_ms'], 0)
+        # o evento sintético e seus arquivos são descartados
+        self.assertEqual(Usuario.objects.count(), usuarios_antes)
+        self.assertFalse(Certificado.objects.exclude(evento=self.evento).exists())
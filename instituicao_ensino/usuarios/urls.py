@@ -13,6 +13,7 @@ urlpatterns = [
     # Public profile URLs
     path('u/<str:nome_usuario>/', views.perfil_publico, name='perfil_publico'),
     path('certificado/<str:public_id>/', views.certificado_publico, name='certificado_publico'),
+    path('certificado/<str:public_id>/png/', views.certificado_png, name='certificado_png'),
     path('instituicao/<int:instituicao_id>/', views.instituicao_publica, name='instituicao_publica'),
     path('u/<str:nome_usuario>/certificados/', views.perfil_certificados, name='perfil_certificados'),
     path('reconcile/', views.reconcile_users, name='reconcile_users'),
@@ -81,7 +81,7 @@ def cadastro(request):
             # Enfileira e-mail de confirmação (assíncrono via socket/worker)
             try:
                 from notifications.services import queue_welcome_confirmation_email
-                queue_welcome_confirmation_email(user=usuario.user, usuario=usuario, send_now=True)
+                queue_welcome_confirmation_email(user=usuario.user, usuario=usuario)
             except Exception:
                 pass
 
@@ -226,7 +226,10 @@ def esqueci_senha(request):
                         else:
                             try:
                                 from notifications.services import queue_password_recovery_email
-                                queue_password_recovery_email(user=user, usuario=usuario, login_url=login_url, send_now=True)
+                                queue_password_recovery_email(
+                                    user=user, usuario=usuario, login_url=login_url,
+                                    wait=getattr(settings, 'EMAIL_RECOVERY_WAIT_SECONDS', 5),
+                                )
                                 messages.success(request, 'Enviamos um e-mail com o link de acesso ao seu perfil.')
                                 return redirect('login')
                             except Exception as e:
@@ -519,6 +522,30 @@ def certificado_publico(request, public_id):
     return render(request, 'certificado_publico.html', {'cert': cert, 'file_url': file_url, 'nav_items': nav_items})
 
 
+def certificado_png(request, public_id):
+    """Serve a pré-visualização PNG de um certificado.
+
+    O PNG é renderizado no primeiro acesso e fica em cache no disco. O
+    parâmetro opcional `?largura=` devolve uma miniatura (ver
+    `settings.CERTIFICADOS_PNG_LARGURAS`).
+    """
+    from django.http import FileResponse
+    from .models import Certificado
+    from .generator import obter_png_certificado
+    try:
+        cert = Certificado.objects.select_related('usuario', 'evento', 'evento__criador').get(public_id=public_id)
+    except Certificado.DoesNotExist:
+        raise Http404('Certificado não encontrado')
+
+    caminho = obter_png_certificado(cert, request.GET.get('largura'))
+    if not caminho:
+        raise Http404('Pré-visualização indisponível')
+
+    response = FileResponse(open(caminho, 'rb'), content_type='image/png')
+    response['Cache-Control'] = 'public, max-age=86400'
+    return response
+
+
 @login_required
 def reconcile_users(request):
     """Staff-only view: attempt to link Django User objects to Usuario by matching username.